@@ -0,0 +1,361 @@
+"""
+Скрипт для замеров производительности компонентов Votobu.
+
+Использование:
+    python benchmark.py speculative <модель> <черновая модель> [file1.wav ...]
+    python benchmark.py int16 [--model <модель>] [file1.wav ...]
+    python benchmark.py resample [--chunk-ms <мс>]
+    python benchmark.py preprocess [--chunk-ms <мс>]
+    python benchmark.py server [--model <модель>] [--clients <N>] file.wav
+    python benchmark.py filestream file1.flac [file2.m4a ...]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+# Добавить src в путь
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+
+
+def benchmark_speculative(model_name: str, draft_name: str, files: list) -> None:
+    """
+    Сравнить жадное декодирование Whisper со спекулятивным.
+    
+    Заодно проверяет эквивалентность: текст каждого окна должен совпасть
+    с жадным model.decode основной модели на том же окне и языке. При
+    расхождении скрипт завершается с кодом 1. Без файлов используется
+    синтетическая запись калибровки.
+    
+    Args:
+        model_name: Основная модель
+        draft_name: Черновая модель
+        files: Аудио файлы для замера
+    """
+    import whisper
+    from whisper.audio import N_SAMPLES, log_mel_spectrogram, pad_or_trim
+    from model_calibration import synthetic_clip
+    from speculative_decoder import SpeculativeDecoder
+    
+    model = whisper.load_model(model_name)
+    draft = whisper.load_model(draft_name)
+    decoder = SpeculativeDecoder(model, draft)
+    
+    total_greedy = 0.0
+    total_speculative = 0.0
+    mismatches = 0
+    
+    sources = [(Path(audio_file).name, whisper.load_audio(audio_file)) for audio_file in files]
+    if not sources:
+        sources = [("synthetic", synthetic_clip())]
+    
+    for name, audio in sources:
+        for start in range(0, max(len(audio), 1), N_SAMPLES):
+            window = audio[start:start + N_SAMPLES]
+            
+            t0 = time.perf_counter()
+            text, language = decoder.decode_window(window, None)
+            speculative_time = time.perf_counter() - t0
+            
+            # Эталон: жадное декодирование основной модели на том же окне и языке
+            t0 = time.perf_counter()
+            mel = log_mel_spectrogram(pad_or_trim(window), n_mels=model.dims.n_mels).to(model.device)
+            options = whisper.DecodingOptions(language=language, temperature=0.0, without_timestamps=True,
+                                              fp16=False)
+            reference = model.decode(mel, options).text.strip()
+            greedy_time = time.perf_counter() - t0
+            
+            total_greedy += greedy_time
+            total_speculative += speculative_time
+            same = text == reference
+            if not same:
+                mismatches += 1
+            
+            print(f"{name} [{start / 16000:.0f}s]: "
+                  f"greedy {greedy_time:.2f}s, speculative {speculative_time:.2f}s, "
+                  f"{'✓ совпадает' if same else '❌ РАЗЛИЧАЕТСЯ'}")
+            if not same:
+                print(f"  greedy:      {reference}")
+                print(f"  speculative: {text}")
+
+    print("=" * 60)
+    print(f"Жадное декодирование: {total_greedy:.2f}s")
+    print(f"Спекулятивное:        {total_speculative:.2f}s")
+    if total_speculative:
+        print(f"Ускорение:            {total_greedy / total_speculative:.2f}x")
+    print(f"Принято черновых токенов: {decoder.acceptance_rate():.0%}")
+    print(f"Расхождений: {mismatches}")
+    if mismatches:
+        sys.exit(1)
+
+
+def benchmark_int16(args: list) -> None:
+    """
+    Сравнить хранение записи в int16 и float32.
+    
+    Без файлов используется синтетический сигнал. С --model дополнительно
+    сравниваются тексты Whisper для обоих представлений.
+    
+    Args:
+        args: [--model <модель>] и аудио файлы
+    """
+    import numpy as np
+    from capture_buffer import to_float32
+    
+    model_name = None
+    if args[:1] == ['--model']:
+        model_name, args = args[1], args[2:]
+    
+    sample_rate = 16000
+    minute = sample_rate * 60
+    print(f"Память на минуту записи: float32 {minute * 4 / 2 ** 20:.2f} МБ, "
+          f"int16 {minute * 2 / 2 ** 20:.2f} МБ")
+    
+    signals = {}
+    if args:
+        import soundfile as sf
+        for audio_file in args:
+            signals[Path(audio_file).name] = sf.read(audio_file, dtype='float32')[0]
+    else:
+        # Речеподобный сигнал: гармоники с огибающей и шум
+        t = np.arange(minute) / sample_rate
+        envelope = 0.5 * (1 + np.sin(2 * np.pi * 3 * t))
+        voice = sum(np.sin(2 * np.pi * 140 * k * t) / k for k in range(1, 12))
+        signals['синтетический'] = (0.3 * envelope * voice / 3 + 0.005 * np.random.randn(minute)).astype(np.float32)
+    
+    model = None
+    if model_name:
+        import whisper
+        model = whisper.load_model(model_name)
+    
+    for name, reference in signals.items():
+        if reference.ndim == 2:
+            reference = reference.mean(axis=1).astype(np.float32)
+        
+        # Захват int16: то же квантование, что раньше выполнялось при записи WAV PCM_16
+        pcm16 = np.clip(np.round(reference * 32768.0), -32768, 32767).astype(np.int16)
+        
+        t0 = time.perf_counter()
+        converted = to_float32(pcm16)
+        convert_time = time.perf_counter() - t0
+        
+        noise = converted - reference
+        snr = 10 * np.log10(np.sum(reference ** 2) / max(np.sum(noise ** 2), 1e-20))
+        seconds = len(reference) / sample_rate
+        print(f"{name}: {seconds:.1f} с, {reference.nbytes / 2 ** 20:.2f} → {pcm16.nbytes / 2 ** 20:.2f} МБ, "
+              f"преобразование {convert_time * 1000:.2f} мс, SNR {snr:.1f} дБ, "
+              f"макс. ошибка {np.abs(noise).max():.2e}")
+        
+        if model is not None:
+            text_float = model.transcribe(reference, fp16=False, temperature=0.0)["text"].strip()
+            text_int16 = model.transcribe(converted, fp16=False, temperature=0.0)["text"].strip()
+            print(f"  Whisper: {'✓ тексты совпадают' if text_float == text_int16 else '❌ ТЕКСТЫ РАЗЛИЧАЮТСЯ'}")
+            if text_float != text_int16:
+                print(f"  float32: {text_float}\n  int16:   {text_int16}")
+
+
+def benchmark_resample(args: list) -> None:
+    """
+    Замерить скорость потоковой передискретизации в 16 кГц.
+    
+    Для типичных частот устройств сигнал подается блоками размера callback.
+    Проверяется, что результат не зависит от разбиения на блоки, и
+    оценивается искажение тона 1 кГц.
+    
+    Args:
+        args: [--chunk-ms <мс>] - длительность блока (по умолчанию 10 мс)
+    """
+    import numpy as np
+    from resampler import StreamingResampler
+    
+    chunk_ms = 10.0
+    if args[:1] == ['--chunk-ms']:
+        chunk_ms = float(args[1])
+    
+    out_rate = 16000
+    seconds = 30
+    for in_rate in (48000, 44100, 32000, 22050, 8000):
+        resampler = StreamingResampler(in_rate, out_rate)
+        t = np.arange(in_rate * seconds) / in_rate
+        tone = 0.5 * np.sin(2 * np.pi * 1000 * t)
+        signal = np.clip(np.rint(tone * 32768.0), -32768, 32767).astype(np.int16)
+        chunk = max(int(in_rate * chunk_ms / 1000), 1)
+        
+        t0 = time.perf_counter()
+        parts = [resampler.process(signal[i:i + chunk]) for i in range(0, len(signal), chunk)]
+        parts.append(resampler.flush(np.int16))
+        elapsed = time.perf_counter() - t0
+        output = np.concatenate(parts)
+        
+        # Тот же сигнал одним блоком должен дать тот же результат
+        whole = np.concatenate((resampler.process(signal), resampler.flush(np.int16)))
+        identical = np.array_equal(whole, output)
+        
+        # SNR относительно идеального тона на выходной частоте (без краев фильтра)
+        expected = 0.5 * np.sin(2 * np.pi * 1000 * np.arange(len(output)) / out_rate)
+        inner = slice(out_rate // 10, -out_rate // 10)
+        noise = output[inner] / 32768.0 - expected[inner]
+        snr = 10 * np.log10(np.sum(expected[inner] ** 2) / max(np.sum(noise ** 2), 1e-20))
+        
+        print(f"{in_rate:5} → {out_rate} Гц: {len(output)} сэмплов (ожидалось {-(-len(signal) * out_rate // in_rate)}), "
+              f"{seconds / elapsed:.0f}x реального времени, {elapsed / len(parts) * 1e6:.1f} мкс/блок, "
+              f"SNR {snr:.1f} дБ, блоки {'✓ совпадают' if identical else '❌ РАЗЛИЧАЮТСЯ'}")
+
+
+def benchmark_preprocess(args: list) -> None:
+    """
+    Замерить затраты процессора и эффект этапов предобработки.
+    
+    Синтетическая речь с белым шумом, гулом 50 Гц и постоянной составляющей
+    подается блоками размера callback. Для каждого этапа отдельно и для всей
+    цепочки выводятся процессорное время и SNR относительно чистого сигнала.
+    
+    Args:
+        args: [--chunk-ms <мс>] - длительность блока (по умолчанию 10 мс)
+    """
+    import numpy as np
+    from audio_preprocessor import STAGES, create_preprocessor
+    
+    chunk_ms = 10.0
+    if args[:1] == ['--chunk-ms']:
+        chunk_ms = float(args[1])
+    
+    sample_rate = 16000
+    seconds = 60
+    t = np.arange(sample_rate * seconds) / sample_rate
+    rng = np.random.default_rng(0)
+    
+    # Фразы по 2-3 с с паузами, первая начинается через 0.5 с после нажатия
+    envelope = ((np.sin(2 * np.pi * 0.2 * t) > -0.3) & (t > 0.5)).astype(np.float32)
+    voice = 0.02 * envelope * sum(np.sin(2 * np.pi * 140 * k * t) / k for k in range(1, 12))
+    noise = 0.005 * rng.standard_normal(len(t)) + 0.02 * np.sin(2 * np.pi * 50 * t) + 0.01
+    signal = np.clip(np.rint((voice + noise) * 32768.0), -32768, 32767).astype(np.int16)
+    chunk = int(sample_rate * chunk_ms / 1000)
+    
+    def snr(audio):
+        # Усиление AGC не должно влиять на оценку: сигнал масштабируется по проекции на чистый
+        scale = np.dot(audio, voice) / np.dot(voice, voice)
+        residual = audio - scale * voice
+        return 10 * np.log10(np.sum((scale * voice) ** 2) / np.sum(residual ** 2))
+    
+    print(f"Вход: {seconds} с, блоки {chunk_ms:g} мс, SNR {snr(signal / 32768.0):.1f} дБ")
+    for names in [[name] for name in STAGES] + [list(STAGES)]:
+        preprocessor = create_preprocessor(names, sample_rate)
+        t0 = time.perf_counter()
+        parts = [preprocessor.process(signal[i:i + chunk]) for i in range(0, len(signal), chunk)]
+        parts.append(preprocessor.flush(np.int16))
+        elapsed = time.perf_counter() - t0
+        output = np.concatenate(parts) / 32768.0
+        
+        costs = ", ".join(f"{name} {cost['cpu_ms']:.1f} мс" for name, cost in preprocessor.get_stats().items())
+        print(f"{' + '.join(names)}: {seconds / elapsed:.0f}x реального времени, SNR {snr(output):.1f} дБ, "
+              f"длина {'✓' if len(output) == len(signal) else '❌'} ({costs})")
+
+
+def benchmark_server(args: list) -> None:
+    """
+    Сравнить сервис распознавания с батчингом и без него.
+    
+    N клиентов одновременно отправляют один и тот же файл. Сервис без
+    батчинга (max_batch=1) распознает их по очереди, с батчингом окна
+    одновременных запросов проходят энкодер вместе.
+    
+    Args:
+        args: [--model <модель>] [--clients <N>] file.wav
+    """
+    import threading
+    import numpy as np
+    from speech_recognizer import SpeechRecognizer
+    from transcription_server import TranscriptionServer, transcribe_file
+    
+    model_name = 'base'
+    clients = 8
+    while args[:1] in (['--model'], ['--clients']):
+        if args[0] == '--model':
+            model_name = args[1]
+        else:
+            clients = int(args[1])
+        args = args[2:]
+    if not args:
+        print("Укажите аудио файл")
+        return
+    
+    recognizer = SpeechRecognizer(model_name=model_name, language='auto')
+    recognizer.load_model()
+    recognizer.transcribe_batch([np.zeros(16000, dtype=np.float32)])  # прогрев
+    
+    for label, max_batch in (("без батчинга", 1), ("с батчингом", clients)):
+        server = TranscriptionServer(recognizer, port=0, max_batch=max_batch)
+        server.start()
+        
+        threads = [threading.Thread(target=transcribe_file, args=(args[0], server.port)) for _ in range(clients)]
+        t0 = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - t0
+        
+        stats = server.scheduler.metrics.summary(0)
+        print(f"{label}: {clients} запросов за {elapsed:.2f} с, "
+              f"p50 {stats['latency_p50_ms']:.0f} мс, p95 {stats['latency_p95_ms']:.0f} мс, "
+              f"средний батч {stats['mean_batch_size']:.1f}")
+        server.close()
+
+
+def benchmark_filestream(files: list) -> None:
+    """
+    Сравнить пиковую память потокового чтения файла и чтения целиком.
+    
+    Память считается через tracemalloc (массивы NumPy в нем учитываются).
+    
+    Args:
+        files: Аудио файлы (форматы soundfile или любые, которые читает ffmpeg)
+    """
+    import tracemalloc
+    from audio_stream import iter_file_segments, read_blocks
+    
+    for audio_file in files:
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        segments = 0
+        duration = 0.0
+        for start, segment in iter_file_segments(audio_file):
+            segments += 1
+            duration = start + len(segment) / 16000
+        elapsed = time.perf_counter() - t0
+        streaming_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        
+        tracemalloc.start()
+        blocks = list(read_blocks(audio_file))
+        whole_peak = tracemalloc.get_traced_memory()[1]
+        del blocks
+        tracemalloc.stop()
+        
+        print(f"{Path(audio_file).name}: {duration:.0f} с, {segments} сегментов, "
+              f"{duration / elapsed:.0f}x реального времени, "
+              f"пик памяти {streaming_peak / 1e6:.1f} МБ (целиком без передискретизации: {whole_peak / 1e6:.1f} МБ)")
+
+
+BENCHMARKS = {
+    'speculative': lambda args: benchmark_speculative(args[0], args[1], args[2:]),
+    'int16': benchmark_int16,
+    'resample': benchmark_resample,
+    'preprocess': benchmark_preprocess,
+    'server': benchmark_server,
+    'filestream': benchmark_filestream,
+}
+
+
+def main():
+    """Точка входа."""
+    if len(sys.argv) < 2 or sys.argv[1] not in BENCHMARKS:
+        print(__doc__)
+        sys.exit(1)
+    
+    BENCHMARKS[sys.argv[1]](sys.argv[2:])
+
+
+if __name__ == "__main__":
+    main()
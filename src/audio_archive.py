@@ -0,0 +1,174 @@
+"""
+Архив записей диктовок.
+Сжимает записи в FLAC в фоновом пуле потоков и хранит индекс для повторного распознавания.
+"""
+
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import soundfile as sf
+
+from log_manager import get_logger
+
+logger = get_logger(__name__)
+
+
+class AudioArchive:
+    """
+    Архив записей с ограничением размера.
+    
+    Файлы раскладываются по каталогам ГГГГ/ММ/ДД. При превышении лимита
+    удаляются самые старые записи. Кодирование выполняется в пуле потоков,
+    вызывающий поток только ставит задачу.
+    """
+    
+    INDEX_NAME = "archive.sqlite3"
+    COLUMNS = ("id", "created_at", "path", "duration", "bytes", "sample_rate", "text", "model", "language")
+    
+    def __init__(self, archive_dir: Path, max_bytes: int = 2 * 1024 ** 3, workers: int = 1):
+        """
+        Инициализация архива.
+        
+        Args:
+            archive_dir: Каталог архива
+            max_bytes: Максимальный суммарный размер файлов
+            workers: Количество потоков кодирования
+        """
+        self.archive_dir = Path(archive_dir)
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        
+        self.index = sqlite3.connect(self.archive_dir / self.INDEX_NAME, check_same_thread=False)
+        with self.index:
+            self.index.execute(
+                "CREATE TABLE IF NOT EXISTS recordings ("
+                "id INTEGER PRIMARY KEY, "
+                "created_at REAL NOT NULL, "
+                "path TEXT NOT NULL, "
+                "duration REAL, "
+                "bytes INTEGER, "
+                "sample_rate INTEGER, "
+                "text TEXT, "
+                "model TEXT, "
+                "language TEXT)"
+            )
+        
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="votobu-archive")
+    
+    def submit(self, audio: np.ndarray, sample_rate: int, text: Optional[str] = None,
+               model: Optional[str] = None, language: Optional[str] = None) -> None:
+        """
+        Поставить запись в очередь архивации.
+        
+        Args:
+            audio: Аудио int16 или float32 (фреймы × каналы)
+            sample_rate: Частота дискретизации
+            text: Распознанный текст (None - распознавание не удалось)
+            model: Модель, выполнившая распознавание
+            language: Язык распознавания
+        """
+        self.executor.submit(self._store, audio, sample_rate, text, model, language, time.time())
+    
+    def _store(self, audio: np.ndarray, sample_rate: int, text: Optional[str], model: Optional[str],
+               language: Optional[str], created_at: float) -> None:
+        """Закодировать запись в FLAC и добавить в индекс (поток пула)."""
+        try:
+            moment = datetime.fromtimestamp(created_at)
+            relative = Path(moment.strftime("%Y/%m/%d")) / f"{moment.strftime('%H%M%S_%f')}.flac"
+            path = self.archive_dir / relative
+            path.parent.mkdir(parents=True, exist_ok=True)
+            
+            sf.write(str(path), audio, sample_rate, format='FLAC', subtype='PCM_16')
+            size = path.stat().st_size
+            
+            with self.lock, self.index:
+                self.index.execute(
+                    "INSERT INTO recordings (created_at, path, duration, bytes, sample_rate, text, model, language) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (created_at, relative.as_posix(), len(audio) / sample_rate, size, sample_rate,
+                     text, model, language)
+                )
+            self._enforce_limit()
+        except Exception as e:
+            logger.error(f"Ошибка архивации записи: {e}")
+    
+    def _enforce_limit(self) -> None:
+        """Удалить самые старые записи, пока архив превышает лимит."""
+        with self.lock:
+            total = self.index.execute("SELECT COALESCE(SUM(bytes), 0) FROM recordings").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            
+            removed = []
+            for entry_id, relative, size in self.index.execute(
+                "SELECT id, path, bytes FROM recordings ORDER BY id"
+            ).fetchall():
+                if total <= self.max_bytes:
+                    break
+                try:
+                    (self.archive_dir / relative).unlink()
+                except FileNotFoundError:
+                    pass
+                total -= size or 0
+                removed.append((entry_id,))
+            
+            with self.index:
+                self.index.executemany("DELETE FROM recordings WHERE id = ?", removed)
+        logger.info(f"Архив: удалено старых записей: {len(removed)}")
+    
+    def entries(self, limit: int = 100, failed_only: bool = False) -> List[Dict[str, Any]]:
+        """
+        Получить записи архива для повторной обработки.
+        
+        Args:
+            limit: Максимальное количество записей
+            failed_only: Только записи без распознанного текста
+            
+        Returns:
+            Список записей от новых к старым
+        """
+        condition = "WHERE text IS NULL " if failed_only else ""
+        with self.lock:
+            rows = self.index.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM recordings {condition}ORDER BY id DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+        return [dict(zip(self.COLUMNS, row)) for row in rows]
+    
+    def load(self, entry: Dict[str, Any]) -> Tuple[np.ndarray, int]:
+        """
+        Прочитать аудио записи архива.
+        
+        Args:
+            entry: Запись из entries()
+            
+        Returns:
+            Кортеж (аудио float32, частота дискретизации)
+        """
+        return sf.read(str(self.archive_dir / entry['path']), dtype='float32')
+    
+    def close(self) -> None:
+        """Дождаться кодирования поставленных записей и закрыть индекс."""
+        self.executor.shutdown(wait=True)
+        with self.lock:
+            self.index.close()
+
+
+if __name__ == "__main__":
+    # python audio_archive.py [--failed] - список записей архива
+    import sys
+    from config_manager import ConfigManager
+    
+    config_manager = ConfigManager()
+    archive = AudioArchive(config_manager.get('archive_dir') or config_manager.config_dir / "archive")
+    for item in archive.entries(limit=50, failed_only="--failed" in sys.argv):
+        created = datetime.fromtimestamp(item['created_at']).strftime("%d.%m.%Y %H:%M:%S")
+        print(f"{item['id']:6} {created} {item['duration']:6.1f} с  {item['path']}  {item['text'] or '—'}")
+    archive.close()
@@ -0,0 +1,415 @@
+"""
+Предобработка аудио перед распознаванием.
+Фильтр высоких частот, шумоподавление и автоматическая регулировка усиления на NumPy.
+"""
+
+import math
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from capture_buffer import to_float32, from_float32
+from log_manager import get_logger
+
+logger = get_logger(__name__)
+
+
+class PreprocessStage:
+    """
+    Базовый класс этапа предобработки.
+    
+    Этап получает блоки float32 произвольной длины и сохраняет состояние
+    между ними. Задержка этапа (delay) компенсируется: первые delay
+    выходных сэмплов отбрасываются, а flush() выдает хвост, так что
+    длина выхода совпадает с длиной входа.
+    """
+    
+    NAME = ""
+    DESCRIPTION = ""
+    
+    def __init__(self, sample_rate: int):
+        """
+        Инициализация этапа.
+        
+        Args:
+            sample_rate: Частота дискретизации
+        """
+        self.sample_rate = sample_rate
+        self.delay = 0
+        self.padding = 0
+        self.cpu_time = 0.0
+        self.samples = 0
+    
+    def reset(self) -> None:
+        """Сбросить состояние перед новой записью."""
+        self.skip = self.delay
+        self.consumed = 0
+        self.produced = 0
+    
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """
+        Обработать очередной блок.
+        
+        Args:
+            block: Одномерный блок float32
+            
+        Returns:
+            Обработанные сэмплы (может быть пустым, пока заполняется задержка)
+        """
+        output = self._filter(block)
+        if self.skip:
+            dropped = min(self.skip, len(output))
+            output = output[dropped:]
+            self.skip -= dropped
+        self.consumed += len(block)
+        self.produced += len(output)
+        return output
+    
+    def flush(self) -> np.ndarray:
+        """
+        Выдать хвост сигнала в конце записи и сбросить состояние.
+        
+        Returns:
+            Оставшиеся сэмплы
+        """
+        remaining = self.consumed - self.produced
+        if remaining:
+            output = self.process(np.zeros(self.padding, dtype=np.float32))[:remaining]
+        else:
+            output = np.zeros(0, dtype=np.float32)
+        self.reset()
+        return output
+    
+    def _filter(self, block: np.ndarray) -> np.ndarray:
+        """Вычислить выход для блока без учета компенсации задержки."""
+        raise NotImplementedError
+
+
+class HighPassStage(PreprocessStage):
+    """
+    Удаление постоянной составляющей и низкочастотного гула.
+    
+    КИХ-фильтр с линейной фазой (оконный sinc), свертка блока с хвостом
+    предыдущего блока.
+    """
+    
+    NAME = "highpass"
+    DESCRIPTION = "Фильтр высоких частот"
+    
+    def __init__(self, sample_rate: int, cutoff_hz: float = 60.0, taps: int = 511):
+        """
+        Инициализация фильтра.
+        
+        Args:
+            sample_rate: Частота дискретизации
+            cutoff_hz: Частота среза
+            taps: Длина фильтра (нечетная)
+        """
+        super().__init__(sample_rate)
+        n = np.arange(taps) - (taps - 1) / 2
+        cutoff = 2.0 * cutoff_hz / sample_rate
+        lowpass = cutoff * np.sinc(cutoff * n) * np.hamming(taps)
+        lowpass /= lowpass.sum()
+        
+        # Фильтр высоких частот = единичный импульс минус фильтр низких частот
+        self.kernel = -lowpass
+        self.kernel[(taps - 1) // 2] += 1.0
+        self.kernel = self.kernel.astype(np.float32)
+        
+        self.delay = (taps - 1) // 2
+        self.padding = self.delay
+        self.reset()
+    
+    def reset(self) -> None:
+        """Сбросить состояние перед новой записью."""
+        super().reset()
+        self.history = np.zeros(len(self.kernel) - 1, dtype=np.float32)
+    
+    def _filter(self, block: np.ndarray) -> np.ndarray:
+        """Свернуть блок с фильтром."""
+        buffer = np.concatenate((self.history, block))
+        self.history = buffer[len(block):]
+        return np.convolve(buffer, self.kernel, mode='valid').astype(np.float32, copy=False)
+
+
+class NoiseSuppressionStage(PreprocessStage):
+    """
+    Шумоподавление спектральным вычитанием.
+    
+    Спектр шума оценивается по первым кадрам записи (пауза между нажатием
+    клавиши и началом речи) и затем медленно уточняется по тихим кадрам.
+    Кадры с перекрытием 50% и окном sqrt-Hann восстанавливаются сложением
+    без искажений.
+    """
+    
+    NAME = "denoise"
+    DESCRIPTION = "Шумоподавление"
+    
+    # Длительность кадра и начального участка для оценки шума (секунды)
+    FRAME_SECONDS = 0.032
+    SEED_SECONDS = 0.25
+    
+    # Коэффициент вычитания, минимальное усиление и сглаживание оценки шума
+    OVER_SUBTRACTION = 2.0
+    GAIN_FLOOR = 0.1
+    NOISE_SMOOTHING = 0.95
+    
+    # Кадр считается тихим, если его мощность в среднем по частотам
+    # превышает оценку шума не больше чем в это число раз
+    QUIET_RATIO = 2.0
+    
+    def __init__(self, sample_rate: int):
+        """
+        Инициализация шумоподавления.
+        
+        Args:
+            sample_rate: Частота дискретизации
+        """
+        super().__init__(sample_rate)
+        self.frame = 1 << max(int(self.FRAME_SECONDS * sample_rate) - 1, 1).bit_length()
+        self.hop = self.frame // 2
+        self.window = np.sqrt(0.5 - 0.5 * np.cos(2 * np.pi * np.arange(self.frame) / self.frame)).astype(np.float32)
+        self.seed_frames = max(int(self.SEED_SECONDS * sample_rate / self.hop), 1)
+        
+        self.delay = self.hop
+        self.padding = self.frame
+        self.reset()
+    
+    def reset(self) -> None:
+        """Сбросить состояние перед новой записью."""
+        super().reset()
+        bins = self.frame // 2 + 1
+        self.pending = np.zeros(self.hop, dtype=np.float32)
+        self.overlap = np.zeros(self.hop, dtype=np.float32)
+        self.noise_power = np.zeros(bins, dtype=np.float32)
+        self.seeded = 0
+    
+    def _update_noise(self, power: np.ndarray) -> np.ndarray:
+        """
+        Обновить оценку спектра шума по кадрам блока.
+        
+        Args:
+            power: Спектры мощности кадров (кадры × частоты)
+            
+        Returns:
+            Оценка шума для каждого кадра (кадры × частоты)
+        """
+        noise = np.empty_like(power)
+        start = 0
+        
+        # Начальные кадры: накопительное среднее
+        if self.seeded < self.seed_frames:
+            take = min(self.seed_frames - self.seeded, len(power))
+            counts = np.arange(self.seeded + 1, self.seeded + take + 1, dtype=np.float32)[:, None]
+            cumulative = np.cumsum(power[:take], axis=0) + self.noise_power * self.seeded
+            noise[:take] = cumulative / counts
+            self.noise_power = noise[take - 1].copy()
+            self.seeded += take
+            start = take
+        
+        # Остальные кадры: оценка блока, уточненная по его тихим кадрам
+        if start < len(power):
+            rest = power[start:]
+            noise[start:] = self.noise_power
+            quiet = (rest / np.maximum(self.noise_power, 1e-12)).mean(axis=1) <= self.QUIET_RATIO
+            if quiet.any():
+                self.noise_power = (self.NOISE_SMOOTHING * self.noise_power
+                                    + (1 - self.NOISE_SMOOTHING) * rest[quiet].mean(axis=0))
+        return noise
+    
+    def _filter(self, block: np.ndarray) -> np.ndarray:
+        """Обработать все полные кадры и сложить их с перекрытием."""
+        buffer = np.concatenate((self.pending, block))
+        count = (len(buffer) - self.frame) // self.hop + 1 if len(buffer) >= self.frame else 0
+        if count <= 0:
+            self.pending = buffer
+            return np.zeros(0, dtype=np.float32)
+        
+        frames = sliding_window_view(buffer, self.frame)[::self.hop][:count]
+        spectrum = np.fft.rfft(frames * self.window, axis=1)
+        power = spectrum.real ** 2 + spectrum.imag ** 2
+        noise = self._update_noise(power.astype(np.float32))
+        
+        gain = np.sqrt(np.maximum(1.0 - self.OVER_SUBTRACTION * noise / np.maximum(power, 1e-12),
+                                  self.GAIN_FLOOR ** 2))
+        restored = np.fft.irfft(spectrum * gain, n=self.frame, axis=1).astype(np.float32) * self.window
+        
+        # Сложение с перекрытием: первая половина кадра + вторая половина предыдущего
+        tails = np.concatenate((self.overlap[None, :], restored[:-1, self.hop:]))
+        output = (restored[:, :self.hop] + tails).reshape(-1)
+        self.overlap = restored[-1, self.hop:].copy()
+        self.pending = buffer[count * self.hop:]
+        return output
+
+
+class GainStage(PreprocessStage):
+    """
+    Автоматическая регулировка усиления.
+    
+    Уровень речи отслеживается по RMS блоков выше порога тишины с быстрой
+    атакой и медленным спадом. Усиление меняется плавно внутри блока и
+    ограничивается так, чтобы пик блока не превышал полную шкалу.
+    """
+    
+    NAME = "agc"
+    DESCRIPTION = "Автоматическая регулировка усиления"
+    
+    # Целевой уровень, порог тишины и пределы усиления (дБ)
+    TARGET_DB = -20.0
+    GATE_DB = -50.0
+    MAX_GAIN_DB = 24.0
+    MIN_GAIN_DB = -12.0
+    
+    # Постоянные времени роста и спада оценки уровня (секунды)
+    ATTACK_SECONDS = 0.1
+    RELEASE_SECONDS = 1.0
+    
+    # Допустимый пик после усиления (доля полной шкалы)
+    PEAK_LIMIT = 0.98
+    
+    def reset(self) -> None:
+        """Сбросить состояние перед новой записью."""
+        super().reset()
+        self.level_db: Optional[float] = None
+        self.gain = 1.0
+    
+    def _filter(self, block: np.ndarray) -> np.ndarray:
+        """Усилить блок с плавным переходом от прошлого усиления."""
+        if not len(block):
+            return block
+        
+        energy = float(np.dot(block, block)) / len(block)
+        level_db = 10.0 * math.log10(energy) if energy > 0 else -120.0
+        if level_db > self.GATE_DB:
+            if self.level_db is None:
+                self.level_db = level_db
+            else:
+                tau = self.ATTACK_SECONDS if level_db > self.level_db else self.RELEASE_SECONDS
+                coeff = math.exp(-len(block) / (tau * self.sample_rate))
+                self.level_db = coeff * self.level_db + (1.0 - coeff) * level_db
+        
+        gain = self.gain
+        if self.level_db is not None:
+            gain_db = min(max(self.TARGET_DB - self.level_db, self.MIN_GAIN_DB), self.MAX_GAIN_DB)
+            gain = 10.0 ** (gain_db / 20.0)
+        peak = float(np.abs(block).max())
+        if peak * gain > self.PEAK_LIMIT:
+            gain = self.PEAK_LIMIT / peak
+        
+        ramp = np.linspace(self.gain, gain, len(block), dtype=np.float32)
+        self.gain = gain
+        return block * ramp
+
+
+# Этапы в порядке применения: шумоподавление до усиления, чтобы не усиливать шум
+STAGES = {
+    stage.NAME: stage
+    for stage in (HighPassStage, NoiseSuppressionStage, GainStage)
+}
+
+
+class AudioPreprocessor:
+    """
+    Цепочка этапов предобработки для одного канала.
+    
+    Вызывается в потоке обработки захвата для каждого блока, поэтому к
+    отпусканию клавиши запись уже обработана. Для каждого этапа учитывается
+    процессорное время потока.
+    """
+    
+    def __init__(self, stages: List[PreprocessStage]):
+        """
+        Инициализация цепочки.
+        
+        Args:
+            stages: Этапы в порядке применения
+        """
+        self.stages = stages
+        self.reset()
+    
+    @property
+    def names(self) -> List[str]:
+        """Имена этапов цепочки."""
+        return [stage.NAME for stage in self.stages]
+    
+    def reset(self) -> None:
+        """Сбросить состояние и счетчики перед новой записью."""
+        for stage in self.stages:
+            stage.reset()
+            stage.cpu_time = 0.0
+            stage.samples = 0
+    
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """
+        Обработать блок всеми этапами.
+        
+        Args:
+            block: Одномерный блок int16 или float32
+            
+        Returns:
+            Обработанные сэмплы того же типа, что вход
+        """
+        samples = to_float32(block)
+        for stage in self.stages:
+            start = time.thread_time()
+            stage.samples += len(samples)
+            samples = stage.process(samples)
+            stage.cpu_time += time.thread_time() - start
+        return from_float32(samples, block.dtype)
+    
+    def flush(self, dtype=np.float32) -> np.ndarray:
+        """
+        Выдать хвосты всех этапов в конце записи.
+        
+        Args:
+            dtype: Тип выходных сэмплов (int16 или float32)
+            
+        Returns:
+            Оставшиеся сэмплы
+        """
+        samples = np.zeros(0, dtype=np.float32)
+        for stage in self.stages:
+            start = time.thread_time()
+            stage.samples += len(samples)
+            samples = np.concatenate((stage.process(samples), stage.flush()))
+            stage.cpu_time += time.thread_time() - start
+        return from_float32(samples, np.dtype(dtype))
+    
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Получить затраты процессора по этапам за последнюю запись.
+        
+        Returns:
+            Имя этапа → процессорное время (мс) и доля от длительности аудио
+        """
+        stats = {}
+        for stage in self.stages:
+            seconds = stage.samples / stage.sample_rate
+            stats[stage.NAME] = {
+                'cpu_ms': round(stage.cpu_time * 1000, 2),
+                'realtime_factor': round(stage.cpu_time / seconds, 5) if seconds else 0.0,
+            }
+        return stats
+
+
+def create_preprocessor(names: List[str], sample_rate: int) -> Optional[AudioPreprocessor]:
+    """
+    Создать цепочку предобработки по списку этапов.
+    
+    Этапы всегда применяются в порядке STAGES, неизвестные имена пропускаются.
+    
+    Args:
+        names: Имена этапов из STAGES
+        sample_rate: Частота дискретизации
+        
+    Returns:
+        Цепочка или None, если этапов нет
+    """
+    unknown = set(names) - set(STAGES)
+    if unknown:
+        logger.warning(f"Неизвестные этапы предобработки: {', '.join(sorted(unknown))}")
+    
+    stages = [stage(sample_rate) for name, stage in STAGES.items() if name in names]
+    return AudioPreprocessor(stages) if stages else None
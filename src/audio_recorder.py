@@ -6,44 +6,351 @@
 import sounddevice as sd
 import soundfile as sf
 import numpy as np
+import math
+import queue
 import tempfile
 import threading
+import time
 from pathlib import Path
-from typing import Optional, Callable
+from typing import Optional, Callable, Dict, Any, List
+
+from audio_preprocessor import AudioPreprocessor, STAGES, create_preprocessor
+from capture_buffer import CaptureBuffer, PCM16_SCALE
+from resampler import StreamingResampler
+from log_manager import get_logger
+
+logger = get_logger(__name__)
+
+
+class CaptureStats:
+    """Статистика здоровья захвата аудио за одну запись."""
+    
+    __slots__ = (
+        'callbacks', 'frames', 'overflows', 'underflows', 'dropped_frames',
+        'last_callback_time', 'last_adc_time', 'last_frames', 'max_jitter', 'jitter_sum',
+        'callback_time_total', 'callback_time_max', 'blocksize', 'latency',
+    )
+    
+    def __init__(self):
+        """Инициализация статистики."""
+        self.reset()
+    
+    def reset(self, blocksize: int = 0, latency: str = 'low') -> None:
+        """
+        Обнулить статистику перед новой записью.
+        
+        Args:
+            blocksize: Размер блока потока (0 - выбирает PortAudio)
+            latency: Задержка потока PortAudio
+        """
+        self.callbacks = 0
+        self.frames = 0
+        self.overflows = 0
+        self.underflows = 0
+        self.dropped_frames = 0.0
+        self.last_callback_time = 0.0
+        self.last_adc_time = 0.0
+        self.last_frames = 0
+        self.max_jitter = 0.0
+        self.jitter_sum = 0.0
+        self.callback_time_total = 0.0
+        self.callback_time_max = 0.0
+        self.blocksize = blocksize
+        self.latency = latency
+    
+    def to_dict(self, sample_rate: int) -> Dict[str, Any]:
+        """
+        Получить статистику в виде словаря.
+        
+        Args:
+            sample_rate: Частота дискретизации записи
+            
+        Returns:
+            Счетчики, джиттер и время callback в миллисекундах
+        """
+        callbacks = max(self.callbacks, 1)
+        return {
+            'callbacks': self.callbacks,
+            'frames': self.frames,
+            'sample_rate': sample_rate,
+            'overflows': self.overflows,
+            'underflows': self.underflows,
+            'dropped_frames': int(self.dropped_frames),
+            'dropped_ms': round(self.dropped_frames / sample_rate * 1000, 1),
+            'jitter_mean_ms': round(self.jitter_sum / callbacks * 1000, 3),
+            'jitter_max_ms': round(self.max_jitter * 1000, 3),
+            'callback_mean_us': round(self.callback_time_total / callbacks * 1e6, 1),
+            'callback_max_us': round(self.callback_time_max * 1e6, 1),
+            'blocksize': self.blocksize,
+            'latency': self.latency,
+        }
 
 
 class AudioRecorder:
     """Класс для записи аудио с микрофона."""
     
-    def __init__(self, sample_rate: int = 16000, channels: int = 1):
+    # Размер кольцевого буфера статусов callback
+    STATUS_RING_SIZE = 64
+    
+    # Биты флагов статуса в кольцевом буфере
+    FLAG_INPUT_OVERFLOW = 1
+    FLAG_INPUT_UNDERFLOW = 2
+    
+    # Ступени увеличения блока и задержки потока при переполнениях
+    BLOCKSIZE_STEPS = [0, 1024, 2048, 4096]
+    
+    # Нижняя граница шкалы уровня входа (dBFS)
+    LEVEL_FLOOR_DB = -60.0
+    
+    def __init__(self, sample_rate: int = 16000, channels: int = 1, spill_dir: Optional[Path] = None,
+                 ram_limit_mb: int = 64, native_rate: bool = True,
+                 preprocess_stages: Optional[List[str]] = None):
         """
         Инициализация рекордера.
         
         Args:
             sample_rate: Частота дискретизации (16kHz для Whisper)
             channels: Количество каналов (1 для моно)
+            spill_dir: Каталог для выгрузки длинных записей (по умолчанию - временный)
+            ram_limit_mb: Объем записи в памяти, после которого она выгружается на диск
+            native_rate: Захватывать на частоте устройства и передискретизировать в sample_rate
+            preprocess_stages: Этапы предобработки (см. audio_preprocessor.STAGES)
         """
         self.sample_rate = sample_rate
         self.channels = channels
+        self.native_rate = native_rate
+        self.preprocess_stages = list(preprocess_stages or [])
         self.recording = False
-        self.audio_data = []
         self.stream = None
+        
+        # Буфер текущей записи и буфер последней завершенной записи
+        self.spill_dir = Path(spill_dir) if spill_dir else Path(tempfile.gettempdir()) / "votobu_capture"
+        self.ram_limit_bytes = ram_limit_mb * 1024 * 1024
+        self.buffer: Optional[CaptureBuffer] = None
+        self.last_buffer: Optional[CaptureBuffer] = None
         self.temp_file = None
+        self.first_sample_time: Optional[float] = None
+        
+        # Аудио последней записи (int16, может быть numpy.memmap)
+        self.last_audio: Optional[np.ndarray] = None
+        
+        # Кольцевой буфер статусов PortAudio: [время, флаги].
+        # Callback только пишет в заранее выделенный массив, лог пишется вне его.
+        self.status_ring = np.zeros((self.STATUS_RING_SIZE, 2), dtype=np.float64)
+        self.status_written = 0
+        self.status_read = 0
+        
+        # Статистика здоровья захвата и параметры потока
+        self.stats = CaptureStats()
+        self.blocksize_step = 0
+        self.latency = 'low'
         
-    def _audio_callback(self, indata, frames, time, status):
+        # RMS последнего блока (пишет callback, читает индикатор уровня).
+        # Первый канал блока копируется в заранее выделенный float32 буфер.
+        self.level_rms = 0.0
+        self.level_scratch = np.empty(2 * self.BLOCKSIZE_STEPS[-1], dtype=np.float32)
+        
+        # Частота потока PortAudio. Передискретизация и предобработка выполняются
+        # в отдельном потоке (по экземпляру на канал): callback только кладет
+        # копию блока в очередь
+        self.stream_rate = sample_rate
+        self.resamplers: List[StreamingResampler] = []
+        self.preprocessors: List[AudioPreprocessor] = []
+        self.raw_blocks: "queue.SimpleQueue" = queue.SimpleQueue()
+        self.process_thread: Optional[threading.Thread] = None
+        
+        # Получатель обработанных блоков во время записи (непрерывная диктовка);
+        # вызывается из потока обработки, не из callback PortAudio
+        self.block_listener: Optional[Callable[[np.ndarray], None]] = None
+        
+    def _audio_callback(self, indata, frames, time_info, status):
         """
         Callback функция для обработки аудио данных.
         
+        Выполняется в потоке реального времени PortAudio: здесь нельзя
+        писать в лог или консоль, только копировать данные и счетчики.
+        
         Args:
             indata: Входящие аудио данные
             frames: Количество фреймов
-            time: Временная информация
+            time_info: Временная информация PortAudio
             status: Статус записи
         """
+        now = time.perf_counter()
+        stats = self.stats
+        interval = now - stats.last_callback_time if stats.last_callback_time else 0.0
+        expected = stats.last_frames / self.stream_rate
+        
+        # Джиттер интервала между вызовами относительно длины прошлого блока
+        if interval:
+            jitter = abs(interval - expected)
+            stats.jitter_sum += jitter
+            if jitter > stats.max_jitter:
+                stats.max_jitter = jitter
+        
+        # Потерянные фреймы: разрыв во времени АЦП между блоками
+        adc_time = time_info.inputBufferAdcTime
+        if adc_time and stats.last_adc_time:
+            gap = adc_time - stats.last_adc_time - expected
+            if gap * self.stream_rate > 1.0:
+                stats.dropped_frames += gap * self.stream_rate
+        elif status.input_overflow and interval > expected:
+            # Драйвер не сообщает время АЦП - оценить по интервалу вызовов
+            stats.dropped_frames += (interval - expected) * self.stream_rate
+        
+        stats.last_callback_time = now
+        stats.last_adc_time = adc_time
+        stats.last_frames = frames
+        stats.callbacks += 1
+        stats.frames += frames
+        
         if status:
-            print(f"Статус записи: {status}")
+            if status.input_overflow:
+                stats.overflows += 1
+            if status.input_underflow:
+                stats.underflows += 1
+            slot = self.status_written % self.STATUS_RING_SIZE
+            self.status_ring[slot, 0] = now
+            self.status_ring[slot, 1] = (
+                self.FLAG_INPUT_OVERFLOW * status.input_overflow
+                + self.FLAG_INPUT_UNDERFLOW * status.input_underflow
+            )
+            self.status_written += 1
         if self.recording:
-            self.audio_data.append(indata.copy())
+            if self.first_sample_time is None:
+                self.first_sample_time = now
+            if self.process_thread is None:
+                self.buffer.append(indata.copy())
+            else:
+                self.raw_blocks.put_nowait(indata.copy())
+            
+            # Уровень входа: RMS первого канала (int16 → доли полной шкалы)
+            if frames > len(self.level_scratch):
+                # Только если PortAudio выдал блок больше обычного
+                self.level_scratch = np.empty(frames, dtype=np.float32)
+            samples = self.level_scratch[:frames]
+            np.copyto(samples, indata[:, 0])
+            energy = float(np.dot(samples, samples))
+            self.level_rms = math.sqrt(energy / frames) * PCM16_SCALE if frames else 0.0
+        
+        # Время выполнения самого callback
+        elapsed = time.perf_counter() - now
+        stats.callback_time_total += elapsed
+        if elapsed > stats.callback_time_max:
+            stats.callback_time_max = elapsed
+    
+    def _device_rate(self) -> int:
+        """Получить частоту по умолчанию устройства ввода (sample_rate при ошибке)."""
+        if not self.native_rate:
+            return self.sample_rate
+        try:
+            return int(sd.query_devices(kind='input')['default_samplerate'])
+        except Exception as e:
+            logger.warning(f"Не удалось определить частоту устройства: {e}")
+            return self.sample_rate
+    
+    def set_preprocess_stages(self, stages: List[str]) -> None:
+        """
+        Изменить этапы предобработки (применяется со следующей записи).
+        
+        Args:
+            stages: Этапы предобработки
+        """
+        self.preprocess_stages = list(stages)
+    
+    def set_block_listener(self, listener: Optional[Callable[[np.ndarray], None]]) -> None:
+        """
+        Установить получателя блоков записи (применяется со следующей записи).
+        
+        Args:
+            listener: Функция, получающая каждый обработанный блок (фреймы × каналы,
+                      int16, sample_rate) или None
+        """
+        self.block_listener = listener
+    
+    def _prepare_processing(self) -> None:
+        """Подготовить передискретизацию, предобработку и поток обработки."""
+        # Фильтры строятся один раз для пары частот, между записями только сбрасываются
+        if self.stream_rate == self.sample_rate:
+            self.resamplers = []
+        elif not self.resamplers or self.resamplers[0].in_rate != self.stream_rate:
+            self.resamplers = [
+                StreamingResampler(self.stream_rate, self.sample_rate)
+                for _ in range(self.channels)
+            ]
+            logger.info(f"Захват на частоте устройства {self.stream_rate} Гц → {self.sample_rate} Гц")
+        else:
+            for resampler in self.resamplers:
+                resampler.reset()
+        
+        stages = [name for name in STAGES if name in self.preprocess_stages]
+        if not stages:
+            self.preprocessors = []
+        elif not self.preprocessors or self.preprocessors[0].names != stages:
+            self.preprocessors = [
+                create_preprocessor(stages, self.sample_rate)
+                for _ in range(self.channels)
+            ]
+        else:
+            for preprocessor in self.preprocessors:
+                preprocessor.reset()
+        
+        if not self.resamplers and not self.preprocessors and self.block_listener is None:
+            self.process_thread = None
+            return
+        
+        self.raw_blocks = queue.SimpleQueue()
+        self.process_thread = threading.Thread(target=self._process_loop, daemon=True)
+        self.process_thread.start()
+    
+    def _process_channel(self, channel: int, samples: np.ndarray) -> np.ndarray:
+        """Передискретизировать и предобработать блок одного канала."""
+        if self.resamplers:
+            samples = self.resamplers[channel].process(samples)
+        if self.preprocessors:
+            samples = self.preprocessors[channel].process(samples)
+        return samples
+    
+    def _process_loop(self) -> None:
+        """Обрабатывать блоки из callback и добавлять их в буфер записи."""
+        buffer = self.buffer
+        listener = self.block_listener
+        while True:
+            block = self.raw_blocks.get()
+            if block is None:
+                break
+            output = block
+            if self.resamplers or self.preprocessors:
+                output = np.stack(
+                    [self._process_channel(channel, block[:, channel]) for channel in range(self.channels)],
+                    axis=1
+                )
+            if len(output):
+                buffer.append(output)
+                if listener is not None:
+                    listener(output)
+        
+        # Хвосты фильтров в конце записи
+        tails = []
+        for channel in range(self.channels):
+            tail = self.resamplers[channel].flush(np.int16) if self.resamplers else np.zeros(0, dtype=np.int16)
+            if self.preprocessors:
+                preprocessor = self.preprocessors[channel]
+                tail = np.concatenate((preprocessor.process(tail), preprocessor.flush(np.int16)))
+            tails.append(tail)
+        tail = np.stack(tails, axis=1)
+        if len(tail):
+            buffer.append(tail)
+            if listener is not None:
+                listener(tail)
+    
+    def _stop_processing(self) -> None:
+        """Дождаться обработки оставшихся блоков после остановки потока."""
+        if self.process_thread is None:
+            return
+        self.raw_blocks.put_nowait(None)
+        self.process_thread.join()
+        self.process_thread = None
     
     def start(self) -> bool:
         """
@@ -56,49 +363,98 @@ class AudioRecorder:
             return False
         
         try:
-            self.audio_data = []
+            self.buffer = CaptureBuffer(
+                self.spill_dir,
+                self.sample_rate,
+                self.channels,
+                'int16',
+                self.ram_limit_bytes
+            )
+            self.buffer.start()
+            self.first_sample_time = None
+            self.level_rms = 0.0
+            blocksize = self.BLOCKSIZE_STEPS[self.blocksize_step]
+            self.stats.reset(blocksize, self.latency)
+            self.stream_rate = self._device_rate()
+            self._prepare_processing()
             self.recording = True
             
             # Создать поток для записи
             self.stream = sd.InputStream(
                 callback=self._audio_callback,
                 channels=self.channels,
-                samplerate=self.sample_rate,
-                dtype=np.float32
+                samplerate=self.stream_rate,
+                dtype=np.int16,
+                blocksize=blocksize,
+                latency=self.latency
             )
             self.stream.start()
-            print("Запись началась...")
+            logger.info("Запись началась...")
             return True
         except Exception as e:
-            print(f"Ошибка начала записи: {e}")
+            logger.error(f"Ошибка начала записи: {e}")
             self.recording = False
+            if self.stream is not None:
+                self.stream.close()
+                self.stream = None
+            self._stop_processing()
+            if self.buffer is not None:
+                self.buffer.finish()
+                self.buffer.discard()
+                self.buffer = None
             return False
     
-    def stop(self) -> Optional[str]:
+    def stop_buffer(self) -> Optional[np.ndarray]:
         """
-        Остановить запись и сохранить в временный файл.
+        Остановить запись без сохранения в файл.
         
         Returns:
-            Путь к сохраненному аудио файлу или None в случае ошибки
+            Аудио (фреймы × каналы): массив в памяти или numpy.memmap
+            для длинных записей; None если данных нет или произошла ошибка
         """
         if not self.recording:
             return None
         
         try:
             self.recording = False
+            self.last_buffer = None
             
             if self.stream:
                 self.stream.stop()
                 self.stream.close()
                 self.stream = None
+            self._stop_processing()
             
-            if not self.audio_data:
-                print("Нет данных для сохранения")
-                return None
+            self.drain_status_log()
+            self._adjust_stream_params()
             
-            # Объединить все чанки аудио
-            audio_array = np.concatenate(self.audio_data, axis=0)
+            buffer, self.buffer = self.buffer, None
+            audio_array = buffer.finish()
+            self.last_audio = audio_array
             
+            if audio_array is None:
+                buffer.discard()
+                logger.info("Нет данных для сохранения")
+            else:
+                self.last_buffer = buffer
+            return audio_array
+            
+        except Exception as e:
+            logger.error(f"Ошибка остановки записи: {e}")
+            return None
+    
+    def stop(self) -> Optional[str]:
+        """
+        Остановить запись и сохранить в временный файл.
+        
+        Returns:
+            Путь к сохраненному аудио файлу или None в случае ошибки
+        """
+        audio_array = self.stop_buffer()
+        if audio_array is None:
+            return None
+        
+        try:
             # Создать временный файл
             temp_file = tempfile.NamedTemporaryFile(
                 delete=False,
@@ -117,13 +473,74 @@ class AudioRecorder:
             )
             
             self.temp_file = temp_file.name
-            print(f"Запись сохранена: {self.temp_file}")
+            logger.info(f"Запись сохранена: {self.temp_file}")
             return self.temp_file
             
         except Exception as e:
-            print(f"Ошибка остановки записи: {e}")
+            logger.error(f"Ошибка остановки записи: {e}")
             return None
     
+    def get_level(self) -> float:
+        """
+        Получить текущий уровень входного сигнала.
+        
+        Returns:
+            Уровень от 0 до 1 (логарифмическая шкала от LEVEL_FLOOR_DB до 0 dBFS)
+        """
+        rms = self.level_rms
+        if not self.recording or rms <= 0.0:
+            return 0.0
+        db = 20.0 * math.log10(rms)
+        return min(max(1.0 - db / self.LEVEL_FLOOR_DB, 0.0), 1.0)
+    
+    def get_capture_stats(self) -> Dict[str, Any]:
+        """
+        Получить статистику захвата последней записи.
+        
+        Returns:
+            Переполнения, потерянные фреймы, джиттер, время callback
+            и затраты процессора на этапы предобработки
+        """
+        stats = self.stats.to_dict(self.stream_rate)
+        if self.preprocessors:
+            stats['preprocess'] = self.preprocessors[0].get_stats()
+        return stats
+    
+    def _adjust_stream_params(self) -> None:
+        """Увеличить блок и задержку потока, если в записи были переполнения."""
+        if not self.stats.overflows:
+            return
+        
+        if self.latency != 'high':
+            self.latency = 'high'
+        elif self.blocksize_step < len(self.BLOCKSIZE_STEPS) - 1:
+            self.blocksize_step += 1
+        else:
+            return
+        
+        logger.warning(
+            f"Переполнения входа ({self.stats.overflows}): следующая запись с "
+            f"blocksize={self.BLOCKSIZE_STEPS[self.blocksize_step]}, latency={self.latency}"
+        )
+    
+    def drain_status_log(self) -> None:
+        """Вывести в лог накопленные статусы callback (вне потока реального времени)."""
+        written = self.status_written
+        lost = max(0, written - self.status_read - self.STATUS_RING_SIZE)
+        if lost:
+            logger.warning(f"Статусов записи не попало в лог: {lost}")
+            self.status_read = written - self.STATUS_RING_SIZE
+        
+        overflows = underflows = 0
+        while self.status_read < written:
+            flags = int(self.status_ring[self.status_read % self.STATUS_RING_SIZE, 1])
+            overflows += bool(flags & self.FLAG_INPUT_OVERFLOW)
+            underflows += bool(flags & self.FLAG_INPUT_UNDERFLOW)
+            self.status_read += 1
+        
+        if overflows or underflows:
+            logger.warning(f"Статус записи: переполнений входа {overflows}, опустошений {underflows}")
+    
     def is_recording(self) -> bool:
         """
         Проверить, идет ли запись.
@@ -133,14 +550,32 @@ class AudioRecorder:
         """
         return self.recording
     
-    def cleanup(self) -> None:
-        """Очистить временные файлы."""
-        if self.temp_file and Path(self.temp_file).exists():
+    def discard_recording(self, buffer: Optional[CaptureBuffer], temp_file: Optional[str] = None) -> None:
+        """
+        Удалить файлы одной завершенной записи после ее распознавания.
+        
+        Файлы других записей не трогаются: следующая запись может еще
+        ждать распознавания, и ее файл выгрузки нужен для восстановления.
+        
+        Args:
+            buffer: Буфер записи (last_buffer после stop_buffer/stop) или None
+            temp_file: Временный WAV файл записи (результат stop) или None
+        """
+        if buffer is not None:
+            buffer.discard()
+            if buffer is self.last_buffer:
+                self.last_buffer = None
+        
+        if temp_file and Path(temp_file).exists():
             try:
-                Path(self.temp_file).unlink()
-                print(f"Временный файл удален: {self.temp_file}")
+                Path(temp_file).unlink()
+                logger.info(f"Временный файл удален: {temp_file}")
             except Exception as e:
-                print(f"Ошибка удаления временного файла: {e}")
-            finally:
-                self.temp_file = None
+                logger.error(f"Ошибка удаления временного файла: {e}")
+        if temp_file == self.temp_file:
+            self.temp_file = None
+    
+    def cleanup(self) -> None:
+        """Очистить временный файл и файлы выгрузки последней записи."""
+        self.discard_recording(self.last_buffer, self.temp_file)
 
@@ -0,0 +1,188 @@
+"""
+Потоковое чтение аудио файлов.
+Файл читается блоками, передискретизируется на лету и режется на сегменты по паузам.
+"""
+
+import subprocess
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+import soundfile as sf
+
+from capture_buffer import to_float32
+from log_manager import get_logger
+from resampler import StreamingResampler
+
+logger = get_logger(__name__)
+
+# Частота дискретизации Whisper
+SAMPLE_RATE = 16000
+
+# Длительность блока чтения (секунды); от нее зависят и промежуточные
+# массивы передискретизатора
+BLOCK_SECONDS = 1
+
+
+class PauseSegmenter:
+    """
+    Нарезка потока 16 кГц на сегменты не длиннее окна Whisper.
+    
+    Когда накоплено больше max_samples, сегмент обрезается по самому
+    тихому кадру в последних секундах окна. В памяти хранится не больше
+    одного окна и одного входного блока.
+    """
+    
+    def __init__(self, max_samples: int = 30 * SAMPLE_RATE, search_samples: int = 3 * SAMPLE_RATE,
+                 frame_samples: int = SAMPLE_RATE // 50):
+        """
+        Инициализация нарезки.
+        
+        Args:
+            max_samples: Максимальная длина сегмента
+            search_samples: Зона поиска паузы в конце окна
+            frame_samples: Длина кадра оценки энергии
+        """
+        self.max_samples = max_samples
+        self.search_samples = search_samples
+        self.frame_samples = frame_samples
+        self.chunks: List[np.ndarray] = []
+        self.buffered = 0
+        self.offset = 0
+    
+    def _find_pause(self, audio: np.ndarray) -> int:
+        """Найти середину самого тихого кадра в конце окна."""
+        frame = self.frame_samples
+        search_start = self.max_samples - self.search_samples
+        search = audio[search_start:self.max_samples]
+        energy = np.square(search[:len(search) // frame * frame].reshape(-1, frame)).sum(axis=1)
+        return search_start + int(np.argmin(energy)) * frame + frame // 2
+    
+    def push(self, chunk: np.ndarray) -> List[Tuple[int, np.ndarray]]:
+        """
+        Добавить блок и получить готовые сегменты.
+        
+        Args:
+            chunk: Одномерный блок float32 16 кГц
+            
+        Returns:
+            Список (смещение начала в сэмплах, сегмент)
+        """
+        if len(chunk):
+            self.chunks.append(chunk)
+            self.buffered += len(chunk)
+        
+        segments = []
+        while self.buffered > self.max_samples:
+            audio = np.concatenate(self.chunks)
+            cut = self._find_pause(audio)
+            segments.append((self.offset, audio[:cut].copy()))
+            self.offset += cut
+            self.chunks = [audio[cut:]]
+            self.buffered = len(audio) - cut
+        return segments
+    
+    def flush(self) -> Optional[Tuple[int, np.ndarray]]:
+        """
+        Выдать остаток потока и начать заново.
+        
+        Returns:
+            (смещение начала в сэмплах, сегмент) или None, если остатка нет
+        """
+        audio = np.concatenate(self.chunks) if self.chunks else np.zeros(0, dtype=np.float32)
+        segment = (self.offset, audio) if len(audio) else None
+        self.offset += len(audio)
+        self.chunks = []
+        self.buffered = 0
+        return segment
+
+
+def _soundfile_blocks(path: str, block_seconds: float) -> Iterator[Tuple[np.ndarray, int]]:
+    """Читать файл блоками через soundfile (WAV, FLAC, OGG, MP3)."""
+    with sf.SoundFile(path) as audio_file:
+        sample_rate = audio_file.samplerate
+        for block in audio_file.blocks(int(sample_rate * block_seconds), dtype='float32', always_2d=True):
+            yield (block[:, 0] if block.shape[1] == 1 else block.mean(axis=1)), sample_rate
+
+
+def _ffmpeg_blocks(path: str, block_seconds: float) -> Iterator[Tuple[np.ndarray, int]]:
+    """Декодировать файл потоком через ffmpeg (сжатые форматы, видео)."""
+    command = [
+        "ffmpeg", "-nostdin", "-threads", "0", "-i", path,
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE), "-",
+    ]
+    try:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    except FileNotFoundError as e:
+        raise RuntimeError("ffmpeg не найден") from e
+    
+    block_bytes = int(SAMPLE_RATE * block_seconds) * 2
+    try:
+        while True:
+            data = process.stdout.read(block_bytes)
+            if not data:
+                break
+            yield to_float32(np.frombuffer(data[:len(data) // 2 * 2], dtype='<i2')), SAMPLE_RATE
+        if process.wait() != 0:
+            raise RuntimeError(f"ffmpeg не смог декодировать файл (код {process.returncode})")
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+
+
+def read_blocks(path: Union[str, Path], block_seconds: float = BLOCK_SECONDS) -> Iterator[Tuple[np.ndarray, int]]:
+    """
+    Читать аудио файл блоками, не загружая его целиком.
+    
+    Форматы libsndfile читаются через soundfile, остальные декодируются
+    потоком через ffmpeg.
+    
+    Args:
+        path: Путь к файлу
+        block_seconds: Длительность блока в секундах
+        
+    Yields:
+        Кортежи (моно блок float32, частота дискретизации)
+    """
+    path = str(path)
+    try:
+        sf.info(path)
+    except RuntimeError:
+        logger.debug(f"Формат не поддерживается soundfile, декодирование через ffmpeg: {path}")
+        yield from _ffmpeg_blocks(path, block_seconds)
+        return
+    yield from _soundfile_blocks(path, block_seconds)
+
+
+def iter_file_segments(path: Union[str, Path], segmenter: Optional[PauseSegmenter] = None,
+                       block_seconds: float = BLOCK_SECONDS) -> Iterator[Tuple[float, np.ndarray]]:
+    """
+    Читать файл сегментами 16 кГц, разрезанными по паузам.
+    
+    Память ограничена одним окном сегмента и одним блоком чтения
+    независимо от длины файла.
+    
+    Args:
+        path: Путь к файлу
+        segmenter: Нарезка (по умолчанию - окна Whisper по 30 секунд)
+        block_seconds: Длительность блока чтения в секундах
+        
+    Yields:
+        Кортежи (время начала сегмента в секундах, сегмент float32 16 кГц)
+    """
+    segmenter = segmenter or PauseSegmenter()
+    resampler = None
+    for block, sample_rate in read_blocks(path, block_seconds):
+        if resampler is None:
+            resampler = StreamingResampler(sample_rate, SAMPLE_RATE)
+        for offset, segment in segmenter.push(resampler.process(block)):
+            yield offset / SAMPLE_RATE, segment
+    
+    if resampler is not None:
+        for offset, segment in segmenter.push(resampler.flush(np.float32)):
+            yield offset / SAMPLE_RATE, segment
+    tail = segmenter.flush()
+    if tail is not None:
+        yield tail[0] / SAMPLE_RATE, tail[1]
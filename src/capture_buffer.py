@@ -0,0 +1,274 @@
+"""
+Буфер захвата аудио.
+Держит запись в памяти до порога, затем сбрасывает ее в файл на диске.
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+from log_manager import get_logger
+
+logger = get_logger(__name__)
+
+# Масштаб PCM16 → float32 в диапазоне [-1, 1)
+PCM16_SCALE = 1.0 / 32768.0
+
+
+def to_float32(audio: np.ndarray) -> np.ndarray:
+    """
+    Преобразовать сэмплы в float32 одним векторным проходом.
+    
+    Подходит как для всей записи перед распознаванием, так и для
+    отдельных блоков при потоковой обработке.
+    
+    Args:
+        audio: Сэмплы int16 или float32 (в т.ч. numpy.memmap)
+        
+    Returns:
+        Массив float32 (float32 на входе возвращается без копирования)
+    """
+    if audio.dtype == np.float32:
+        return audio
+    if audio.dtype == np.int16:
+        return np.multiply(audio, np.float32(PCM16_SCALE), dtype=np.float32)
+    return audio.astype(np.float32)
+
+
+def from_float32(audio: np.ndarray, dtype: np.dtype) -> np.ndarray:
+    """
+    Вернуть сэмплы float32 к исходному типу.
+    
+    Args:
+        audio: Сэмплы float32 в диапазоне [-1, 1)
+        dtype: Тип результата (int16 - с округлением и ограничением)
+        
+    Returns:
+        Массив заданного типа (для float32 - без копирования)
+    """
+    if dtype == np.int16:
+        return np.clip(np.rint(audio * 32768.0), -32768, 32767).astype(np.int16)
+    return audio
+
+
+class CaptureBuffer:
+    """
+    Буфер одной записи с выгрузкой на диск.
+    
+    Callback PortAudio только добавляет блоки в список. Фоновый поток
+    дописывает накопленные блоки в файл, когда объем в памяти превышает
+    порог. Рядом с файлом лежит JSON с параметрами, поэтому после сбоя
+    запись можно открыть как numpy.memmap и распознать.
+    """
+    
+    DATA_SUFFIX = ".raw"
+    SIDECAR_SUFFIX = ".json"
+    
+    # Период проверки объема в памяти (секунды)
+    SPILL_INTERVAL = 0.5
+    
+    def __init__(self, spill_dir: Path, sample_rate: int, channels: int, dtype: str = 'int16',
+                 ram_limit_bytes: int = 64 * 1024 * 1024, name: Optional[str] = None):
+        """
+        Инициализация буфера.
+        
+        Args:
+            spill_dir: Каталог для файлов выгрузки
+            sample_rate: Частота дискретизации
+            channels: Количество каналов
+            dtype: Тип сэмплов
+            ram_limit_bytes: Объем в памяти, после которого запись уходит на диск
+            name: Имя файлов (по умолчанию - новое уникальное)
+        """
+        self.spill_dir = Path(spill_dir)
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.dtype = np.dtype(dtype)
+        self.ram_limit_bytes = ram_limit_bytes
+        self.name = name or f"capture_{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        self.data_file = self.spill_dir / f"{self.name}{self.DATA_SUFFIX}"
+        self.sidecar_file = self.spill_dir / f"{self.name}{self.SIDECAR_SUFFIX}"
+        
+        self.chunks: List[np.ndarray] = []
+        # Счетчики пишет только один поток: appended - callback, spilled - поток выгрузки
+        self.appended_bytes = 0
+        self.spilled_bytes = 0
+        self.file = None
+        
+        self.stop_event = threading.Event()
+        self.spill_thread: Optional[threading.Thread] = None
+    
+    @property
+    def spilled(self) -> bool:
+        """Была ли запись выгружена на диск."""
+        return self.file is not None or self.spilled_bytes > 0
+    
+    def start(self) -> None:
+        """Запустить фоновый поток выгрузки."""
+        self.spill_thread = threading.Thread(target=self._spill_loop, daemon=True)
+        self.spill_thread.start()
+    
+    def append(self, block: np.ndarray) -> None:
+        """
+        Добавить блок (вызывается из callback PortAudio).
+        
+        Args:
+            block: Копия блока сэмплов (фреймы × каналы)
+        """
+        self.chunks.append(block)
+        self.appended_bytes += block.nbytes
+    
+    def _spill_loop(self) -> None:
+        """Выгружать блоки на диск, пока объем в памяти выше порога."""
+        while not self.stop_event.wait(self.SPILL_INTERVAL):
+            if self.file is not None or self.appended_bytes - self.spilled_bytes > self.ram_limit_bytes:
+                try:
+                    self._spill()
+                except OSError as e:
+                    logger.error(f"Ошибка выгрузки записи на диск: {e}")
+                    return
+    
+    def _open_file(self) -> None:
+        """Создать файл данных и JSON с параметрами записи."""
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+        self.file = open(self.data_file, 'ab')
+        sidecar = {
+            "sample_rate": self.sample_rate,
+            "channels": self.channels,
+            "dtype": self.dtype.str,
+            "started_at": time.time(),
+            "pid": os.getpid(),
+        }
+        temp_file = self.sidecar_file.with_suffix('.tmp')
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(sidecar, f)
+        os.replace(temp_file, self.sidecar_file)
+        logger.info(f"Запись превысила {self.ram_limit_bytes // (1024 * 1024)} МБ, выгрузка в {self.data_file}")
+    
+    def _spill(self) -> None:
+        """Дописать накопленные блоки в файл и освободить память."""
+        if self.file is None:
+            self._open_file()
+        
+        count = len(self.chunks)
+        if not count:
+            return
+        written = 0
+        for chunk in self.chunks[:count]:
+            self.file.write(chunk.tobytes())
+            written += chunk.nbytes
+        self.file.flush()
+        # Callback дописывает только в конец списка, поэтому начало можно удалить
+        del self.chunks[:count]
+        self.spilled_bytes += written
+    
+    def finish(self) -> Optional[np.ndarray]:
+        """
+        Завершить запись.
+        
+        Returns:
+            Аудио (фреймы × каналы): numpy.memmap без копирования, если запись
+            выгружалась на диск, иначе массив в памяти; None если данных нет
+        """
+        if self.spill_thread is not None:
+            self.stop_event.set()
+            self.spill_thread.join()
+            self.spill_thread = None
+        
+        if not self.spilled:
+            if not self.chunks:
+                return None
+            audio = np.concatenate(self.chunks, axis=0)
+            self.chunks = []
+            return audio
+        
+        self._spill()
+        self.file.close()
+        self.file = None
+        return self.audio()
+    
+    def audio(self) -> Optional[np.ndarray]:
+        """
+        Открыть файл записи как numpy.memmap.
+        
+        Returns:
+            Аудио (фреймы × каналы) или None, если файл пуст
+        """
+        frame_bytes = self.dtype.itemsize * self.channels
+        frames = self.data_file.stat().st_size // frame_bytes if self.data_file.exists() else 0
+        if not frames:
+            return None
+        return np.memmap(self.data_file, dtype=self.dtype, mode='r', shape=(frames, self.channels))
+    
+    @property
+    def duration(self) -> float:
+        """Длительность записи на диске в секундах."""
+        if not self.data_file.exists():
+            return 0.0
+        return self.data_file.stat().st_size / (self.dtype.itemsize * self.channels * self.sample_rate)
+    
+    def discard(self) -> None:
+        """Удалить файлы записи (сначала JSON, чтобы запись не считалась потерянной)."""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        for path in (self.sidecar_file, self.data_file):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                # На Windows файл, открытый через memmap, удалить нельзя - удалим при запуске
+                logger.warning(f"Не удалось удалить {path}: {e}")
+    
+    @classmethod
+    def recover(cls, spill_dir: Path) -> List["CaptureBuffer"]:
+        """
+        Найти записи, оставшиеся после аварийного завершения.
+        
+        Файлы данных без JSON (уже обработанные) удаляются.
+        
+        Args:
+            spill_dir: Каталог файлов выгрузки
+            
+        Returns:
+            Буферы с данными на диске
+        """
+        spill_dir = Path(spill_dir)
+        if not spill_dir.is_dir():
+            return []
+        
+        recovered = []
+        for sidecar_file in sorted(spill_dir.glob(f"*{cls.SIDECAR_SUFFIX}")):
+            try:
+                with open(sidecar_file, 'r', encoding='utf-8') as f:
+                    params = json.load(f)
+                buffer = cls(
+                    spill_dir,
+                    params["sample_rate"],
+                    params["channels"],
+                    params["dtype"],
+                    name=sidecar_file.stem
+                )
+            except (OSError, ValueError, KeyError) as e:
+                logger.error(f"Не удалось прочитать {sidecar_file}: {e}")
+                continue
+            
+            if buffer.duration > 0:
+                recovered.append(buffer)
+            else:
+                buffer.discard()
+        
+        for data_file in spill_dir.glob(f"*{cls.DATA_SUFFIX}"):
+            if not data_file.with_suffix(cls.SIDECAR_SUFFIX).exists():
+                try:
+                    data_file.unlink()
+                except OSError:
+                    pass
+        return recovered
@@ -8,6 +8,10 @@ import os
 from pathlib import Path
 from typing import Dict, Any
 
+from log_manager import get_logger
+
+logger = get_logger(__name__)
+
 
 class ConfigManager:
     """Управление конфигурацией приложения."""
@@ -17,7 +21,41 @@ class ConfigManager:
         "language": "ru",
         "whisper_model": "base",
         "sample_rate": 16000,
-        "channels": 1
+        "channels": 1,
+        "model_routing": {},
+        "model_memory_budget_mb": 4096,
+        "cascade_model": None,
+        "cascade_thresholds": {
+            "avg_logprob": -1.0,
+            "compression_ratio": 2.4,
+            "no_speech_prob": 0.6
+        },
+        "draft_model": None,
+        "draft_tokens": 4,
+        "model_idle_timeout": 600,
+        "adaptive_idle_timeout": True,
+        "log_level": "INFO",
+        "delivery_mode": "clipboard",
+        "stream_partials": False,
+        "history_enabled": True,
+        "archive_enabled": False,
+        "archive_dir": None,
+        "archive_max_mb": 2048,
+        "capture_spill_dir": None,
+        "capture_ram_limit_mb": 64,
+        "capture_native_rate": True,
+        "preprocess_stages": [],
+        "recognition_process": False,
+        "server_enabled": False,
+        "server_port": 8765,
+        "server_batch_window_ms": 20,
+        "server_max_batch": 8,
+        "dictation_mode": "hold",
+        "endpoint_silence_ms": 700,
+        "endpoint_max_seconds": 20,
+        "hotkey_profiles": [],
+        "latency_target_ms": 3000,
+        "auto_select_model": False
     }
     
     def __init__(self):
@@ -50,13 +88,22 @@ class ConfigManager:
                             config[key] = value
                     return config
             except Exception as e:
-                print(f"Ошибка загрузки конфигурации: {e}")
+                logger.error(f"Ошибка загрузки конфигурации: {e}")
                 return self.DEFAULT_CONFIG.copy()
         else:
             # Создать новый конфиг с дефолтными значениями
             self.save_config(self.DEFAULT_CONFIG)
             return self.DEFAULT_CONFIG.copy()
     
+    def read_config(self) -> Dict[str, Any]:
+        """
+        Прочитать конфигурацию из файла, не применяя ее.
+        
+        Returns:
+            Конфигурация из config.json, дополненная значениями по умолчанию
+        """
+        return self._load_config()
+    
     def get(self, key: str, default: Any = None) -> Any:
         """
         Получить значение настройки.
@@ -98,7 +145,7 @@ class ConfigManager:
                 json.dump(self.config, f, indent=2, ensure_ascii=False)
             return True
         except Exception as e:
-            print(f"Ошибка сохранения конфигурации: {e}")
+            logger.error(f"Ошибка сохранения конфигурации: {e}")
             return False
     
     def reset_to_defaults(self) -> None:
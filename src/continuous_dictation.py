@@ -0,0 +1,266 @@
+"""
+Непрерывная диктовка.
+Запись режется на фразы по паузам, каждая фраза распознается, пока продолжается речь.
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from capture_buffer import to_float32
+from log_manager import get_logger
+from resampler import StreamingResampler
+
+logger = get_logger(__name__)
+
+# Частота дискретизации Whisper
+SAMPLE_RATE = 16000
+
+
+class Endpointer:
+    """
+    Определение границ фраз по энергии кадров.
+    
+    Порог речи отсчитывается от уровня шума, который быстро следует за
+    тихими кадрами вниз и медленно поднимается, поэтому подстраивается
+    под фон помещения. Фраза начинается после min_speech_ms речи
+    (с предзаписью preroll_ms) и заканчивается паузой silence_ms.
+    Слишком длинная фраза разрезается по самому тихому кадру
+    последних секунд, чтобы текст не отставал от речи.
+    """
+    
+    FRAME_MS = 30
+    
+    # Скорость подъема уровня шума (дБ на кадр) в паузах и во время речи
+    NOISE_RISE_DB = 0.05
+    NOISE_RISE_SPEECH_DB = 0.01
+    
+    def __init__(self, sample_rate: int = SAMPLE_RATE, silence_ms: int = 700, max_seconds: float = 20.0,
+                 threshold_db: float = 10.0, min_level_db: float = -50.0, min_speech_ms: int = 150,
+                 preroll_ms: int = 300, tail_ms: int = 200):
+        """
+        Инициализация детектора.
+        
+        Args:
+            sample_rate: Частота дискретизации
+            silence_ms: Пауза, завершающая фразу
+            max_seconds: Максимальная длина фразы
+            threshold_db: Превышение уровня шума, считающееся речью
+            min_level_db: Абсолютный минимум уровня речи (dBFS)
+            min_speech_ms: Длительность речи, начинающая фразу
+            preroll_ms: Звук перед началом речи, добавляемый к фразе
+            tail_ms: Тишина после речи, оставляемая в конце фразы
+        """
+        frame_ms = self.FRAME_MS
+        self.frame = sample_rate * frame_ms // 1000
+        self.silence_frames = max(1, silence_ms // frame_ms)
+        self.max_frames = int(max_seconds * 1000 / frame_ms)
+        self.search_frames = min(self.max_frames // 2, 3000 // frame_ms)
+        self.threshold_db = threshold_db
+        self.min_level_db = min_level_db
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.preroll_frames = preroll_ms // frame_ms
+        self.tail_frames = min(tail_ms // frame_ms, self.silence_frames)
+        self.reset()
+    
+    def reset(self) -> None:
+        """Сбросить состояние перед новым сеансом."""
+        self.pending = np.zeros(0, dtype=np.float32)
+        self.noise_db: Optional[float] = None
+        self.preroll: deque = deque(maxlen=self.preroll_frames + self.min_speech_frames)
+        self.onset = 0
+        self.in_speech = False
+        self.frames: List[np.ndarray] = []
+        self.energies: List[float] = []
+        self.silence_run = 0
+    
+    def _is_voiced(self, level_db: float) -> bool:
+        """Обновить уровень шума и проверить, является ли кадр речью."""
+        if self.noise_db is None:
+            self.noise_db = level_db
+        voiced = level_db > max(self.noise_db + self.threshold_db, self.min_level_db)
+        if level_db < self.noise_db:
+            self.noise_db = max(0.7 * self.noise_db + 0.3 * level_db, -100.0)
+        else:
+            self.noise_db += self.NOISE_RISE_SPEECH_DB if voiced else self.NOISE_RISE_DB
+        return voiced
+    
+    def _take(self, count: int) -> np.ndarray:
+        """Забрать первые count кадров текущей фразы."""
+        audio = np.concatenate(self.frames[:count])
+        del self.frames[:count]
+        del self.energies[:count]
+        return audio
+    
+    def push(self, samples: np.ndarray) -> List[np.ndarray]:
+        """
+        Добавить блок и получить завершенные фразы.
+        
+        Args:
+            samples: Одномерный блок float32
+            
+        Returns:
+            Список фраз (float32)
+        """
+        data = np.concatenate((self.pending, samples)) if len(self.pending) else samples
+        count = len(data) // self.frame
+        self.pending = data[count * self.frame:].copy()
+        if not count:
+            return []
+        
+        frames = data[:count * self.frame].reshape(count, self.frame)
+        levels = 10.0 * np.log10(np.mean(np.square(frames), axis=1) + 1e-10)
+        
+        utterances = []
+        for frame, level_db in zip(frames, levels.tolist()):
+            voiced = self._is_voiced(level_db)
+            
+            if not self.in_speech:
+                self.preroll.append((frame, level_db))
+                self.onset = self.onset + 1 if voiced else 0
+                if self.onset >= self.min_speech_frames:
+                    self.in_speech = True
+                    self.frames = [item[0] for item in self.preroll]
+                    self.energies = [item[1] for item in self.preroll]
+                    self.preroll.clear()
+                    self.silence_run = 0
+                continue
+            
+            self.frames.append(frame)
+            self.energies.append(level_db)
+            self.silence_run = 0 if voiced else self.silence_run + 1
+            
+            if self.silence_run >= self.silence_frames:
+                # Конец фразы: оставить немного тишины, остальное - в предзапись
+                keep = len(self.frames) - self.silence_run + self.tail_frames
+                utterances.append(self._take(keep))
+                for item in zip(self.frames[-self.preroll.maxlen:], self.energies[-self.preroll.maxlen:]):
+                    self.preroll.append(item)
+                self.frames, self.energies = [], []
+                self.in_speech = False
+                self.onset = 0
+            elif len(self.frames) >= self.max_frames:
+                # Фраза без пауз: разрезать по самому тихому кадру последних секунд
+                search = self.energies[-self.search_frames:]
+                cut = len(self.frames) - len(search) + int(np.argmin(search)) + 1
+                utterances.append(self._take(cut))
+                self.silence_run = min(self.silence_run, len(self.frames))
+        
+        return utterances
+    
+    def flush(self) -> Optional[np.ndarray]:
+        """
+        Завершить сеанс и выдать незаконченную фразу.
+        
+        Returns:
+            Фраза float32 или None, если речь не шла
+        """
+        utterance = None
+        if self.in_speech and len(self.frames) > self.silence_run:
+            keep = len(self.frames) - self.silence_run + min(self.tail_frames, self.silence_run)
+            utterance = np.concatenate(self.frames[:keep] + ([self.pending] if not self.silence_run else []))
+        self.reset()
+        return utterance
+
+
+class DictationSession:
+    """
+    Сеанс непрерывной диктовки.
+    
+    Блоки записи поступают из потока обработки AudioRecorder, фразы,
+    найденные Endpointer, распознаются по одной в порядке произнесения
+    в отдельном потоке, пока запись продолжается. Callbacks вызываются
+    из потока сеанса.
+    """
+    
+    def __init__(self, recognizer, sample_rate: int, on_text: Callable[[str], None],
+                 on_finished: Callable[[Dict[str, float]], None], profile=None, **endpointer_options):
+        """
+        Инициализация и запуск сеанса.
+        
+        Args:
+            recognizer: SpeechRecognizer или RemoteRecognizer
+            sample_rate: Частота блоков записи
+            on_text: Получает текст каждой распознанной фразы
+            on_finished: Вызывается после распознавания последней фразы со статистикой сеанса
+            profile: Профиль горячей клавиши (None - основные настройки)
+            **endpointer_options: Параметры Endpointer
+        """
+        self.recognizer = recognizer
+        self.profile = profile
+        self.on_text = on_text
+        self.on_finished = on_finished
+        self.endpointer = Endpointer(SAMPLE_RATE, **endpointer_options)
+        self.resampler = StreamingResampler(sample_rate, SAMPLE_RATE) if sample_rate != SAMPLE_RATE else None
+        self.utterances: "queue.SimpleQueue" = queue.SimpleQueue()
+        self.stats = {'utterances': 0, 'recognized': 0, 'speech_seconds': 0.0, 'lag_max': 0.0, 'lag_total': 0.0}
+        self.thread = threading.Thread(target=self._worker, name="votobu-dictation", daemon=True)
+        self.thread.start()
+    
+    def feed(self, block: np.ndarray) -> None:
+        """
+        Передать блок записи (поток обработки AudioRecorder).
+        
+        Args:
+            block: Блок int16 или float32 (фреймы × каналы)
+        """
+        samples = block[:, 0] if block.shape[1] == 1 else block.mean(axis=1)
+        samples = to_float32(samples)
+        if self.resampler is not None:
+            samples = self.resampler.process(samples)
+        for utterance in self.endpointer.push(samples):
+            self.utterances.put((utterance, time.perf_counter()))
+    
+    def finish(self) -> None:
+        """Завершить сеанс: распознать последнюю фразу и вызвать on_finished."""
+        if self.resampler is not None:
+            for utterance in self.endpointer.push(self.resampler.flush(np.float32)):
+                self.utterances.put((utterance, time.perf_counter()))
+        tail = self.endpointer.flush()
+        if tail is not None:
+            self.utterances.put((tail, time.perf_counter()))
+        self.utterances.put(None)
+    
+    @property
+    def pending(self) -> int:
+        """Количество фраз, ожидающих распознавания."""
+        return self.utterances.qsize()
+    
+    def _recognize(self, audio: np.ndarray) -> Optional[str]:
+        """Распознать фразу и дождаться результата."""
+        done = threading.Event()
+        result = []
+        
+        def callback(text, *args):
+            result.append(text)
+            done.set()
+        
+        self.recognizer.recognize_async(audio, callback, profile=self.profile)
+        done.wait()
+        return result[0]
+    
+    def _worker(self) -> None:
+        """Распознавать фразы по очереди (поток сеанса)."""
+        while True:
+            item = self.utterances.get()
+            if item is None:
+                break
+            
+            audio, ended = item
+            text = self._recognize(audio)
+            lag = time.perf_counter() - ended
+            self.stats['utterances'] += 1
+            self.stats['speech_seconds'] += len(audio) / SAMPLE_RATE
+            self.stats['lag_total'] += lag
+            self.stats['lag_max'] = max(self.stats['lag_max'], lag)
+            logger.info(f"Фраза {len(audio) / SAMPLE_RATE:.1f} с распознана через {lag * 1000:.0f} мс "
+                        f"после паузы (в очереди: {self.pending})")
+            if text:
+                self.stats['recognized'] += 1
+                self.on_text(text)
+        
+        self.on_finished(dict(self.stats))
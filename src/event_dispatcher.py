@@ -0,0 +1,95 @@
+"""
+Диспетчер событий приложения.
+Переносит события из потоков хука и распознавания в поток Qt через сигналы.
+"""
+
+import time
+from typing import Optional
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from hotkey_profiles import DEFAULT_PROFILE
+
+
+class EventDispatcher(QObject):
+    """
+    Маршрутизатор событий в GUI поток.
+    
+    Методы post_* можно вызывать из любого потока: они только испускают
+    сигнал, а обработчики выполняются в потоке, где живет диспетчер.
+    """
+    
+    # Сигналы (аргумент - метка времени события, perf_counter)
+    hotkey_pressed = pyqtSignal(float, str)
+    hotkey_released = pyqtSignal(float)
+    partial_ready = pyqtSignal(str)
+    recognition_finished = pyqtSignal(object, object)
+    recovery_finished = pyqtSignal(object)
+    utterance_ready = pyqtSignal(str)
+    dictation_finished = pyqtSignal(object, object)
+    
+    def post_press(self, timestamp: Optional[float] = None, profile: str = DEFAULT_PROFILE) -> None:
+        """
+        Отправить событие нажатия горячей клавиши.
+        
+        Args:
+            timestamp: Время события (по умолчанию - текущее)
+            profile: Профиль нажатой клавиши
+        """
+        self.hotkey_pressed.emit(timestamp if timestamp is not None else time.perf_counter(), profile)
+    
+    def post_release(self, timestamp: Optional[float] = None) -> None:
+        """
+        Отправить событие отпускания горячей клавиши.
+        
+        Args:
+            timestamp: Время события (по умолчанию - текущее)
+        """
+        self.hotkey_released.emit(timestamp if timestamp is not None else time.perf_counter())
+    
+    def post_partial(self, text: str) -> None:
+        """
+        Отправить распознанную часть текста (до завершения распознавания).
+        
+        Args:
+            text: Текст очередного окна
+        """
+        self.partial_ready.emit(text)
+    
+    def post_result(self, text: Optional[str], trace=None) -> None:
+        """
+        Отправить результат распознавания.
+        
+        Args:
+            text: Распознанный текст или None
+            trace: Трасса задержек диктовки
+        """
+        self.recognition_finished.emit(text, trace)
+    
+    def post_recovered(self, text: Optional[str]) -> None:
+        """
+        Отправить результат распознавания записи, восстановленной после сбоя.
+        
+        Args:
+            text: Распознанный текст или None
+        """
+        self.recovery_finished.emit(text)
+    
+    def post_utterance(self, text: str) -> None:
+        """
+        Отправить текст фразы непрерывной диктовки.
+        
+        Args:
+            text: Распознанный текст фразы
+        """
+        self.utterance_ready.emit(text)
+    
+    def post_dictation_finished(self, session, stats) -> None:
+        """
+        Отправить событие завершения сеанса непрерывной диктовки.
+        
+        Args:
+            session: Завершившийся сеанс (DictationSession)
+            stats: Статистика сеанса
+        """
+        self.dictation_finished.emit(session, stats)
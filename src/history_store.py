@@ -0,0 +1,219 @@
+"""
+История распознанных текстов.
+Хранит результаты в SQLite с полнотекстовым индексом FTS5.
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from log_manager import get_logger
+
+logger = get_logger(__name__)
+
+
+class HistoryStore:
+    """
+    Хранилище истории диктовок.
+    
+    Записи ставятся в очередь и пишутся пачками в фоновом потоке одной
+    транзакцией. Поиск идет по индексу FTS5 от новых записей к старым,
+    поэтому запрос с LIMIT не зависит от размера истории.
+    """
+    
+    DB_NAME = "history.sqlite3"
+    
+    # Максимум записей в одной транзакции
+    BATCH_SIZE = 256
+    
+    COLUMNS = ("id", "created_at", "text", "duration", "model", "language", "latency_ms")
+    
+    def __init__(self, config_dir: Path):
+        """
+        Инициализация хранилища.
+        
+        Args:
+            config_dir: Директория конфигурации
+        """
+        self.db_file = Path(config_dir) / self.DB_NAME
+        self.entries: "queue.SimpleQueue" = queue.SimpleQueue()
+        self.fts_enabled = True
+        self.reader: Optional[sqlite3.Connection] = None
+        self._init_schema()
+        
+        self.writer_thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self.writer_thread.start()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Открыть соединение с базой истории."""
+        connection = sqlite3.connect(self.db_file, timeout=10)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+    
+    def _init_schema(self) -> None:
+        """Создать таблицы, индекс FTS5 и триггеры синхронизации."""
+        connection = self._connect()
+        try:
+            with connection:
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS history ("
+                    "id INTEGER PRIMARY KEY, "
+                    "created_at REAL NOT NULL, "
+                    "text TEXT NOT NULL, "
+                    "duration REAL, "
+                    "model TEXT, "
+                    "language TEXT, "
+                    "latency_ms REAL)"
+                )
+                connection.execute("CREATE INDEX IF NOT EXISTS history_created_at ON history(created_at)")
+            
+            try:
+                with connection:
+                    connection.execute(
+                        "CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5("
+                        "text, content='history', content_rowid='id', "
+                        "tokenize='unicode61 remove_diacritics 2')"
+                    )
+                    connection.execute(
+                        "CREATE TRIGGER IF NOT EXISTS history_ai AFTER INSERT ON history BEGIN "
+                        "INSERT INTO history_fts(rowid, text) VALUES (new.id, new.text); END"
+                    )
+                    connection.execute(
+                        "CREATE TRIGGER IF NOT EXISTS history_ad AFTER DELETE ON history BEGIN "
+                        "INSERT INTO history_fts(history_fts, rowid, text) VALUES ('delete', old.id, old.text); END"
+                    )
+            except sqlite3.OperationalError as e:
+                # SQLite собран без FTS5 - поиск будет через LIKE
+                logger.warning(f"FTS5 недоступен, поиск по истории будет медленнее: {e}")
+                self.fts_enabled = False
+        finally:
+            connection.close()
+    
+    def add(self, text: str, duration: Optional[float] = None, model: Optional[str] = None,
+            language: Optional[str] = None, latency_ms: Optional[float] = None) -> None:
+        """
+        Добавить результат в историю (запись выполняется в фоне).
+        
+        Args:
+            text: Распознанный текст
+            duration: Длительность записи в секундах
+            model: Модель, выполнившая распознавание
+            language: Язык распознавания
+            latency_ms: Задержка от отпускания клавиши до доставки текста
+        """
+        self.entries.put_nowait((time.time(), text, duration, model, language, latency_ms))
+    
+    def _writer_loop(self) -> None:
+        """Записывать накопившиеся записи пачками."""
+        connection = self._connect()
+        while True:
+            entry = self.entries.get()
+            if entry is None:
+                break
+            
+            batch = [entry]
+            stop = False
+            while len(batch) < self.BATCH_SIZE:
+                try:
+                    entry = self.entries.get_nowait()
+                except queue.Empty:
+                    break
+                if entry is None:
+                    stop = True
+                    break
+                batch.append(entry)
+            
+            try:
+                with connection:
+                    connection.executemany(
+                        "INSERT INTO history (created_at, text, duration, model, language, latency_ms) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        batch
+                    )
+            except sqlite3.Error as e:
+                logger.error(f"Ошибка записи истории: {e}")
+            
+            if stop:
+                break
+        connection.close()
+    
+    def close(self, timeout: float = 5.0) -> None:
+        """
+        Дописать очередь и остановить фоновый поток.
+        
+        Args:
+            timeout: Максимальное время ожидания записи
+        """
+        self.entries.put_nowait(None)
+        self.writer_thread.join(timeout)
+    
+    def _reader(self) -> sqlite3.Connection:
+        """Соединение для чтения (создается в потоке GUI при первом поиске)."""
+        if self.reader is None:
+            self.reader = self._connect()
+        return self.reader
+    
+    @staticmethod
+    def _match_expression(query: str) -> str:
+        """
+        Преобразовать строку поиска в выражение FTS5.
+        
+        Каждое слово ищется как префикс, все слова должны встретиться.
+        
+        Args:
+            query: Строка поиска пользователя
+            
+        Returns:
+            Выражение для MATCH
+        """
+        words = query.replace('"', ' ').split()
+        return " ".join(f'"{word}"*' for word in words)
+    
+    def search(self, query: str = "", limit: int = 200) -> List[Dict[str, Any]]:
+        """
+        Найти записи истории.
+        
+        Args:
+            query: Строка поиска (пустая - последние записи)
+            limit: Максимальное количество результатов
+            
+        Returns:
+            Список записей от новых к старым
+        """
+        columns = ", ".join(f"h.{column}" for column in self.COLUMNS)
+        expression = self._match_expression(query)
+        
+        if not expression:
+            sql = f"SELECT {columns} FROM history h ORDER BY h.id DESC LIMIT ?"
+            params = (limit,)
+        elif self.fts_enabled:
+            sql = (
+                f"SELECT {columns} FROM history_fts "
+                f"JOIN history h ON h.id = history_fts.rowid "
+                f"WHERE history_fts MATCH ? ORDER BY history_fts.rowid DESC LIMIT ?"
+            )
+            params = (expression, limit)
+        else:
+            conditions = " AND ".join("h.text LIKE ?" for _ in query.split())
+            sql = f"SELECT {columns} FROM history h WHERE {conditions} ORDER BY h.id DESC LIMIT ?"
+            params = tuple(f"%{word}%" for word in query.split()) + (limit,)
+        
+        try:
+            rows = self._reader().execute(sql, params).fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка поиска по истории: {e}")
+            rows = []
+        return [dict(zip(self.COLUMNS, row)) for row in rows]
+    
+    def count(self) -> int:
+        """
+        Получить количество записей в истории.
+        
+        Returns:
+            Число записей
+        """
+        return self._reader().execute("SELECT COUNT(*) FROM history").fetchone()[0]
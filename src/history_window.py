@@ -0,0 +1,117 @@
+"""
+Окно истории распознанных текстов.
+Поиск по истории с копированием найденного текста в буфер обмена.
+"""
+
+from datetime import datetime
+
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QLineEdit, QTableWidget, QTableWidgetItem,
+    QHeaderView, QAbstractItemView, QLabel, QApplication
+)
+from PyQt5.QtCore import Qt, QTimer
+
+from history_store import HistoryStore
+
+
+class HistoryWindow(QWidget):
+    """Окно поиска по истории диктовок."""
+    
+    # Задержка поиска после ввода (мс) и максимум строк в таблице
+    SEARCH_DELAY_MS = 200
+    RESULT_LIMIT = 200
+    
+    def __init__(self, history_store: HistoryStore):
+        """
+        Инициализация окна истории.
+        
+        Args:
+            history_store: Хранилище истории
+        """
+        super().__init__()
+        self.history_store = history_store
+        self.results = []
+        
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(self.SEARCH_DELAY_MS)
+        self.search_timer.timeout.connect(self._run_search)
+        
+        self.init_ui()
+        self._run_search()
+    
+    def init_ui(self) -> None:
+        """Инициализировать пользовательский интерфейс."""
+        self.setWindowTitle("История Votobu")
+        self.setMinimumWidth(600)
+        self.setMinimumHeight(400)
+        self.setWindowFlags(Qt.Window | Qt.WindowCloseButtonHint | Qt.WindowMinimizeButtonHint)
+        
+        layout = QVBoxLayout()
+        
+        # Строка поиска
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("Поиск по тексту...")
+        self.search_edit.setClearButtonEnabled(True)
+        self.search_edit.textChanged.connect(lambda: self.search_timer.start())
+        layout.addWidget(self.search_edit)
+        
+        # Таблица результатов
+        self.table = QTableWidget(0, 4)
+        self.table.setHorizontalHeaderLabels(["Время", "Текст", "Модель", "Задержка, мс"])
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.verticalHeader().setVisible(False)
+        header = self.table.horizontalHeader()
+        header.setSectionResizeMode(0, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(1, QHeaderView.Stretch)
+        header.setSectionResizeMode(2, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(3, QHeaderView.ResizeToContents)
+        self.table.cellDoubleClicked.connect(self._on_row_activated)
+        layout.addWidget(self.table)
+        
+        # Статус
+        self.status_label = QLabel()
+        self.status_label.setStyleSheet("color: gray; font-size: 10px;")
+        layout.addWidget(self.status_label)
+        
+        self.setLayout(layout)
+    
+    def refresh(self) -> None:
+        """Повторить текущий поиск (например, после новой диктовки)."""
+        self._run_search()
+    
+    def _run_search(self) -> None:
+        """Выполнить поиск и заполнить таблицу."""
+        query = self.search_edit.text()
+        self.results = self.history_store.search(query, self.RESULT_LIMIT)
+        
+        self.table.setUpdatesEnabled(False)
+        self.table.setRowCount(len(self.results))
+        for row, entry in enumerate(self.results):
+            created = datetime.fromtimestamp(entry['created_at']).strftime("%d.%m.%Y %H:%M")
+            latency = f"{entry['latency_ms']:.0f}" if entry['latency_ms'] is not None else ""
+            self.table.setItem(row, 0, QTableWidgetItem(created))
+            self.table.setItem(row, 1, QTableWidgetItem(entry['text']))
+            self.table.setItem(row, 2, QTableWidgetItem(entry['model'] or ""))
+            self.table.setItem(row, 3, QTableWidgetItem(latency))
+        self.table.setUpdatesEnabled(True)
+        
+        if query.strip():
+            self.status_label.setText(f"Найдено: {len(self.results)}"
+                                      f"{'+' if len(self.results) == self.RESULT_LIMIT else ''}")
+        else:
+            self.status_label.setText(f"Записей в истории: {self.history_store.count()}. "
+                                      f"Двойной щелчок копирует текст")
+    
+    def _on_row_activated(self, row: int, column: int) -> None:
+        """
+        Скопировать текст выбранной записи в буфер обмена.
+        
+        Args:
+            row: Номер строки
+            column: Номер столбца
+        """
+        if 0 <= row < len(self.results):
+            QApplication.clipboard().setText(self.results[row]['text'])
+            self.status_label.setText("Текст скопирован в буфер обмена")
@@ -6,12 +6,27 @@
 from pynput import keyboard, mouse
 from pynput.keyboard import Key, KeyCode
 from pynput.mouse import Button
+import queue
 import threading
-from typing import Callable, Optional, Union
+import time
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from log_manager import get_logger
+
+logger = get_logger(__name__)
 
 
 class HotkeyManager:
-    """Класс для управления глобальными горячими клавишами."""
+    """
+    Класс для управления глобальными горячими клавишами.
+    
+    Кроме основной клавиши можно зарегистрировать дополнительные привязки
+    профилей. Одновременно удерживается только одна привязка: нажатия
+    других клавиш игнорируются до ее отпускания.
+    """
+    
+    # Имя привязки основной клавиши
+    DEFAULT_BINDING = "default"
     
     # Маппинг строковых названий клавиш к pynput Key
     KEY_MAPPING = {
@@ -47,26 +62,26 @@ class HotkeyManager:
             hotkey: Строковое представление горячей клавиши (например, "f9")
         """
         self.hotkey_str = hotkey.lower()
-        self.hotkey = self._parse_hotkey(self.hotkey_str)
-        self.is_mouse_button = self._is_mouse_button(self.hotkey_str)
-        self.on_press_callback: Optional[Callable[[], None]] = None
-        self.on_release_callback: Optional[Callable[[], None]] = None
+        self.profile_bindings: Dict[str, str] = {}
+        self._rebuild_bindings()
+        self.on_press_callback: Optional[Callable[[float, str], None]] = None
+        self.on_release_callback: Optional[Callable[[float, str], None]] = None
+        self.suppress_check: Optional[Callable[[], bool]] = None
         self.keyboard_listener: Optional[keyboard.Listener] = None
         self.mouse_listener: Optional[mouse.Listener] = None
         self.is_pressed = False
+        self.pressed_key: Optional[Union[Key, KeyCode, Button]] = None
+        self.pressed_binding = self.DEFAULT_BINDING
         self.running = False
-    
-    def _is_mouse_button(self, hotkey_str: str) -> bool:
-        """
-        Проверить, является ли горячая клавиша кнопкой мыши.
         
-        Args:
-            hotkey_str: Строковое представление клавиши
-            
-        Returns:
-            True если это кнопка мыши
-        """
-        return hotkey_str in self.MOUSE_BUTTON_MAPPING
+        # События из хука обрабатываются в отдельном потоке диспетчера
+        self.events: "queue.SimpleQueue" = queue.SimpleQueue()
+        self.dispatch_thread: Optional[threading.Thread] = None
+        
+        # Статистика времени работы обработчиков хука (наносекунды)
+        self.hook_calls = 0
+        self.hook_time_total_ns = 0
+        self.hook_time_max_ns = 0
     
     def _parse_hotkey(self, hotkey_str: str) -> Union[Key, KeyCode, Button]:
         """
@@ -95,22 +110,83 @@ class HotkeyManager:
         # По умолчанию F9
         return Key.f9
     
+    def _rebuild_bindings(self) -> None:
+        """Разобрать основную клавишу и привязки профилей."""
+        self.hotkey = self._parse_hotkey(self.hotkey_str)
+        self.bindings: List[Tuple[Union[Key, KeyCode, Button], str]] = [(self.hotkey, self.DEFAULT_BINDING)]
+        for hotkey_str, name in self.profile_bindings.items():
+            key = self._parse_hotkey(hotkey_str)
+            if any(key == bound for bound, _ in self.bindings):
+                logger.warning(f"Клавиша {hotkey_str.upper()} профиля {name} уже занята")
+                continue
+            self.bindings.append((key, name))
+        
+        self.uses_mouse = any(isinstance(key, Button) for key, _ in self.bindings)
+        self.uses_keyboard = any(not isinstance(key, Button) for key, _ in self.bindings)
+    
+    def _match(self, key) -> Optional[str]:
+        """
+        Найти привязку клавиши.
+        
+        Args:
+            key: Клавиша или кнопка мыши из хука
+            
+        Returns:
+            Имя привязки или None
+        """
+        for bound, name in self.bindings:
+            if key == bound:
+                return name
+        return None
+    
+    def _press(self, key, start_ns: int) -> None:
+        """Поставить в очередь нажатие привязанной клавиши (поток хука)."""
+        if self.is_pressed or (self.suppress_check is not None and self.suppress_check()):
+            return
+        name = self._match(key)
+        if name is not None:
+            self.is_pressed = True
+            self.pressed_key = key
+            self.pressed_binding = name
+            self.events.put_nowait(('press', start_ns, name))
+    
+    def _release(self, key, start_ns: int) -> None:
+        """Поставить в очередь отпускание удерживаемой клавиши (поток хука)."""
+        if self.is_pressed and key == self.pressed_key:
+            self.is_pressed = False
+            self.pressed_key = None
+            self.events.put_nowait(('release', start_ns, self.pressed_binding))
+    
+    def _record_hook_time(self, start_ns: int) -> None:
+        """
+        Учесть время работы обработчика хука.
+        
+        Args:
+            start_ns: Время входа в обработчик (perf_counter_ns)
+        """
+        elapsed = time.perf_counter_ns() - start_ns
+        self.hook_calls += 1
+        self.hook_time_total_ns += elapsed
+        if elapsed > self.hook_time_max_ns:
+            self.hook_time_max_ns = elapsed
+    
     def _on_key_press(self, key):
         """
         Обработчик нажатия клавиши.
         
+        Выполняется в потоке системного хука, поэтому только ставит
+        событие в очередь с меткой времени.
+        
         Args:
             key: Нажатая клавиша
         """
+        start_ns = time.perf_counter_ns()
         try:
-            # Сравнить нажатую клавишу с горячей клавишей
-            if key == self.hotkey:
-                if not self.is_pressed:
-                    self.is_pressed = True
-                    if self.on_press_callback:
-                        self.on_press_callback()
+            self._press(key, start_ns)
         except Exception as e:
-            print(f"Ошибка обработки нажатия клавиши: {e}")
+            logger.error(f"Ошибка обработки нажатия клавиши: {e}")
+        finally:
+            self._record_hook_time(start_ns)
     
     def _on_key_release(self, key):
         """
@@ -119,15 +195,13 @@ class HotkeyManager:
         Args:
             key: Отпущенная клавиша
         """
+        start_ns = time.perf_counter_ns()
         try:
-            # Сравнить отпущенную клавишу с горячей клавишей
-            if key == self.hotkey:
-                if self.is_pressed:
-                    self.is_pressed = False
-                    if self.on_release_callback:
-                        self.on_release_callback()
+            self._release(key, start_ns)
         except Exception as e:
-            print(f"Ошибка обработки отпускания клавиши: {e}")
+            logger.error(f"Ошибка обработки отпускания клавиши: {e}")
+        finally:
+            self._record_hook_time(start_ns)
     
     def _on_mouse_click(self, x, y, button, pressed):
         """
@@ -138,37 +212,80 @@ class HotkeyManager:
             button: Нажатая кнопка
             pressed: True если кнопка нажата, False если отпущена
         """
+        start_ns = time.perf_counter_ns()
         try:
-            if button == self.hotkey:
-                if pressed and not self.is_pressed:
-                    self.is_pressed = True
-                    if self.on_press_callback:
-                        self.on_press_callback()
-                elif not pressed and self.is_pressed:
-                    self.is_pressed = False
-                    if self.on_release_callback:
-                        self.on_release_callback()
+            if pressed:
+                self._press(button, start_ns)
+            else:
+                self._release(button, start_ns)
         except Exception as e:
-            print(f"Ошибка обработки клика мыши: {e}")
+            logger.error(f"Ошибка обработки клика мыши: {e}")
+        finally:
+            self._record_hook_time(start_ns)
+    
+    def _dispatch_loop(self) -> None:
+        """Вызывать callbacks для событий из очереди вне потока хука."""
+        while True:
+            kind, timestamp_ns, binding = self.events.get()
+            if kind == 'stop':
+                break
+            
+            try:
+                # Время и привязка передаются аргументами: callback может
+                # выполниться позже, когда придут следующие события
+                callback = self.on_press_callback if kind == 'press' else self.on_release_callback
+                if callback:
+                    callback(timestamp_ns / 1e9, binding)
+            except Exception as e:
+                logger.error(f"Ошибка обработки события горячей клавиши: {e}")
     
-    def set_on_press(self, callback: Callable[[], None]) -> None:
+    def get_hook_stats(self) -> Dict[str, float]:
+        """
+        Получить статистику времени обработчиков хука.
+        
+        Returns:
+            Количество вызовов, среднее и максимальное время в микросекундах
+        """
+        calls = self.hook_calls
+        return {
+            'calls': calls,
+            'mean_us': self.hook_time_total_ns / calls / 1000 if calls else 0.0,
+            'max_us': self.hook_time_max_ns / 1000,
+        }
+    
+    def set_on_press(self, callback: Callable[[float, str], None]) -> None:
         """
         Установить callback для нажатия клавиши.
         
         Args:
-            callback: Функция, вызываемая при нажатии
+            callback: Функция, вызываемая при нажатии с временем события
+                      (perf_counter, секунды) и именем привязки
         """
         self.on_press_callback = callback
     
-    def set_on_release(self, callback: Callable[[], None]) -> None:
+    def set_on_release(self, callback: Callable[[float, str], None]) -> None:
         """
         Установить callback для отпускания клавиши.
         
         Args:
-            callback: Функция, вызываемая при отпускании
+            callback: Функция, вызываемая при отпускании с временем события
+                      (perf_counter, секунды) и именем привязки
         """
         self.on_release_callback = callback
     
+    def set_suppress_check(self, check: Optional[Callable[[], bool]]) -> None:
+        """
+        Установить проверку, при которой нажатия привязок игнорируются.
+        
+        Нужна, чтобы нажатия, которые приложение само печатает в активное
+        окно, не начинали новую запись. Отпускание удерживаемой клавиши
+        обрабатывается всегда, иначе запись не остановится.
+        
+        Args:
+            check: Функция без аргументов (вызывается в потоке хука) или None
+        """
+        self.suppress_check = check
+    
     def start(self) -> bool:
         """
         Запустить перехват клавиш/мыши.
@@ -180,26 +297,33 @@ class HotkeyManager:
             return False
         
         try:
-            if self.is_mouse_button:
+            # Поток диспетчера событий
+            self.dispatch_thread = threading.Thread(target=self._dispatch_loop, daemon=True)
+            self.dispatch_thread.start()
+            
+            if self.uses_mouse:
                 # Запустить mouse listener для кнопок мыши
                 self.mouse_listener = mouse.Listener(
                     on_click=self._on_mouse_click
                 )
                 self.mouse_listener.start()
-                print(f"Перехват мыши запущен. Горячая кнопка: {self.hotkey_str}")
-            else:
+                logger.info("Перехват мыши запущен")
+            if self.uses_keyboard:
                 # Запустить keyboard listener для клавиш
                 self.keyboard_listener = keyboard.Listener(
                     on_press=self._on_key_press,
                     on_release=self._on_key_release
                 )
                 self.keyboard_listener.start()
-                print(f"Перехват клавиш запущен. Горячая клавиша: {self.hotkey_str}")
+                logger.info("Перехват клавиш запущен")
+            
+            profiles = ", ".join(f"{hotkey.upper()} ({name})" for hotkey, name in self.profile_bindings.items())
+            logger.info(f"Горячая клавиша: {self.hotkey_str}" + (f", профили: {profiles}" if profiles else ""))
             
             self.running = True
             return True
         except Exception as e:
-            print(f"Ошибка запуска перехвата: {e}")
+            logger.error(f"Ошибка запуска перехвата: {e}")
             return False
     
     def stop(self) -> None:
@@ -210,9 +334,13 @@ class HotkeyManager:
         if self.mouse_listener:
             self.mouse_listener.stop()
             self.mouse_listener = None
+        if self.dispatch_thread:
+            self.events.put_nowait(('stop', 0, None))
+            self.dispatch_thread = None
         self.running = False
         self.is_pressed = False
-        print("Перехват остановлен")
+        self.pressed_key = None
+        logger.info("Перехват остановлен")
     
     def change_hotkey(self, new_hotkey: str) -> bool:
         """
@@ -230,8 +358,30 @@ class HotkeyManager:
             self.stop()
         
         self.hotkey_str = new_hotkey.lower()
-        self.hotkey = self._parse_hotkey(self.hotkey_str)
-        self.is_mouse_button = self._is_mouse_button(self.hotkey_str)
+        self._rebuild_bindings()
+        
+        if was_running:
+            return self.start()
+        
+        return True
+    
+    def set_profile_bindings(self, bindings: Dict[str, str]) -> bool:
+        """
+        Заменить дополнительные привязки профилей.
+        
+        Args:
+            bindings: Горячая клавиша → имя профиля
+            
+        Returns:
+            True если перехват перезапущен успешно
+        """
+        was_running = self.running
+        
+        if was_running:
+            self.stop()
+        
+        self.profile_bindings = {hotkey.lower(): name for hotkey, name in bindings.items()}
+        self._rebuild_bindings()
         
         if was_running:
             return self.start()
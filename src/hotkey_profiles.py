@@ -0,0 +1,138 @@
+"""
+Профили горячих клавиш.
+Каждая клавиша задает свой язык, модель, параметры декодирования и способ доставки текста.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from log_manager import get_logger
+
+logger = get_logger(__name__)
+
+# Имя профиля основной горячей клавиши
+DEFAULT_PROFILE = "default"
+
+# Параметры Whisper, которые профиль может переопределить
+DECODING_KEYS = {
+    'task',
+    'beam_size',
+    'best_of',
+    'patience',
+    'temperature',
+    'initial_prompt',
+    'condition_on_previous_text',
+}
+
+
+class HotkeyProfile:
+    """Настройки распознавания, привязанные к горячей клавише."""
+    
+    __slots__ = ('name', 'hotkey', 'language', 'model', 'delivery_mode', 'decoding')
+    
+    def __init__(self, name: str, hotkey: str, language: str, model: str, delivery_mode: str,
+                 decoding: Optional[Dict[str, Any]] = None):
+        """
+        Инициализация профиля.
+        
+        Args:
+            name: Имя профиля
+            hotkey: Горячая клавиша
+            language: Код языка (ru/en/auto)
+            model: Основная модель Whisper
+            delivery_mode: Способ доставки текста (clipboard/paste/type)
+            decoding: Параметры декодирования Whisper (beam_size, temperature, ...)
+        """
+        self.name = name
+        self.hotkey = hotkey.lower()
+        self.language = language
+        self.model = model
+        self.delivery_mode = delivery_mode
+        self.decoding = dict(decoding or {})
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], config: Dict[str, Any]) -> "HotkeyProfile":
+        """
+        Создать профиль из записи hotkey_profiles.
+        
+        Незаданные поля берутся из основных настроек.
+        
+        Args:
+            data: Запись профиля
+            config: Конфигурация приложения
+            
+        Returns:
+            Профиль
+        """
+        decoding = {}
+        for key, value in (data.get('decoding') or {}).items():
+            if key in DECODING_KEYS:
+                decoding[key] = value
+            else:
+                logger.warning(f"Параметр декодирования {key} в профиле {data.get('hotkey')} не поддерживается")
+        
+        hotkey = str(data['hotkey'])
+        return cls(
+            name=str(data.get('name') or hotkey.upper()),
+            hotkey=hotkey,
+            language=data.get('language', config.get('language', 'ru')),
+            model=data.get('model', config.get('whisper_model', 'base')),
+            delivery_mode=data.get('delivery_mode', config.get('delivery_mode', 'clipboard')),
+            decoding=decoding
+        )
+
+
+def build_profiles(config: Dict[str, Any]) -> Dict[str, HotkeyProfile]:
+    """
+    Собрать профили из конфигурации.
+    
+    Основная горячая клавиша - профиль DEFAULT_PROFILE с основными
+    настройками, за ним идут записи hotkey_profiles. Записи с уже
+    занятой клавишей пропускаются.
+    
+    Args:
+        config: Конфигурация приложения
+        
+    Returns:
+        Профили по именам в порядке приоритета
+    """
+    default = HotkeyProfile(
+        DEFAULT_PROFILE,
+        config.get('hotkey', 'f9'),
+        config.get('language', 'ru'),
+        config.get('whisper_model', 'base'),
+        config.get('delivery_mode', 'clipboard')
+    )
+    profiles = {DEFAULT_PROFILE: default}
+    hotkeys = {default.hotkey}
+    
+    for data in config.get('hotkey_profiles') or []:
+        try:
+            profile = HotkeyProfile.from_dict(data, config)
+        except (KeyError, TypeError, AttributeError) as e:
+            logger.warning(f"Некорректный профиль горячей клавиши {data}: {e}")
+            continue
+        
+        if profile.hotkey in hotkeys or profile.name in profiles:
+            logger.warning(f"Профиль {profile.name}: клавиша {profile.hotkey.upper()} или имя уже заняты")
+            continue
+        hotkeys.add(profile.hotkey)
+        profiles[profile.name] = profile
+    
+    return profiles
+
+
+def profile_targets(profiles: Dict[str, HotkeyProfile]) -> List[Tuple[str, str]]:
+    """
+    Получить пары (модель, язык) профилей без повторов.
+    
+    Args:
+        profiles: Профили в порядке приоритета
+        
+    Returns:
+        Пары в порядке приоритета профилей
+    """
+    targets = []
+    for profile in profiles.values():
+        if (profile.model, profile.language) not in targets:
+            targets.append((profile.model, profile.language))
+    return targets
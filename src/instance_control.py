@@ -0,0 +1,306 @@
+"""
+Единственный экземпляр приложения и канал управления.
+Блокировка через QLockFile, команды через локальный сокет (Unix socket / именованный канал Windows).
+"""
+
+import getpass
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from PyQt5.QtCore import QObject, QLockFile, Qt, pyqtSignal
+from PyQt5.QtNetwork import QLocalServer, QLocalSocket
+
+from log_manager import get_logger
+
+logger = get_logger(__name__)
+
+# Команды канала управления
+COMMANDS = {
+    'show': "Показать, что приложение запущено",
+    'start': "Начать запись",
+    'stop': "Остановить запись и распознать",
+    'toggle': "Начать или остановить запись",
+    'status': "Состояние записи и модели",
+    'reload': "Перечитать config.json",
+    'transcribe': "Распознать файл загруженной моделью: transcribe <файл>",
+}
+
+# Время ожидания ответа (мс); распознавание файла может идти долго
+REPLY_TIMEOUT_MS = 10000
+TRANSCRIBE_TIMEOUT_MS = 30 * 60 * 1000
+
+
+def server_name() -> str:
+    """
+    Получить имя локального сокета (у каждого пользователя - свое).
+    
+    Returns:
+        Имя сервера QLocalServer
+    """
+    try:
+        user = getpass.getuser()
+    except Exception:
+        user = "user"
+    return f"votobu-control-{user}"
+
+
+class InstanceLock:
+    """
+    Блокировка единственного экземпляра.
+    
+    QLockFile хранит PID владельца, поэтому блокировка процесса,
+    завершившегося аварийно, снимается при следующем запуске.
+    """
+    
+    LOCK_NAME = "votobu.lock"
+    
+    def __init__(self, config_dir: Path):
+        """
+        Инициализация блокировки.
+        
+        Args:
+            config_dir: Директория конфигурации
+        """
+        self.lock = QLockFile(str(Path(config_dir) / self.LOCK_NAME))
+        self.lock.setStaleLockTime(0)
+    
+    def acquire(self) -> bool:
+        """
+        Захватить блокировку.
+        
+        Returns:
+            True если это первый экземпляр
+        """
+        return self.lock.tryLock(100)
+    
+    def release(self) -> None:
+        """Освободить блокировку."""
+        self.lock.unlock()
+
+
+class ControlRequest:
+    """Команда, полученная по каналу управления."""
+    
+    __slots__ = ('command', 'args', 'socket')
+    
+    def __init__(self, command: str, args: List[str], socket: QLocalSocket):
+        """
+        Инициализация команды.
+        
+        Args:
+            command: Имя команды
+            args: Аргументы команды
+            socket: Соединение клиента для ответа
+        """
+        self.command = command
+        self.args = args
+        self.socket = socket
+
+
+class ControlServer(QObject):
+    """
+    Сервер канала управления.
+    
+    Работает в потоке Qt. Протокол - по одной строке JSON в каждую
+    сторону: {"command": ..., "args": [...]} и ответ {"ok": ..., ...}.
+    Ответ можно отправить из любого потока через reply().
+    """
+    
+    command_received = pyqtSignal(object)
+    _reply_ready = pyqtSignal(object, object)
+    
+    # Максимальный размер запроса (байт)
+    MAX_REQUEST_BYTES = 64 * 1024
+    
+    def __init__(self, parent: Optional[QObject] = None):
+        """
+        Инициализация сервера.
+        
+        Args:
+            parent: Родительский объект Qt
+        """
+        super().__init__(parent)
+        self.server = QLocalServer(self)
+        self.server.setSocketOptions(QLocalServer.UserAccessOption)
+        self.server.newConnection.connect(self._on_new_connection)
+        self.buffers: Dict[QLocalSocket, bytes] = {}
+        self._reply_ready.connect(self._send_reply, Qt.QueuedConnection)
+    
+    def listen(self) -> bool:
+        """
+        Начать прием команд.
+        
+        Вызывается только владельцем блокировки, поэтому сокет,
+        оставшийся после сбоя, можно удалить.
+        
+        Returns:
+            True если сервер запущен
+        """
+        name = server_name()
+        QLocalServer.removeServer(name)
+        if not self.server.listen(name):
+            logger.error(f"Не удалось открыть канал управления {name}: {self.server.errorString()}")
+            return False
+        logger.info(f"Канал управления: {self.server.fullServerName()}")
+        return True
+    
+    def close(self) -> None:
+        """Остановить прием команд."""
+        self.server.close()
+    
+    def _on_new_connection(self) -> None:
+        """Принять подключения клиентов."""
+        while self.server.hasPendingConnections():
+            socket = self.server.nextPendingConnection()
+            self.buffers[socket] = b""
+            socket.readyRead.connect(lambda socket=socket: self._on_ready_read(socket))
+            socket.disconnected.connect(lambda socket=socket: self._on_disconnected(socket))
+    
+    def _on_disconnected(self, socket: QLocalSocket) -> None:
+        """Освободить соединение клиента."""
+        self.buffers.pop(socket, None)
+        socket.deleteLater()
+    
+    def _on_ready_read(self, socket: QLocalSocket) -> None:
+        """Прочитать строку запроса и передать команду приложению."""
+        data = self.buffers.get(socket, b"") + bytes(socket.readAll())
+        if b"\n" not in data:
+            if len(data) > self.MAX_REQUEST_BYTES:
+                socket.disconnectFromServer()
+            else:
+                self.buffers[socket] = data
+            return
+        
+        line = data.split(b"\n", 1)[0]
+        self.buffers[socket] = b""
+        try:
+            message = json.loads(line.decode('utf-8'))
+            command = str(message['command'])
+            args = [str(arg) for arg in message.get('args', [])]
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_reply(ControlRequest("", [], socket), {'ok': False, 'error': f"Некорректный запрос: {e}"})
+            return
+        
+        request = ControlRequest(command, args, socket)
+        if command not in COMMANDS:
+            self._send_reply(request, {'ok': False, 'error': f"Неизвестная команда: {command}"})
+            return
+        logger.info(f"Команда управления: {command} {' '.join(args)}".rstrip())
+        self.command_received.emit(request)
+    
+    def reply(self, request: ControlRequest, payload: Dict[str, Any]) -> None:
+        """
+        Отправить ответ на команду (можно вызывать из любого потока).
+        
+        Args:
+            request: Команда
+            payload: Ответ (ключ ok обязателен)
+        """
+        self._reply_ready.emit(request, payload)
+    
+    def _send_reply(self, request: ControlRequest, payload: Dict[str, Any]) -> None:
+        """Записать ответ в соединение клиента и закрыть его."""
+        socket = request.socket
+        if socket not in self.buffers or socket.state() != QLocalSocket.ConnectedState:
+            return
+        socket.write(json.dumps(payload, ensure_ascii=False).encode('utf-8') + b"\n")
+        socket.flush()
+        socket.disconnectFromServer()
+
+
+def send_command(command: str, args: Optional[List[str]] = None,
+                 timeout_ms: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """
+    Отправить команду запущенному экземпляру.
+    
+    Использует блокирующие вызовы QLocalSocket и не требует QApplication,
+    поэтому подходит для консольного клиента.
+    
+    Args:
+        command: Имя команды
+        args: Аргументы команды
+        timeout_ms: Время ожидания ответа (по умолчанию зависит от команды)
+        
+    Returns:
+        Ответ экземпляра или None, если он не ответил
+    """
+    if timeout_ms is None:
+        timeout_ms = TRANSCRIBE_TIMEOUT_MS if command == 'transcribe' else REPLY_TIMEOUT_MS
+    
+    socket = QLocalSocket()
+    socket.connectToServer(server_name())
+    if not socket.waitForConnected(1000):
+        return None
+    
+    request = json.dumps({'command': command, 'args': list(args or [])}, ensure_ascii=False)
+    socket.write(request.encode('utf-8') + b"\n")
+    socket.waitForBytesWritten(1000)
+    
+    data = b""
+    while b"\n" not in data:
+        if not socket.waitForReadyRead(timeout_ms):
+            break
+        data += bytes(socket.readAll())
+    socket.disconnectFromServer()
+    
+    if b"\n" not in data:
+        return None
+    try:
+        return json.loads(data.split(b"\n", 1)[0].decode('utf-8'))
+    except ValueError:
+        return None
+
+
+def prepare_args(command: str, args: List[str]) -> List[str]:
+    """
+    Привести аргументы команды к виду, понятному другому процессу.
+    
+    Args:
+        command: Имя команды
+        args: Аргументы командной строки
+        
+    Returns:
+        Аргументы (пути файлов - абсолютные)
+    """
+    if command == 'transcribe':
+        return [str(Path(arg).resolve()) for arg in args]
+    return list(args)
+
+
+def print_reply(reply: Optional[Dict[str, Any]]) -> int:
+    """
+    Вывести ответ экземпляра в консоль.
+    
+    Args:
+        reply: Ответ send_command
+        
+    Returns:
+        Код завершения процесса
+    """
+    if reply is None:
+        print("Votobu не запущен или не отвечает")
+        return 1
+    if not reply.get('ok'):
+        print(f"Ошибка: {reply.get('error', 'неизвестная')}")
+        return 1
+    for key, value in reply.items():
+        if key == 'text':
+            print(value)
+        elif key != 'ok':
+            print(f"{key}: {value}")
+    return 0
+
+
+if __name__ == "__main__":
+    # python instance_control.py <команда> [аргументы] - управление запущенным Votobu
+    import sys
+    
+    if len(sys.argv) < 2 or sys.argv[1] not in COMMANDS:
+        print("Использование: python instance_control.py <команда> [аргументы]\n")
+        for name, description in COMMANDS.items():
+            print(f"  {name:<11} {description}")
+        sys.exit(1)
+    
+    command = sys.argv[1]
+    sys.exit(print_reply(send_command(command, prepare_args(command, sys.argv[2:]))))
@@ -0,0 +1,236 @@
+"""
+Трассировка задержек распознавания.
+Записывает время каждого этапа диктовки в JSONL файл с ротацией.
+"""
+
+import json
+import queue
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from log_manager import get_logger
+
+logger = get_logger(__name__)
+
+
+class UtteranceTrace:
+    """Временная шкала одной диктовки (монотонные метки perf_counter)."""
+    
+    def __init__(self, start_time: float):
+        """
+        Инициализация трассы.
+        
+        Args:
+            start_time: Время события хука (perf_counter)
+        """
+        self.start_time = start_time
+        self.wall_time = time.time()
+        self.marks: Dict[str, float] = {'hook': start_time}
+        self.durations: Dict[str, float] = {}
+        self.info: Dict[str, object] = {}
+    
+    def mark(self, stage: str, timestamp: Optional[float] = None) -> None:
+        """
+        Отметить завершение этапа.
+        
+        Args:
+            stage: Название этапа
+            timestamp: Время (по умолчанию - текущее)
+        """
+        self.marks[stage] = timestamp if timestamp is not None else time.perf_counter()
+    
+    def add_duration(self, stage: str, seconds: float) -> None:
+        """
+        Указать длительность этапа явно (для этапов, идущих вперемешку).
+        
+        Args:
+            stage: Название этапа
+            seconds: Длительность в секундах
+        """
+        self.durations[stage] = self.durations.get(stage, 0.0) + seconds
+    
+    def interval_ms(self, start_stage: str, end_stage: str) -> Optional[float]:
+        """
+        Получить время между двумя отмеченными этапами.
+        
+        Args:
+            start_stage: Начальный этап
+            end_stage: Конечный этап
+            
+        Returns:
+            Время в миллисекундах или None, если этап не отмечен
+        """
+        if start_stage not in self.marks or end_stage not in self.marks:
+            return None
+        return round((self.marks[end_stage] - self.marks[start_stage]) * 1000, 3)
+    
+    def to_record(self, stages: List[str]) -> Dict[str, object]:
+        """
+        Преобразовать трассу в запись JSONL.
+        
+        Args:
+            stages: Порядок этапов
+            
+        Returns:
+            Словарь с отметками и длительностями этапов в миллисекундах
+        """
+        offsets = {
+            stage: round((self.marks[stage] - self.start_time) * 1000, 3)
+            for stage in stages if stage in self.marks
+        }
+        
+        durations = {}
+        previous = None
+        for stage in stages:
+            if stage in self.durations:
+                durations[stage] = round(self.durations[stage] * 1000, 3)
+            elif stage in self.marks and previous is not None:
+                durations[stage] = round((self.marks[stage] - self.marks[previous]) * 1000, 3)
+            if stage in self.marks:
+                previous = stage
+        
+        return {
+            "time": self.wall_time,
+            "offsets_ms": offsets,
+            "durations_ms": durations,
+            "info": self.info,
+        }
+
+
+class LatencyTracer:
+    """Сбор трасс задержек с записью в JSONL файл в фоновом потоке."""
+    
+    STAGES = [
+        'hook',
+        'stream_open',
+        'first_sample',
+        'release',
+        'buffer_finalize',
+        'preprocess',
+        'encoder',
+        'decoder',
+        'clipboard',
+        'notification',
+    ]
+    
+    def __init__(self, config_dir: Path, max_bytes: int = 1024 * 1024, backup_count: int = 3,
+                 history_size: int = 500):
+        """
+        Инициализация трассировщика.
+        
+        Args:
+            config_dir: Директория конфигурации
+            max_bytes: Размер файла, после которого выполняется ротация
+            backup_count: Количество старых файлов
+            history_size: Количество трасс в памяти для сводки
+        """
+        self.trace_file = Path(config_dir) / "latency_trace.jsonl"
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.history = deque(maxlen=history_size)
+        self.records: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._load_history()
+        
+        self.writer_thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self.writer_thread.start()
+    
+    def _load_history(self) -> None:
+        """Загрузить последние трассы из файла для сводки."""
+        if not self.trace_file.exists():
+            return
+        try:
+            with open(self.trace_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        self.history.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except Exception as e:
+            logger.error(f"Ошибка чтения трассы задержек: {e}")
+    
+    def begin(self, start_time: Optional[float] = None) -> UtteranceTrace:
+        """
+        Начать трассу новой диктовки.
+        
+        Args:
+            start_time: Время события хука (по умолчанию - текущее)
+            
+        Returns:
+            Объект трассы
+        """
+        return UtteranceTrace(start_time if start_time else time.perf_counter())
+    
+    def finish(self, trace: UtteranceTrace) -> None:
+        """
+        Завершить трассу и поставить ее в очередь записи.
+        
+        Args:
+            trace: Трасса диктовки
+        """
+        record = trace.to_record(self.STAGES)
+        self.history.append(record)
+        self.records.put_nowait(record)
+    
+    def _writer_loop(self) -> None:
+        """Записывать трассы в файл вне потока GUI."""
+        while True:
+            record = self.records.get()
+            try:
+                self._rotate_if_needed()
+                with open(self.trace_file, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            except Exception as e:
+                logger.error(f"Ошибка записи трассы задержек: {e}")
+    
+    def _rotate_if_needed(self) -> None:
+        """Сдвинуть файлы трассы, если текущий превысил лимит."""
+        if not self.trace_file.exists() or self.trace_file.stat().st_size < self.max_bytes:
+            return
+        
+        for index in range(self.backup_count - 1, 0, -1):
+            source = self.trace_file.with_suffix(f".jsonl.{index}")
+            if source.exists():
+                source.replace(self.trace_file.with_suffix(f".jsonl.{index + 1}"))
+        self.trace_file.replace(self.trace_file.with_suffix(".jsonl.1"))
+    
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Посчитать p50/p95 длительности каждого этапа.
+        
+        Returns:
+            Словарь этап → {count, p50, p95} в миллисекундах
+        """
+        result = {}
+        for stage in self.STAGES:
+            values = sorted(
+                record["durations_ms"][stage]
+                for record in list(self.history)
+                if stage in record.get("durations_ms", {})
+            )
+            if not values:
+                continue
+            result[stage] = {
+                'count': len(values),
+                'p50': values[int(0.5 * (len(values) - 1))],
+                'p95': values[int(0.95 * (len(values) - 1))],
+            }
+        return result
+    
+    def format_summary(self) -> str:
+        """
+        Сформировать текстовую сводку задержек.
+        
+        Returns:
+            Таблица этапов с p50/p95
+        """
+        summary = self.summary()
+        if not summary:
+            return "Нет данных о задержках"
+        
+        lines = ["Этап: p50 / p95 (мс)"]
+        for stage, stats in summary.items():
+            lines.append(f"{stage}: {stats['p50']:.1f} / {stats['p95']:.1f} (n={stats['count']})")
+        return "\n".join(lines)
@@ -0,0 +1,157 @@
+"""
+Менеджер логирования.
+Записи ставятся в очередь, а вывод в консоль и файл выполняется в фоновом потоке.
+"""
+
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+
+class RateLimitFilter(logging.Filter):
+    """Ограничение частоты сообщений из одного места кода (token bucket)."""
+    
+    def __init__(self, rate: float = 5.0, burst: int = 20):
+        """
+        Инициализация фильтра.
+        
+        Args:
+            rate: Сообщений в секунду из одной строки кода
+            burst: Максимальная пачка сообщений
+        """
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.buckets: Dict[Tuple[str, int], list] = {}
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        """
+        Пропустить запись, если для ее места в коде остались токены.
+        
+        Args:
+            record: Запись лога
+            
+        Returns:
+            True если запись нужно вывести
+        """
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            # [токены, время обновления, пропущено]
+            bucket = self.buckets[key] = [float(self.burst), now, 0]
+        
+        bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        if bucket[0] < 1.0:
+            bucket[2] += 1
+            return False
+        
+        bucket[0] -= 1.0
+        if bucket[2]:
+            record.msg = f"{record.getMessage()} (пропущено похожих сообщений: {bucket[2]})"
+            record.args = None
+            bucket[2] = 0
+        return True
+
+
+class LogManager:
+    """
+    Настройка логирования приложения через QueueHandler/QueueListener.
+    
+    Вызывающий поток только кладет запись в очередь (с ограничением
+    частоты), форматирование и запись в консоль/файл выполняются в
+    фоновом потоке, поэтому медленный вывод не задерживает работу.
+    """
+    
+    LOGGER_NAME = "votobu"
+    FORMAT = "%(asctime)s %(levelname)s [%(name)s] %(message)s"
+    
+    _lock = threading.Lock()
+    _queue: Optional[queue.SimpleQueue] = None
+    _listener: Optional[logging.handlers.QueueListener] = None
+    _file_handler: Optional[logging.Handler] = None
+    
+    @classmethod
+    def setup(cls, log_dir: Optional[Path] = None, level: Optional[str] = None,
+              file_name: str = "votobu.log") -> None:
+        """
+        Настроить логирование (повторный вызов добавляет файл лога).
+        
+        Args:
+            log_dir: Директория для файла лога (None - только консоль)
+            level: Уровень логирования (None - не менять, по умолчанию INFO)
+            file_name: Имя файла лога (у каждого процесса - свой файл из-за ротации)
+        """
+        with cls._lock:
+            root = logging.getLogger(cls.LOGGER_NAME)
+            if level is not None:
+                root.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+            
+            if cls._queue is None:
+                if level is None:
+                    root.setLevel(logging.INFO)
+                cls._queue = queue.SimpleQueue()
+                queue_handler = logging.handlers.QueueHandler(cls._queue)
+                queue_handler.addFilter(RateLimitFilter())
+                root.addHandler(queue_handler)
+                root.propagate = False
+                cls._start_listener()
+            
+            if log_dir is not None and cls._file_handler is None:
+                file_handler = logging.handlers.RotatingFileHandler(
+                    Path(log_dir) / file_name,
+                    maxBytes=1024 * 1024,
+                    backupCount=3,
+                    encoding='utf-8'
+                )
+                cls._file_handler = file_handler
+                cls._start_listener()
+    
+    @classmethod
+    def _start_listener(cls) -> None:
+        """(Пере)запустить фоновый поток вывода с актуальными обработчиками."""
+        if cls._listener is not None:
+            cls._listener.stop()
+        
+        formatter = logging.Formatter(cls.FORMAT)
+        handlers = []
+        
+        # Под pythonw (main.pyw) консоли нет и sys.stderr равен None
+        if sys.stderr is not None:
+            handlers.append(logging.StreamHandler(sys.stderr))
+        if cls._file_handler is not None:
+            handlers.append(cls._file_handler)
+        
+        for handler in handlers:
+            handler.setFormatter(formatter)
+        
+        cls._listener = logging.handlers.QueueListener(cls._queue, *handlers, respect_handler_level=True)
+        cls._listener.start()
+    
+    @classmethod
+    def shutdown(cls) -> None:
+        """Дописать очередь и остановить фоновый поток."""
+        with cls._lock:
+            if cls._listener is not None:
+                cls._listener.stop()
+                cls._listener = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    Получить логгер модуля.
+    
+    Args:
+        name: Имя модуля (обычно __name__)
+        
+    Returns:
+        Логгер в иерархии votobu
+    """
+    LogManager.setup()
+    return logging.getLogger(f"{LogManager.LOGGER_NAME}.{name}")
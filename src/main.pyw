@@ -23,10 +23,16 @@ if sys.platform == 'win32':
         if pyqt5_path.exists():
             os.environ['QT_PLUGIN_PATH'] = str(pyqt5_path)
 
-import pyperclip
+import threading
+from typing import List, Optional
+import soundfile as sf
 from PyQt5.QtWidgets import QApplication
 from PyQt5.QtCore import QObject, pyqtSignal, Qt
 
+from log_manager import LogManager, get_logger
+
+logger = get_logger(__name__)
+
 # Добавить ffmpeg в PATH для Whisper
 try:
     import imageio_ffmpeg
@@ -51,31 +57,83 @@ except Exception:
 
 # Импорт модулей приложения
 from config_manager import ConfigManager
+from latency_tracer import LatencyTracer
+from history_store import HistoryStore
+from audio_archive import AudioArchive
 from audio_recorder import AudioRecorder
-from speech_recognizer import SpeechRecognizer
+from continuous_dictation import DictationSession
+from recognition_worker import RemoteRecognizer
+from transcription_server import TranscriptionServer
 from hotkey_manager import HotkeyManager
+from hotkey_profiles import DEFAULT_PROFILE, build_profiles, profile_targets
+from model_calibration import calibrate_async, format_results, load_calibration, recommend_model
 from settings_window import SettingsWindow
+from history_window import HistoryWindow
 from tray_app import TrayApp
+from event_dispatcher import EventDispatcher
+from text_delivery import create_delivery, is_injecting, timed_deliver, ClipboardDelivery
+from capture_buffer import CaptureBuffer
+from instance_control import COMMANDS, ControlServer, InstanceLock, prepare_args, print_reply, send_command
 
 
 class VotobuApp(QObject):
     """Главный класс приложения Votobu."""
     
+    # Результат проверки моделей из фонового потока
+    models_verified = pyqtSignal(dict)
+    models_calibrated = pyqtSignal(dict)
+    
     def __init__(self):
         """Инициализация приложения."""
         super().__init__()
         
         # Инициализация компонентов
         self.config_manager = ConfigManager()
+        LogManager.setup(self.config_manager.config_dir, self.config_manager.get('log_level', 'INFO'))
+        self.model_store = None
+        self.calibrating = False
+        self.latency_tracer = LatencyTracer(self.config_manager.config_dir)
+        self.current_trace = None
+        self.history_store = None
+        if self.config_manager.get('history_enabled', True):
+            self.history_store = HistoryStore(self.config_manager.config_dir)
+        self.audio_archive = None
+        self.pending_archive = {}
+        # Файлы записей, ожидающих распознавания (удаляются после результата)
+        self.pending_recordings = {}
+        if self.config_manager.get('archive_enabled', False):
+            self.audio_archive = AudioArchive(
+                self.config_manager.get('archive_dir') or self.config_manager.config_dir / "archive",
+                int(self.config_manager.get('archive_max_mb', 2048)) * 1024 * 1024
+            )
         self.audio_recorder = None
         self.speech_recognizer = None
+        self.transcription_server = None
         self.hotkey_manager = None
         self.settings_window = None
+        self.history_window = None
         self.tray_app = None
+        self.dispatcher = EventDispatcher()
+        
+        # Сеанс непрерывной диктовки и уже доставленный текст сеанса
+        self.dictation_session = None
+        self.dictation_texts = []
+        
+        # Канал управления открывается до загрузки модели: команды ждут в очереди сокета
+        self.control_server = ControlServer(self)
+        self.control_server.listen()
+        self.deliveries = {}
+        self._set_delivery(self.config_manager.get('delivery_mode', 'clipboard'))
+        self.partials_delivered = False
         
         # Инициализация
         self._init_components()
         self._connect_signals()
+        self._recover_recordings()
+        
+        # Однократная калибровка моделей для автоматического выбора
+        if self.config_manager.get('auto_select_model', False) and not load_calibration(self.config_manager.config_dir):
+            self._on_calibration_requested()
     
     def _init_components(self) -> None:
         """Инициализировать все компоненты."""
@@ -85,14 +143,49 @@ class VotobuApp(QObject):
         # Создать аудио рекордер
         self.audio_recorder = AudioRecorder(
             sample_rate=config.get('sample_rate', 16000),
-            channels=config.get('channels', 1)
+            channels=config.get('channels', 1),
+            spill_dir=config.get('capture_spill_dir') or self.config_manager.config_dir / "capture",
+            ram_limit_mb=config.get('capture_ram_limit_mb', 64),
+            native_rate=config.get('capture_native_rate', True),
+            preprocess_stages=config.get('preprocess_stages', [])
         )
         
         # Создать распознаватель речи
-        self.speech_recognizer = SpeechRecognizer(
+        recognizer_options = dict(
             model_name=config.get('whisper_model', 'base'),
-            language=config.get('language', 'ru')
+            language=config.get('language', 'ru'),
+            model_routing=config.get('model_routing', {}),
+            memory_budget_mb=config.get('model_memory_budget_mb', 4096),
+            cascade_model=config.get('cascade_model'),
+            cascade_thresholds=config.get('cascade_thresholds'),
+            draft_model=config.get('draft_model'),
+            draft_tokens=config.get('draft_tokens', 4),
+            idle_timeout=config.get('model_idle_timeout', 600),
+            adaptive_idle_timeout=config.get('adaptive_idle_timeout', True)
         )
+        # Локальный HTTP/WebSocket сервис работает там же, где модель
+        server_options = dict(
+            port=config.get('server_port', 8765),
+            batch_window_ms=config.get('server_batch_window_ms', 20),
+            max_batch=config.get('server_max_batch', 8)
+        ) if config.get('server_enabled', False) else None
+        if config.get('recognition_process', False):
+            # Whisper в отдельном процессе: интерфейс, хук и запись не делят с ним GIL
+            self.speech_recognizer = RemoteRecognizer(
+                self.config_manager.config_dir,
+                config.get('log_level', 'INFO'),
+                server_options=server_options,
+                **recognizer_options
+            )
+        else:
+            # torch и Whisper импортируются, только если распознавание идет в этом процессе
+            from model_store import ModelStore
+            from speech_recognizer import SpeechRecognizer
+            self.model_store = ModelStore(self.config_manager.config_dir)
+            self.speech_recognizer = SpeechRecognizer(model_store=self.model_store, **recognizer_options)
+            if server_options is not None:
+                self.transcription_server = TranscriptionServer(self.speech_recognizer, **server_options)
+                self.transcription_server.start()
         
         # Загрузить модель Whisper в фоне
         self.speech_recognizer.load_model()
@@ -102,6 +195,11 @@ class VotobuApp(QObject):
             hotkey=config.get('hotkey', 'f9')
         )
         
+        # Профили дополнительных клавиш: их модели загружаются заранее в пределах бюджета памяти
+        self.profiles = build_profiles(config)
+        self.active_profile = DEFAULT_PROFILE
+        self._register_profiles()
+        
         # Создать приложение трея
         icon_path = self._get_asset_path('icon.png')
         recording_icon_path = self._get_asset_path('icon_recording.png')
@@ -110,6 +208,7 @@ class VotobuApp(QObject):
             icon_path=icon_path,
             recording_icon_path=recording_icon_path
         )
+        self.tray_app.set_level_source(self.audio_recorder.get_level)
     
     def _get_asset_path(self, filename: str) -> str:
         """Получить путь к файлу ресурса."""
@@ -121,60 +220,342 @@ class VotobuApp(QObject):
     
     def _connect_signals(self) -> None:
         """Связать сигналы и слоты компонентов."""
-        # Hotkey manager callbacks
-        self.hotkey_manager.set_on_press(self._on_hotkey_press)
-        self.hotkey_manager.set_on_release(self._on_hotkey_release)
+        # Hotkey manager → диспетчер → обработчики в потоке Qt
+        self.hotkey_manager.set_on_press(self.dispatcher.post_press)
+        self.hotkey_manager.set_on_release(lambda timestamp, binding: self.dispatcher.post_release(timestamp))
+        # Текст, который печатает само приложение, не должен начинать запись
+        self.hotkey_manager.set_suppress_check(is_injecting)
+        self.dispatcher.hotkey_pressed.connect(self._on_hotkey_press, Qt.QueuedConnection)
+        self.dispatcher.hotkey_released.connect(self._on_hotkey_release, Qt.QueuedConnection)
+        self.dispatcher.partial_ready.connect(self._on_partial_text, Qt.QueuedConnection)
+        self.dispatcher.recognition_finished.connect(self._on_recognition_complete, Qt.QueuedConnection)
+        self.dispatcher.recovery_finished.connect(self._on_recovered_text, Qt.QueuedConnection)
+        self.dispatcher.utterance_ready.connect(self._on_utterance_text, Qt.QueuedConnection)
+        self.dispatcher.dictation_finished.connect(self._on_dictation_finished, Qt.QueuedConnection)
         
         # Tray app signals
         self.tray_app.settings_requested.connect(self._on_settings_requested)
+        self.tray_app.verify_models_requested.connect(self._on_verify_models_requested)
+        self.tray_app.latency_stats_requested.connect(self._on_latency_stats_requested)
+        self.tray_app.history_requested.connect(self._on_history_requested)
+        self.tray_app.diagnostics_requested.connect(self._on_diagnostics_requested)
+        self.models_verified.connect(self._on_models_verified)
+        self.tray_app.calibration_requested.connect(self._on_calibration_requested)
+        self.models_calibrated.connect(self._on_models_calibrated)
         self.tray_app.quit_requested.connect(self._on_quit_requested)
         
+        # Команды второго экземпляра и консольного клиента
+        self.control_server.command_received.connect(self._on_control_command)
+        
         # Запустить менеджер горячих клавиш
         self.hotkey_manager.start()
     
-    def _on_hotkey_press(self) -> None:
+    def _register_profiles(self) -> None:
+        """Привязать клавиши профилей и начать загрузку их моделей."""
+        self.hotkey_manager.set_profile_bindings({
+            profile.hotkey: name for name, profile in self.profiles.items() if name != DEFAULT_PROFILE
+        })
+        if len(self.profiles) > 1:
+            self.speech_recognizer.preload_profiles(profile_targets(self.profiles))
+    
+    def _set_delivery(self, mode: str) -> None:
+        """
+        Переключить способ доставки текста.
+        
+        Объект доставки создается один раз на режим: печать держит свой
+        поток с очередью, и при каждом переключении потоки бы множились.
+        
+        Args:
+            mode: Режим доставки (clipboard/paste/type)
+        """
+        if mode not in self.deliveries:
+            self.deliveries[mode] = create_delivery(mode)
+        self.delivery_mode = mode
+        self.text_delivery = self.deliveries[mode]
+    
+    def _activate_profile(self, name: str) -> None:
+        """
+        Применить профиль нажатой клавиши.
+        
+        Args:
+            name: Имя профиля
+        """
+        profile = self.profiles.get(name) or self.profiles[DEFAULT_PROFILE]
+        if profile.name != self.active_profile:
+            logger.info(f"Профиль {profile.name}: язык {profile.language}, модель {profile.model}, "
+                        f"доставка {profile.delivery_mode}")
+            self.active_profile = profile.name
+        
+        if profile.delivery_mode != self.delivery_mode:
+            self._set_delivery(profile.delivery_mode)
+    
+    def _recognition_profile(self):
+        """
+        Получить профиль, с которым распознается текущая запись.
+        
+        Returns:
+            Профиль дополнительной клавиши или None - основные настройки
+        """
+        if self.active_profile == DEFAULT_PROFILE:
+            return None
+        return self.profiles.get(self.active_profile)
+    
+    def _on_hotkey_press(self, timestamp: float = 0.0, profile: str = DEFAULT_PROFILE) -> None:
         """Обработчик нажатия горячей клавиши."""
+        # Непрерывная диктовка: нажатие начинает или завершает сеанс
+        if self.config_manager.get('dictation_mode', 'hold') == 'toggle':
+            if self.dictation_session is not None and self.audio_recorder.is_recording():
+                self._stop_dictation()
+            elif not self.audio_recorder.is_recording():
+                self._activate_profile(profile)
+                self._start_dictation()
+            return
+        
+        # Начать загрузку выгруженной модели параллельно с записью
+        if not self.audio_recorder.is_recording():
+            self._activate_profile(profile)
+        self.speech_recognizer.preload_async(self._recognition_profile())
+        
+        # Начать трассу задержек диктовки
+        trace = self.latency_tracer.begin(timestamp)
+        
         # Начать запись
         if self.audio_recorder.start():
+            trace.mark('stream_open')
+            self.current_trace = trace
             self.tray_app.set_recording_state(True)
     
-    def _on_hotkey_release(self) -> None:
+    def _on_hotkey_release(self, timestamp: float = 0.0) -> None:
         """Обработчик отпускания горячей клавиши."""
-        # Остановить запись
-        audio_file = self.audio_recorder.stop()
+        if self.config_manager.get('dictation_mode', 'hold') == 'toggle':
+            return
         
-        if audio_file:
+        trace, self.current_trace = self.current_trace, None
+        if trace is not None:
+            if self.audio_recorder.first_sample_time is not None:
+                trace.mark('first_sample', self.audio_recorder.first_sample_time)
+            trace.mark('release', timestamp or None)
+        
+        # Остановить запись: при 16 кГц аудио передается распознавателю без WAV файла
+        if self.audio_recorder.sample_rate == self.speech_recognizer.SAMPLE_RATE:
+            audio = self.audio_recorder.stop_buffer()
+        else:
+            audio = self.audio_recorder.stop()
+        capture_stats = self.audio_recorder.get_capture_stats()
+        if trace is not None:
+            trace.info['capture'] = capture_stats
+            if self.audio_archive is not None and audio is not None:
+                self.pending_archive[id(trace)] = self.audio_recorder.last_audio
+            if audio is not None:
+                self.pending_recordings[id(trace)] = (
+                    self.audio_recorder.last_buffer,
+                    audio if isinstance(audio, str) else None
+                )
+        
+        if audio is not None:
+            if trace is not None:
+                trace.mark('buffer_finalize')
             self.tray_app.set_recording_state(False)
             self.tray_app.set_recognizing_state()
             
+            # Печатать текст по мере распознавания, если способ доставки это умеет
+            on_partial = None
+            if self.config_manager.get('stream_partials', False) and self.text_delivery.STREAMS_PARTIALS:
+                on_partial = self.dispatcher.post_partial
+            self.partials_delivered = False
+            
             # Распознать речь асинхронно
+            # Результат вернется в поток Qt через диспетчер
             self.speech_recognizer.recognize_async(
-                audio_file,
-                self._on_recognition_complete
+                audio,
+                self.dispatcher.post_result,
+                trace,
+                on_partial,
+                self._recognition_profile()
             )
     
-    def _on_recognition_complete(self, text: str) -> None:
-        """Обработчик завершения распознавания."""
-        # Очистить временные файлы
+    def _recover_recordings(self) -> None:
+        """Распознать записи, оставшиеся на диске после аварийного завершения."""
+        buffers = CaptureBuffer.recover(self.audio_recorder.spill_dir)
+        for buffer in buffers:
+            logger.warning(f"Найдена запись, прерванная сбоем: {buffer.name} ({buffer.duration:.0f} с)")
+        
+        # Записи распознаются по очереди: следующая запускается из результата предыдущей
+        self._recognize_recovered(buffers)
+    
+    def _recognize_recovered(self, buffers: List[CaptureBuffer]) -> None:
+        """
+        Распознать первую из восстановленных записей и запланировать остальные.
+        
+        Args:
+            buffers: Восстановленные записи, ожидающие распознавания
+        """
+        if not buffers:
+            return
+        
+        buffer = buffers.pop(0)
+        audio = buffer.audio()
+        if buffer.sample_rate != self.speech_recognizer.SAMPLE_RATE:
+            # Файл передискретизируется в 16 кГц при потоковом чтении
+            audio = str(buffer.data_file.with_suffix('.wav'))
+            sf.write(audio, buffer.audio(), buffer.sample_rate, subtype='PCM_16')
+        
+        def on_result(text):
+            self.dispatcher.post_recovered(text)
+            buffer.discard()
+            if isinstance(audio, str):
+                Path(audio).unlink(missing_ok=True)
+            self._recognize_recovered(buffers)
+        
+        self.speech_recognizer.recognize_async(audio, on_result)
+    
+    def _on_recovered_text(self, text: Optional[str]) -> None:
+        """Обработчик распознавания записи, восстановленной после сбоя."""
+        if not text:
+            return
+        
+        # Только в буфер обмена: печатать в случайное активное окно нельзя
+        ClipboardDelivery().deliver(text)
+        if self.history_store is not None:
+            self.history_store.add(text, model=self.speech_recognizer.current_model_name(),
+                                   language=self.speech_recognizer.language)
+        self.tray_app.show_notification(
+            "Восстановлена запись после сбоя",
+            f"Скопировано в буфер обмена:\n{text[:100]}{'...' if len(text) > 100 else ''}"
+        )
+    
+    def _start_dictation(self) -> None:
+        """Начать сеанс непрерывной диктовки."""
+        profile = self._recognition_profile()
+        self.speech_recognizer.preload_async(profile)
+        
+        # Фразы выделяются в потоке обработки записи и распознаются, пока идет запись
+        session = DictationSession(
+            self.speech_recognizer,
+            self.audio_recorder.sample_rate,
+            self.dispatcher.post_utterance,
+            lambda stats: self.dispatcher.post_dictation_finished(session, stats),
+            profile=profile,
+            silence_ms=self.config_manager.get('endpoint_silence_ms', 700),
+            max_seconds=self.config_manager.get('endpoint_max_seconds', 20)
+        )
+        self.audio_recorder.set_block_listener(session.feed)
+        if not self.audio_recorder.start():
+            self.audio_recorder.set_block_listener(None)
+            session.finish()
+            return
+        
+        self.dictation_session = session
+        self.dictation_texts = []
+        self.tray_app.set_recording_state(True)
+        hotkey = self.config_manager.get('hotkey', 'f9').upper()
+        self.tray_app.show_notification(
+            "Непрерывная диктовка",
+            f"Текст появляется после пауз. {hotkey} - закончить диктовку"
+        )
+        logger.info("Непрерывная диктовка началась")
+    
+    def _stop_dictation(self) -> None:
+        """Остановить запись сеанса: оставшиеся фразы распознаются в фоне."""
+        self.audio_recorder.stop_buffer()
+        self.audio_recorder.set_block_listener(None)
+        self.dictation_session.finish()
+        self.tray_app.set_recording_state(False)
+        self.tray_app.set_recognizing_state()
+        logger.info("Непрерывная диктовка остановлена")
+    
+    def _on_utterance_text(self, text: str) -> None:
+        """Обработчик распознанной фразы непрерывной диктовки."""
+        if type(self.text_delivery) is ClipboardDelivery:
+            # В буфере обмена - весь текст сеанса, а не только последняя фраза
+            self.text_delivery.deliver(" ".join(self.dictation_texts + [text]))
+        else:
+            self.text_delivery.deliver(text if not self.dictation_texts else f" {text}")
+        self.dictation_texts.append(text)
+        
+        if self.history_store is not None:
+            self._add_to_history(text)
+    
+    def _on_dictation_finished(self, session, stats: dict) -> None:
+        """
+        Обработчик завершения сеанса непрерывной диктовки.
+        
+        Args:
+            session: Завершившийся сеанс
+            stats: Статистика сеанса
+        """
+        if session is not self.dictation_session:
+            return
+        self.dictation_session = None
         self.audio_recorder.cleanup()
+        self.tray_app.set_recording_state(False)
         
+        text = " ".join(self.dictation_texts)
+        if stats['utterances']:
+            logger.info(f"Диктовка: фраз {stats['utterances']}, речь {stats['speech_seconds']:.0f} с, "
+                        f"средняя задержка {stats['lag_total'] / stats['utterances'] * 1000:.0f} мс, "
+                        f"максимальная {stats['lag_max'] * 1000:.0f} мс")
+        if text:
+            self.tray_app.show_notification(
+                "Диктовка завершена",
+                f"{self.text_delivery.DESCRIPTION}:\n{text[:100]}{'...' if len(text) > 100 else ''}"
+            )
+        else:
+            self.tray_app.show_notification("Диктовка завершена", "Речь не распознана")
+    
+    def _on_partial_text(self, text: str) -> None:
+        """Обработчик очередной распознанной части текста."""
+        self.text_delivery.deliver(text if not self.partials_delivered else f" {text}")
+        self.partials_delivered = True
+    
+    def _on_recognition_complete(self, text: str, trace=None) -> None:
+        """Обработчик завершения распознавания."""
         # Вернуть статус в готовность
         self.tray_app.set_recording_state(False)
         
         if text:
-            # Скопировать в буфер обмена
-            pyperclip.copy(text)
+            # Доставить текст, если он еще не напечатан по частям
+            delivery_time = 0.0
+            if not self.partials_delivered:
+                delivery_time = timed_deliver(self.text_delivery, text)
+            self.partials_delivered = False
+            if trace is not None:
+                trace.mark('clipboard')
+                trace.info['delivery_us'] = round(abs(delivery_time) * 1e6, 1)
+            
+            # Предупредить, если при записи терялись сэмплы
+            warning = ""
+            capture_stats = trace.info.get('capture') if trace is not None else None
+            if capture_stats and capture_stats['overflows']:
+                warning = f"\n⚠ Потеряно аудио: {capture_stats['dropped_ms']} мс"
             
             # Показать уведомление
             self.tray_app.show_notification(
                 "Текст распознан",
-                f"Скопировано в буфер обмена:\n{text[:100]}{'...' if len(text) > 100 else ''}"
+                f"{self.text_delivery.DESCRIPTION}:\n{text[:100]}{'...' if len(text) > 100 else ''}{warning}"
             )
+            if trace is not None:
+                trace.mark('notification')
+                trace.info['chars'] = len(text)
+                self.latency_tracer.finish(trace)
+            
+            # Сохранить в историю (запись в фоне)
+            if self.history_store is not None:
+                self._add_to_history(text, trace)
         else:
             self.tray_app.show_notification(
                 "Ошибка",
                 "Не удалось распознать речь. Попробуйте еще раз."
             )
+        
+        # Архивировать запись после доставки текста
+        if trace is not None and self.audio_archive is not None:
+            self._archive_recording(text, trace)
+        
+        # Удалить файлы только этой записи: следующая может еще распознаваться
+        recording = self.pending_recordings.pop(id(trace), None)
+        if recording is not None:
+            self.audio_recorder.discard_recording(*recording)
     
     def _on_settings_requested(self) -> None:
         """Обработчик запроса открытия настроек."""
@@ -186,7 +567,10 @@ class VotobuApp(QObject):
             )
             
             if self.settings_window is None or not self.settings_window.isVisible():
-                self.settings_window = SettingsWindow(self.config_manager.config)
+                self.settings_window = SettingsWindow(
+                    self.config_manager.config,
+                    load_calibration(self.config_manager.config_dir)
+                )
                 self.settings_window.settings_saved.connect(self._on_settings_saved)
             
             # Убедиться что окно на экране в нужной позиции
@@ -215,6 +599,13 @@ class VotobuApp(QObject):
         hotkey_changed = new_config.get('hotkey') != self.config_manager.config.get('hotkey')
         language_changed = new_config.get('language') != self.config_manager.config.get('language')
         model_changed = new_config.get('whisper_model') != self.config_manager.config.get('whisper_model')
+        routing_changed = new_config.get('model_routing') != self.config_manager.config.get('model_routing')
+        cascade_changed = new_config.get('cascade_model') != self.config_manager.config.get('cascade_model')
+        draft_changed = new_config.get('draft_model') != self.config_manager.config.get('draft_model')
+        delivery_changed = new_config.get('delivery_mode') != self.config_manager.config.get('delivery_mode')
+        preprocess_changed = new_config.get('preprocess_stages') != self.config_manager.config.get('preprocess_stages')
+        dictation_mode_changed = new_config.get('dictation_mode') != self.config_manager.config.get('dictation_mode')
+        profiles_changed = new_config.get('hotkey_profiles') != self.config_manager.config.get('hotkey_profiles')
         
         # Сохранить конфигурацию
         self.config_manager.save_config(new_config)
@@ -226,9 +617,37 @@ class VotobuApp(QObject):
         if language_changed:
             self.speech_recognizer.change_language(new_config['language'])
         
+        if routing_changed:
+            self.speech_recognizer.change_model_routing(new_config.get('model_routing', {}))
+        
+        if cascade_changed:
+            self.speech_recognizer.change_cascade(
+                new_config.get('cascade_model'),
+                new_config.get('cascade_thresholds')
+            )
+        
+        if draft_changed:
+            self.speech_recognizer.change_draft_model(new_config.get('draft_model'))
+        
+        if delivery_changed:
+            self._set_delivery(new_config.get('delivery_mode', 'clipboard'))
+        
+        if preprocess_changed:
+            self.audio_recorder.set_preprocess_stages(new_config.get('preprocess_stages', []))
+        
+        # Режим диктовки: начатый сеанс непрерывной диктовки завершается
+        if dictation_mode_changed and self.dictation_session is not None and self.audio_recorder.is_recording():
+            self._stop_dictation()
+        
         if model_changed:
             self.speech_recognizer.change_model(new_config['whisper_model'])
         
+        # Профили дополнительных клавиш
+        self.profiles = build_profiles(new_config)
+        self._activate_profile(self.active_profile)
+        if profiles_changed or hotkey_changed:
+            self._register_profiles()
+        
         # Показать уведомление об успешном сохранении
         if hotkey_changed:
             # Специальное уведомление для изменения горячей клавиши
@@ -254,6 +673,204 @@ class VotobuApp(QObject):
                 "Изменения применены успешно!"
             )
     
+    def _archive_recording(self, text: str, trace) -> None:
+        """Передать запись в архив (кодирование выполняется в фоне)."""
+        audio = self.pending_archive.pop(id(trace), None)
+        if audio is not None:
+            self.audio_archive.submit(
+                audio,
+                self.audio_recorder.sample_rate,
+                text,
+                trace.info.get('model'),
+                trace.info.get('language', self.speech_recognizer.language)
+            )
+    
+    def _add_to_history(self, text: str, trace=None) -> None:
+        """Добавить результат в историю."""
+        duration = None
+        latency_ms = None
+        model = self.speech_recognizer.current_model_name()
+        language = self.speech_recognizer.language
+        if trace is not None:
+            capture_stats = trace.info.get('capture')
+            if capture_stats:
+                duration = capture_stats['frames'] / capture_stats['sample_rate']
+            latency_ms = trace.interval_ms('release', 'clipboard')
+            model = trace.info.get('model', model)
+            language = trace.info.get('language', language)
+        
+        self.history_store.add(text, duration, model, language, latency_ms)
+        if self.history_window is not None and self.history_window.isVisible():
+            self.history_window.refresh()
+    
+    def _on_control_command(self, request) -> None:
+        """
+        Выполнить команду, полученную по каналу управления.
+        
+        Args:
+            request: Команда (ControlRequest)
+        """
+        command = request.command
+        recording = self.audio_recorder.is_recording()
+        
+        if command == 'show':
+            hotkey = self.config_manager.get('hotkey', 'f9').upper()
+            self.tray_app.show_notification("Votobu уже запущен", f"Удерживайте {hotkey} для записи")
+        elif command == 'start' or (command == 'toggle' and not recording):
+            if not recording:
+                self.dispatcher.post_press()
+        elif command == 'stop' or command == 'toggle':
+            if recording and self.dictation_session is not None:
+                self.dispatcher.post_press()
+            elif recording:
+                self.dispatcher.post_release()
+        elif command == 'status':
+            self.control_server.reply(request, {
+                'ok': True,
+                'recording': recording,
+                'recognizing': self.speech_recognizer.is_recognizing(),
+                'model': self.speech_recognizer.current_model_name(),
+                'profile': self.active_profile,
+            })
+            return
+        elif command == 'reload':
+            self._on_settings_saved(self.config_manager.read_config())
+        elif command == 'transcribe':
+            if not request.args or not Path(request.args[0]).is_file():
+                self.control_server.reply(request, {'ok': False, 'error': "Файл не найден"})
+                return
+            
+            def on_result(text: Optional[str]) -> None:
+                if text is None:
+                    self.control_server.reply(request, {'ok': False, 'error': "Текст не распознан"})
+                else:
+                    self.control_server.reply(request, {'ok': True, 'text': text})
+            
+            self.speech_recognizer.recognize_async(request.args[0], on_result)
+            return
+        
+        self.control_server.reply(request, {'ok': True})
+    
+    def _on_history_requested(self) -> None:
+        """Обработчик запроса окна истории."""
+        if self.history_store is None:
+            self.tray_app.show_notification("История", "История отключена в настройках")
+            return
+        
+        if self.history_window is None:
+            self.history_window = HistoryWindow(self.history_store)
+        else:
+            self.history_window.refresh()
+        self.history_window.show()
+        self.history_window.raise_()
+        self.history_window.activateWindow()
+    
+    def _on_latency_stats_requested(self) -> None:
+        """Показать сводку задержек по этапам диктовки."""
+        self.tray_app.show_info("Статистика задержек", self.latency_tracer.format_summary())
+    
+    def _on_diagnostics_requested(self) -> None:
+        """Показать диагностику захвата аудио, хука и каскада моделей."""
+        capture = self.audio_recorder.get_capture_stats()
+        hook = self.hotkey_manager.get_hook_stats()
+        cascade = self.speech_recognizer.get_cascade_stats()
+        
+        lines = [
+            "Последняя запись:",
+            f"  переполнений входа: {capture['overflows']}, опустошений: {capture['underflows']}",
+            f"  потеряно: {capture['dropped_frames']} фреймов ({capture['dropped_ms']} мс)",
+            f"  джиттер callback: среднее {capture['jitter_mean_ms']} мс, максимум {capture['jitter_max_ms']} мс",
+            f"  время callback: среднее {capture['callback_mean_us']} мкс, максимум {capture['callback_max_us']} мкс",
+            f"  blocksize: {capture['blocksize'] or 'авто'}, latency: {capture['latency']}",
+            *(f"  {name}: {cost['cpu_ms']} мс процессора ({cost['realtime_factor']:.2%} длительности)"
+              for name, cost in capture.get('preprocess', {}).items()),
+            "",
+            "Хук горячих клавиш:",
+            f"  вызовов: {hook['calls']}, среднее {hook['mean_us']:.1f} мкс, максимум {hook['max_us']:.1f} мкс",
+        ]
+        if cascade['total']:
+            lines += [
+                "",
+                "Каскад моделей:",
+                f"  распознаваний: {cascade['total']}, эскалаций: {cascade['escalation_rate']:.0%}",
+            ]
+        
+        self.tray_app.show_info("Диагностика", "\n".join(lines))
+    
+    def _on_verify_models_requested(self) -> None:
+        """Обработчик запроса проверки контрольных сумм моделей."""
+        self.tray_app.show_notification(
+            "Проверка моделей",
+            "Проверка контрольных сумм скачанных моделей..."
+        )
+        
+        if self.model_store is None:
+            self.speech_recognizer.verify_models_async(self.models_verified.emit)
+            return
+        
+        def worker():
+            self.models_verified.emit(self.model_store.verify_all())
+        
+        threading.Thread(target=worker, daemon=True).start()
+    
+    def _on_models_verified(self, results: dict) -> None:
+        """
+        Обработчик завершения проверки моделей.
+        
+        Args:
+            results: Словарь модель → результат проверки
+        """
+        if not results:
+            message = "Скачанные модели не найдены"
+        else:
+            message = "\n".join(f"{'✓' if ok else '❌'} {name}" for name, ok in results.items())
+        self.tray_app.show_notification("Проверка моделей", message)
+    
+    def _on_calibration_requested(self) -> None:
+        """Обработчик запроса калибровки моделей на этом компьютере."""
+        if self.calibrating:
+            return
+        self.calibrating = True
+        self.tray_app.show_notification(
+            "Подбор модели",
+            "Замер скорости скачанных моделей на этом компьютере.\n"
+            "Это займет несколько минут, распознавание в это время медленнее"
+        )
+        
+        language = self.config_manager.get('language', 'ru')
+        calibrate_async(
+            self.config_manager.config_dir,
+            self.models_calibrated.emit,
+            self.config_manager.get('log_level', 'INFO'),
+            language=language if language != "auto" else None,
+            memory_budget_mb=self.config_manager.get('model_memory_budget_mb', 4096)
+        )
+    
+    def _on_models_calibrated(self, results: dict) -> None:
+        """
+        Обработчик завершения калибровки моделей.
+        
+        Args:
+            results: Замеры по моделям
+        """
+        self.calibrating = False
+        target_ms = self.config_manager.get('latency_target_ms', 3000)
+        message = format_results(results, target_ms)
+        
+        recommended = recommend_model(results, target_ms)
+        current_model = self.config_manager.get('whisper_model', 'base')
+        if recommended is not None and recommended != current_model:
+            if self.config_manager.get('auto_select_model', False):
+                logger.info(f"Модель выбрана по калибровке: {current_model} → {recommended}")
+                new_config = dict(self.config_manager.config)
+                new_config['whisper_model'] = recommended
+                self._on_settings_saved(new_config)
+                message += f"\nВыбрана модель {recommended}"
+            else:
+                message += f"\nРекомендуется модель {recommended} (сейчас {current_model})"
+        
+        self.tray_app.show_notification("Подбор модели", message)
+    
     def _on_quit_requested(self) -> None:
         """Обработчик запроса выхода из приложения."""
         # Остановить компоненты
@@ -264,16 +881,48 @@ class VotobuApp(QObject):
             self.audio_recorder.stop()
             self.audio_recorder.cleanup()
         
+        # Дописать историю
+        if self.history_store:
+            self.history_store.close()
+        
+        # Дописать архив записей
+        if self.audio_archive:
+            self.audio_archive.close()
+        
+        # Остановить процесс распознавания
+        if isinstance(self.speech_recognizer, RemoteRecognizer):
+            self.speech_recognizer.close()
+        
+        # Остановить сервис распознавания
+        if self.transcription_server:
+            self.transcription_server.close()
+        
+        # Закрыть канал управления
+        self.control_server.close()
+        
         # Скрыть трей
         if self.tray_app:
             self.tray_app.hide()
         
-        # Выйти из приложения
+        # Дописать лог и выйти из приложения
+        LogManager.shutdown()
         QApplication.quit()
 
 
 def main():
     """Точка входа приложения."""
+    # Команда запущенному экземпляру: main.py <команда> [аргументы]
+    command = sys.argv[1] if len(sys.argv) > 1 and sys.argv[1] in COMMANDS else None
+    args = prepare_args(command, sys.argv[2:]) if command else []
+    
+    # Второй запуск не загружает модель и не регистрирует хоткей, а передает команду первому
+    instance_lock = InstanceLock(ConfigManager().config_dir)
+    if not instance_lock.acquire():
+        sys.exit(print_reply(send_command(command or 'show', args)))
+    if command not in (None, 'show', 'start'):
+        print("Votobu не запущен")
+        sys.exit(1)
+    
     # Создать Qt приложение
     app = QApplication(sys.argv)
     
@@ -285,7 +934,9 @@ def main():
     votobu = VotobuApp()
     
     # Запустить event loop
-    sys.exit(app.exec_())
+    exit_code = app.exec_()
+    instance_lock.release()
+    sys.exit(exit_code)
 
 
 if __name__ == "__main__":
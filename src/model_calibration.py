@@ -0,0 +1,359 @@
+"""
+Калибровка моделей Whisper на текущем компьютере.
+Замеряет загрузку, скорость и память моделей на синтетической записи и подбирает модель под целевую задержку.
+"""
+
+import gc
+import json
+import multiprocessing
+import os
+import platform
+import threading
+import time
+from itertools import chain
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from log_manager import LogManager, get_logger
+
+logger = get_logger(__name__)
+
+# Частота дискретизации Whisper (внешний процесс не импортирует whisper)
+SAMPLE_RATE = 16000
+
+# Модели от быстрых к точным
+MODEL_ORDER = ["tiny", "base", "small", "medium", "large"]
+
+# Длительность синтетической записи - типичная фраза диктовки (секунды)
+CLIP_SECONDS = 10.0
+
+CALIBRATION_NAME = "calibration.json"
+
+
+def synthetic_clip(seconds: float = CLIP_SECONDS, seed: int = 0) -> np.ndarray:
+    """
+    Сгенерировать речеподобную запись для замеров.
+    
+    Слоги - гармоники плавающего основного тона с формантной огибающей,
+    собранные в слова с паузами, на фоне слабого шума. Запись
+    детерминирована, поэтому замеры на разных компьютерах сравнимы.
+    
+    Args:
+        seconds: Длительность записи
+        seed: Начальное значение генератора
+        
+    Returns:
+        Массив float32 16 кГц
+    """
+    rng = np.random.default_rng(seed)
+    total = int(seconds * SAMPLE_RATE)
+    audio = np.zeros(total, dtype=np.float64)
+    
+    position = int(0.3 * SAMPLE_RATE)
+    while position < total - SAMPLE_RATE // 2:
+        # Слово из нескольких слогов
+        for _ in range(int(rng.integers(1, 5))):
+            length = int(rng.uniform(0.12, 0.25) * SAMPLE_RATE)
+            if position + length > total:
+                break
+            t = np.arange(length) / SAMPLE_RATE
+            f0 = rng.uniform(100, 220) * (1 + 0.08 * np.sin(2 * np.pi * rng.uniform(2, 5) * t))
+            phase = 2 * np.pi * np.cumsum(f0) / SAMPLE_RATE
+            formants = rng.uniform([300, 900], [900, 2500])
+            
+            syllable = np.zeros(length)
+            for harmonic in range(1, 40):
+                frequency = f0.mean() * harmonic
+                if frequency > 4000:
+                    break
+                gain = np.exp(-((frequency - formants) / 150) ** 2).sum() + 0.02
+                syllable += gain * np.sin(harmonic * phase)
+            audio[position:position + length] += syllable * np.hanning(length)
+            position += length + int(rng.uniform(0.02, 0.06) * SAMPLE_RATE)
+        position += int(rng.uniform(0.15, 0.5) * SAMPLE_RATE)
+    
+    audio *= 0.3 / max(np.abs(audio).max(), 1e-6)
+    audio += rng.normal(0, 10 ** (-50 / 20), total)
+    return audio.astype(np.float32)
+
+
+def machine_fingerprint() -> Dict[str, Any]:
+    """
+    Получить признаки компьютера, от которых зависят замеры.
+    
+    Returns:
+        Имя узла, архитектура, процессор и число ядер
+    """
+    return {
+        'node': platform.node(),
+        'system': platform.system(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def load_calibration(config_dir: Path) -> Dict[str, Dict[str, Any]]:
+    """
+    Прочитать результаты калибровки этого компьютера.
+    
+    Результаты, снятые на другом компьютере (директория конфигурации
+    синхронизируется), не возвращаются.
+    
+    Args:
+        config_dir: Директория конфигурации
+        
+    Returns:
+        Замеры по моделям (пустой словарь, если калибровки не было)
+    """
+    path = Path(config_dir) / CALIBRATION_NAME
+    if not path.exists():
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except Exception as e:
+        logger.error(f"Ошибка чтения результатов калибровки: {e}")
+        return {}
+    
+    if data.get('machine') != machine_fingerprint():
+        logger.info("Результаты калибровки сняты на другом компьютере")
+        return {}
+    return data.get('models', {})
+
+
+def _save_result(config_dir: Path, model_name: str, result: Dict[str, Any]) -> None:
+    """Атомарно добавить замер модели в файл калибровки."""
+    path = Path(config_dir) / CALIBRATION_NAME
+    data = {'machine': machine_fingerprint(), 'models': load_calibration(config_dir)}
+    data['models'][model_name] = result
+    
+    temp_file = path.with_suffix('.tmp')
+    try:
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(temp_file, path)
+    except Exception as e:
+        logger.error(f"Ошибка сохранения результатов калибровки: {e}")
+
+
+def recommend_model(results: Dict[str, Dict[str, Any]], target_ms: float) -> Optional[str]:
+    """
+    Выбрать самую точную модель, укладывающуюся в целевую задержку.
+    
+    Args:
+        results: Замеры по моделям (load_calibration)
+        target_ms: Целевая p95 задержка от отпускания клавиши до текста (мс)
+        
+    Returns:
+        Название модели или None, если ни одна не укладывается
+    """
+    recommended = None
+    for model_name in MODEL_ORDER:
+        result = results.get(model_name)
+        if result and 'latency_p95_ms' in result and result['latency_p95_ms'] <= target_ms:
+            recommended = model_name
+    return recommended
+
+
+def calibrate_model(model, clip: np.ndarray, language: Optional[str], runs: int) -> Dict[str, Any]:
+    """
+    Замерить скорость загруженной модели.
+    
+    Запись распознается с параметрами приложения, но без fallback по
+    температуре: иначе время зависело бы от того, что модель "услышала"
+    в синтетическом сигнале.
+    
+    Args:
+        model: Модель Whisper
+        clip: Запись float32 16 кГц
+        language: Код языка (None - автоопределение)
+        runs: Количество замеров
+        
+    Returns:
+        RTF, средняя и p95 задержка (мс)
+    """
+    options = {'fp16': False, 'temperature': 0.0, 'condition_on_previous_text': False}
+    if language is not None:
+        options['language'] = language
+    
+    # Первый проход прогревает аллокатор и ядра torch
+    model.transcribe(clip[:SAMPLE_RATE], **options)
+    
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        model.transcribe(clip, **options)
+        times.append(time.perf_counter() - start)
+    
+    return {
+        'rtf': round(float(np.mean(times)) / (len(clip) / SAMPLE_RATE), 3),
+        'latency_mean_ms': round(float(np.mean(times)) * 1000),
+        'latency_p95_ms': round(float(np.percentile(times, 95)) * 1000),
+    }
+
+
+def calibrate(config_dir: Path, model_names: Optional[List[str]] = None, language: Optional[str] = None,
+              runs: int = 5, memory_budget_mb: int = 0, download: bool = False) -> Dict[str, Dict[str, Any]]:
+    """
+    Откалибровать модели и сохранить результаты в директории конфигурации.
+    
+    Каждая модель загружается заново (замеряется время холодной
+    загрузки) и выгружается перед следующей. Результат сохраняется
+    после каждой модели, поэтому прерванная калибровка не теряется.
+    
+    Args:
+        config_dir: Директория конфигурации
+        model_names: Модели для замера (по умолчанию - MODEL_ORDER)
+        language: Код языка (None - автоопределение)
+        runs: Количество замеров каждой модели
+        memory_budget_mb: Пропускать модели больше бюджета памяти (0 - без ограничений)
+        download: Скачивать отсутствующие модели (иначе они пропускаются)
+        
+    Returns:
+        Замеры по моделям
+    """
+    import torch
+    from model_pool import ModelPool
+    from model_store import ModelStore
+    
+    store = ModelStore(Path(config_dir))
+    clip = synthetic_clip()
+    results = {}
+    
+    for model_name in model_names or MODEL_ORDER:
+        if memory_budget_mb and ModelPool.estimate_memory(model_name) > memory_budget_mb:
+            logger.info(f"Калибровка: {model_name} пропущена - больше бюджета памяти {memory_budget_mb} МБ")
+            continue
+        if not download and not store.is_downloaded(model_name):
+            logger.info(f"Калибровка: {model_name} пропущена - модель не скачана")
+            continue
+        
+        model = None
+        try:
+            logger.info(f"Калибровка модели {model_name}...")
+            start = time.perf_counter()
+            model = store.load_model(model_name)
+            load_time = time.perf_counter() - start
+            memory_bytes = sum(tensor.numel() * tensor.element_size()
+                               for tensor in chain(model.parameters(), model.buffers()))
+            
+            result = calibrate_model(model, clip, language, runs)
+            result.update({
+                'load_s': round(load_time, 2),
+                'memory_mb': round(memory_bytes / 2 ** 20),
+                'threads': torch.get_num_threads(),
+                'runs': runs,
+                'measured_at': time.time(),
+            })
+        except Exception as e:
+            logger.error(f"Ошибка калибровки модели {model_name}: {e}")
+            continue
+        finally:
+            model = None
+            gc.collect()
+        
+        logger.info(f"Калибровка {model_name}: загрузка {result['load_s']} с, RTF {result['rtf']}, "
+                    f"p95 {result['latency_p95_ms']} мс, память {result['memory_mb']} МБ")
+        results[model_name] = result
+        _save_result(config_dir, model_name, result)
+    
+    return results
+
+
+def _calibration_process(config_dir: str, options: Dict[str, Any], log_level: str) -> None:
+    """Точка входа процесса калибровки."""
+    LogManager.setup(Path(config_dir), log_level, file_name="votobu-calibration.log")
+    try:
+        calibrate(Path(config_dir), **options)
+    finally:
+        LogManager.shutdown()
+
+
+def calibrate_async(config_dir: Path, callback: Callable[[Dict[str, Dict[str, Any]]], None],
+                    log_level: str = "INFO", **options) -> None:
+    """
+    Откалибровать модели в отдельном процессе.
+    
+    Модели не попадают в пул распознавателя и освобождают память вместе
+    с процессом, а torch не загружается в процесс интерфейса.
+    
+    Args:
+        config_dir: Директория конфигурации
+        callback: Получает результаты калибровки (вызывается из фонового потока)
+        log_level: Уровень логирования процесса калибровки
+        **options: Параметры calibrate
+    """
+    def worker():
+        context = multiprocessing.get_context('spawn')
+        process = context.Process(
+            target=_calibration_process,
+            args=(str(config_dir), options, log_level),
+            name="votobu-calibration",
+            daemon=True
+        )
+        process.start()
+        process.join()
+        if process.exitcode:
+            logger.error(f"Процесс калибровки завершился с кодом {process.exitcode}")
+        callback(load_calibration(config_dir))
+    
+    threading.Thread(target=worker, daemon=True).start()
+
+
+def format_results(results: Dict[str, Dict[str, Any]], target_ms: float) -> str:
+    """
+    Сформировать отчет калибровки.
+    
+    Args:
+        results: Замеры по моделям
+        target_ms: Целевая задержка (мс)
+        
+    Returns:
+        Текст отчета
+    """
+    if not results:
+        return "Нет откалиброванных моделей"
+    
+    recommended = recommend_model(results, target_ms)
+    lines = []
+    for model_name in MODEL_ORDER:
+        result = results.get(model_name)
+        if not result:
+            continue
+        mark = " ←" if model_name == recommended else ""
+        lines.append(f"{model_name}: {result['latency_p95_ms'] / 1000:.1f} с (p95), RTF {result['rtf']}, "
+                     f"{result['memory_mb']} МБ, загрузка {result['load_s']} с{mark}")
+    if recommended is None:
+        lines.append(f"Ни одна модель не укладывается в {target_ms / 1000:.1f} с")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    # python model_calibration.py [--download] [--runs N] [модели...] - откалибровать модели
+    import sys
+    from config_manager import ConfigManager
+    
+    config_manager = ConfigManager()
+    args = sys.argv[1:]
+    download = "--download" in args
+    runs = 5
+    if "--runs" in args:
+        runs = int(args[args.index("--runs") + 1])
+        del args[args.index("--runs"):args.index("--runs") + 2]
+    model_names = [arg for arg in args if not arg.startswith("--")] or None
+    
+    LogManager.setup(config_manager.config_dir, config_manager.get('log_level', 'INFO'))
+    language = config_manager.get('language', 'ru')
+    calibrate(
+        config_manager.config_dir,
+        model_names,
+        language if language != "auto" else None,
+        runs,
+        config_manager.get('model_memory_budget_mb', 4096),
+        download
+    )
+    print(format_results(load_calibration(config_manager.config_dir), config_manager.get('latency_target_ms', 3000)))
+    LogManager.shutdown()
@@ -0,0 +1,337 @@
+"""
+Пул загруженных моделей Whisper.
+Держит несколько моделей в памяти в пределах заданного бюджета.
+"""
+
+import ctypes
+import gc
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional
+
+import whisper
+
+from log_manager import get_logger
+
+logger = get_logger(__name__)
+
+
+class ModelPool:
+    """Потокобезопасный пул моделей Whisper с ограничением по памяти."""
+    
+    # Приблизительный объем RAM модели в float32 (МБ)
+    MODEL_MEMORY_MB = {
+        'tiny': 150, 'tiny.en': 150,
+        'base': 300, 'base.en': 300,
+        'small': 1000, 'small.en': 1000,
+        'medium': 2600, 'medium.en': 2600,
+        'large': 5000, 'large-v1': 5000, 'large-v2': 5000, 'large-v3': 5000,
+    }
+    
+    def __init__(self, memory_budget_mb: int = 0, model_store=None):
+        """
+        Инициализация пула.
+        
+        Args:
+            memory_budget_mb: Бюджет памяти для всех моделей (0 - без ограничений)
+            model_store: Хранилище проверенных чекпоинтов (None - загрузка через Whisper)
+        """
+        self.memory_budget_mb = memory_budget_mb
+        self.model_store = model_store
+        self.models: "OrderedDict[str, object]" = OrderedDict()
+        self.lock = threading.RLock()
+        self._loading: Dict[str, threading.Event] = {}
+    
+    @classmethod
+    def estimate_memory(cls, model_name: str) -> int:
+        """
+        Оценить объем памяти модели.
+        
+        Args:
+            model_name: Название модели
+            
+        Returns:
+            Объем памяти в МБ
+        """
+        return cls.MODEL_MEMORY_MB.get(model_name, cls.MODEL_MEMORY_MB['large'])
+    
+    def used_memory(self) -> int:
+        """
+        Получить суммарный объем загруженных моделей.
+        
+        Returns:
+            Объем памяти в МБ
+        """
+        with self.lock:
+            return sum(self.estimate_memory(name) for name in self.models)
+    
+    def fits(self, *model_names: str) -> bool:
+        """
+        Проверить, помещаются ли модели в бюджет одновременно.
+        
+        Args:
+            model_names: Названия моделей
+            
+        Returns:
+            True если модели помещаются в бюджет
+        """
+        if not self.memory_budget_mb:
+            return True
+        total = sum(self.estimate_memory(name) for name in set(model_names))
+        return total <= self.memory_budget_mb
+    
+    def is_loaded(self, model_name: str) -> bool:
+        """
+        Проверить, загружена ли модель.
+        
+        Args:
+            model_name: Название модели
+            
+        Returns:
+            True если модель в памяти
+        """
+        with self.lock:
+            return model_name in self.models
+    
+    def loaded_models(self) -> List[str]:
+        """
+        Получить список загруженных моделей.
+        
+        Returns:
+            Названия моделей от давно использованных к недавним
+        """
+        with self.lock:
+            return list(self.models.keys())
+    
+    def get(self, model_name: str, pinned: Optional[List[str]] = None):
+        """
+        Получить модель, загрузив ее при необходимости.
+        
+        Если новая модель не помещается в бюджет, из пула выгружаются
+        давно не использованные модели, кроме закрепленных.
+        
+        Args:
+            model_name: Название модели
+            pinned: Модели, которые нельзя выгружать
+            
+        Returns:
+            Модель Whisper
+        """
+        while True:
+            with self.lock:
+                if model_name in self.models:
+                    self.models.move_to_end(model_name)
+                    return self.models[model_name]
+                
+                event = self._loading.get(model_name)
+                if event is None:
+                    event = threading.Event()
+                    self._loading[model_name] = event
+                    break
+            
+            # Модель уже загружается в другом потоке - дождаться
+            event.wait()
+            with self.lock:
+                if model_name in self.models:
+                    continue
+            raise RuntimeError(f"Не удалось загрузить модель {model_name}")
+        
+        try:
+            self._make_room(model_name, pinned or [])
+            logger.info(f"Загрузка модели Whisper: {model_name}...")
+            model = self._load(model_name)
+            with self.lock:
+                self.models[model_name] = model
+            logger.info(f"Модель {model_name} загружена")
+            return model
+        finally:
+            with self.lock:
+                del self._loading[model_name]
+            event.set()
+    
+    def _load(self, model_name: str):
+        """
+        Загрузить модель с диска.
+        
+        Args:
+            model_name: Название модели
+            
+        Returns:
+            Модель Whisper
+        """
+        if self.model_store is not None:
+            return self.model_store.load_model(model_name)
+        return whisper.load_model(model_name)
+    
+    def _make_room(self, model_name: str, pinned: List[str]) -> None:
+        """
+        Выгрузить модели, чтобы освободить место под новую.
+        
+        Args:
+            model_name: Модель, которую нужно загрузить
+            pinned: Модели, которые нельзя выгружать
+        """
+        if not self.memory_budget_mb:
+            return
+        
+        needed = self.estimate_memory(model_name)
+        with self.lock:
+            for name in list(self.models.keys()):
+                if self.used_memory() + needed <= self.memory_budget_mb:
+                    break
+                if name in pinned:
+                    continue
+                logger.warning(f"Выгрузка модели {name}: превышен бюджет памяти")
+                del self.models[name]
+    
+    def preload(self, model_names: List[str]) -> List[str]:
+        """
+        Загрузить модели заранее в пределах бюджета.
+        
+        Модели перечисляются в порядке приоритета: модель, которая не
+        помещается в бюджет вместе с предыдущими, пропускается. После
+        загрузки первая модель становится самой недавней и выгружается
+        последней.
+        
+        Args:
+            model_names: Названия моделей в порядке приоритета
+            
+        Returns:
+            Названия моделей, находящихся в пуле
+        """
+        selected = []
+        for name in model_names:
+            if name in selected:
+                continue
+            if self.fits(*selected, name):
+                selected.append(name)
+            else:
+                logger.info(f"Модель {name} не помещается в бюджет памяти {self.memory_budget_mb} МБ вместе с "
+                            f"{', '.join(selected)} - загрузка при использовании")
+        
+        resident = []
+        for name in selected:
+            try:
+                self.get(name, pinned=selected)
+                resident.append(name)
+            except Exception as e:
+                logger.error(f"Ошибка предварительной загрузки модели {name}: {e}")
+        
+        with self.lock:
+            for name in reversed(resident):
+                if name in self.models:
+                    self.models.move_to_end(name)
+        return resident
+    
+    def unload(self, model_name: str) -> bool:
+        """
+        Выгрузить модель из пула.
+        
+        Args:
+            model_name: Название модели
+            
+        Returns:
+            True если модель была выгружена
+        """
+        with self.lock:
+            return self.models.pop(model_name, None) is not None
+    
+    def clear(self) -> None:
+        """Выгрузить все модели."""
+        with self.lock:
+            self.models.clear()
+    
+    @staticmethod
+    def release_memory() -> None:
+        """Вернуть освобожденную память моделей операционной системе."""
+        gc.collect()
+        
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except Exception:
+            pass
+        
+        # glibc не отдает крупные освобожденные арены без malloc_trim
+        if sys.platform.startswith('linux'):
+            try:
+                ctypes.CDLL("libc.so.6").malloc_trim(0)
+            except Exception:
+                pass
+
+
+class IdleUnloadPolicy:
+    """
+    Политика выгрузки моделей после простоя.
+    
+    В адаптивном режиме таймаут подстраивается под паузы между диктовками
+    пользователя: модель живет чуть дольше типичной паузы внутри сеанса
+    работы и выгружается на длинных перерывах.
+    """
+    
+    MIN_TIMEOUT = 60
+    HISTORY_SIZE = 50
+    
+    def __init__(self, timeout: float = 600, adaptive: bool = True):
+        """
+        Инициализация политики.
+        
+        Args:
+            timeout: Базовый таймаут простоя в секундах (0 - не выгружать)
+            adaptive: Подстраивать таймаут под паузы пользователя
+        """
+        self.timeout = timeout
+        self.adaptive = adaptive
+        self.last_used: Optional[float] = None
+        self.gaps = deque(maxlen=self.HISTORY_SIZE)
+        self.lock = threading.Lock()
+    
+    def touch(self, record_gap: bool = True) -> None:
+        """
+        Отметить использование модели.
+        
+        Args:
+            record_gap: Учитывать паузу с прошлого использования в статистике
+        """
+        now = time.monotonic()
+        with self.lock:
+            if record_gap and self.last_used is not None:
+                self.gaps.append(now - self.last_used)
+            self.last_used = now
+    
+    def current_timeout(self) -> float:
+        """
+        Получить действующий таймаут простоя.
+        
+        Returns:
+            Таймаут в секундах (0 - не выгружать)
+        """
+        if not self.timeout or not self.adaptive:
+            return self.timeout
+        
+        max_timeout = self.timeout * 3
+        with self.lock:
+            session_gaps = sorted(gap for gap in self.gaps if gap <= max_timeout)
+        
+        if len(session_gaps) < 5:
+            return self.timeout
+        
+        p90 = session_gaps[int(len(session_gaps) * 0.9) - 1]
+        return min(max(p90 * 1.5, self.MIN_TIMEOUT), max_timeout)
+    
+    def should_unload(self) -> bool:
+        """
+        Проверить, пора ли выгрузить модели.
+        
+        Returns:
+            True если простой превысил таймаут
+        """
+        timeout = self.current_timeout()
+        with self.lock:
+            last_used = self.last_used
+        if not timeout or last_used is None:
+            return False
+        return time.monotonic() - last_used > timeout
@@ -0,0 +1,264 @@
+"""
+Локальное хранилище моделей Whisper.
+Проверяет SHA-256 чекпоинта один раз и запоминает сигнатуру файла в манифесте.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import whisper
+
+from log_manager import get_logger
+
+logger = get_logger(__name__)
+
+
+class ModelStore:
+    """Хранилище чекпоинтов Whisper с манифестом проверенных файлов."""
+    
+    MANIFEST_NAME = "models_manifest.json"
+    HASH_CHUNK_SIZE = 8 * 1024 * 1024
+    
+    def __init__(self, config_dir: Path, download_root: Optional[str] = None):
+        """
+        Инициализация хранилища.
+        
+        Args:
+            config_dir: Директория конфигурации для манифеста
+            download_root: Директория чекпоинтов (по умолчанию кэш Whisper)
+        """
+        self.manifest_file = Path(config_dir) / self.MANIFEST_NAME
+        if download_root is None:
+            cache_dir = os.getenv("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+            download_root = os.path.join(cache_dir, "whisper")
+        self.download_root = download_root
+        self.lock = threading.Lock()
+        self.manifest = self._load_manifest()
+    
+    def _load_manifest(self) -> Dict[str, Dict]:
+        """Загрузить манифест проверенных чекпоинтов."""
+        if not self.manifest_file.exists():
+            return {}
+        try:
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Ошибка чтения манифеста моделей: {e}")
+            return {}
+    
+    def _save_manifest(self) -> None:
+        """Атомарно сохранить манифест."""
+        temp_file = self.manifest_file.with_suffix('.tmp')
+        try:
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.manifest, f, indent=2, ensure_ascii=False)
+            os.replace(temp_file, self.manifest_file)
+        except Exception as e:
+            logger.error(f"Ошибка сохранения манифеста моделей: {e}")
+    
+    @staticmethod
+    def _signature(path: str) -> Tuple[int, int, int]:
+        """
+        Получить сигнатуру файла.
+        
+        Args:
+            path: Путь к файлу
+            
+        Returns:
+            Кортеж (размер, mtime в наносекундах, inode)
+        """
+        stat = os.stat(path)
+        return stat.st_size, stat.st_mtime_ns, stat.st_ino
+    
+    @classmethod
+    def _sha256(cls, path: str) -> str:
+        """
+        Посчитать SHA-256 файла блоками.
+        
+        Args:
+            path: Путь к файлу
+            
+        Returns:
+            Хэш в hex
+        """
+        sha = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(cls.HASH_CHUNK_SIZE), b''):
+                sha.update(chunk)
+        return sha.hexdigest()
+    
+    @staticmethod
+    def is_known(model_name: str) -> bool:
+        """
+        Проверить, знает ли Whisper URL этой модели.
+        
+        Args:
+            model_name: Название модели
+            
+        Returns:
+            True если модель есть в списке официальных
+        """
+        return model_name in whisper._MODELS
+    
+    def is_downloaded(self, model_name: str) -> bool:
+        """
+        Проверить, скачан ли чекпоинт модели.
+        
+        Args:
+            model_name: Название модели
+            
+        Returns:
+            True если файл чекпоинта есть в директории загрузки
+        """
+        return self.is_known(model_name) and os.path.isfile(self._checkpoint_path(model_name))
+    
+    def _checkpoint_path(self, model_name: str) -> str:
+        """Путь к чекпоинту модели в директории загрузки."""
+        url = whisper._MODELS[model_name]
+        return os.path.join(self.download_root, os.path.basename(url))
+    
+    @staticmethod
+    def _expected_sha256(model_name: str) -> str:
+        """Ожидаемый SHA-256 чекпоинта (часть URL модели)."""
+        return whisper._MODELS[model_name].split("/")[-2]
+    
+    def _record(self, model_name: str, path: str, sha256: str) -> None:
+        """Записать проверенный чекпоинт в манифест."""
+        size, mtime_ns, inode = self._signature(path)
+        with self.lock:
+            self.manifest[model_name] = {
+                "path": path,
+                "size": size,
+                "mtime_ns": mtime_ns,
+                "inode": inode,
+                "sha256": sha256,
+                "verified_at": time.time(),
+            }
+            self._save_manifest()
+    
+    def _is_trusted(self, model_name: str, path: str) -> bool:
+        """
+        Проверить чекпоинт по манифесту без чтения файла.
+        
+        Args:
+            model_name: Название модели
+            path: Путь к чекпоинту
+            
+        Returns:
+            True если сигнатура файла не менялась с последней проверки
+        """
+        with self.lock:
+            entry = self.manifest.get(model_name)
+        if not entry or entry.get("path") != path or not os.path.isfile(path):
+            return False
+        if entry.get("sha256") != self._expected_sha256(model_name):
+            return False
+        return (entry["size"], entry["mtime_ns"], entry["inode"]) == self._signature(path)
+    
+    def verify(self, model_name: str) -> bool:
+        """
+        Полностью перепроверить SHA-256 чекпоинта.
+        
+        Args:
+            model_name: Название модели
+            
+        Returns:
+            True если хэш совпадает с ожидаемым
+        """
+        path = self._checkpoint_path(model_name)
+        if not os.path.isfile(path):
+            return False
+        
+        logger.info(f"Проверка SHA-256 модели {model_name}...")
+        sha256 = self._sha256(path)
+        if sha256 != self._expected_sha256(model_name):
+            logger.warning(f"Контрольная сумма модели {model_name} не совпадает")
+            with self.lock:
+                self.manifest.pop(model_name, None)
+                self._save_manifest()
+            return False
+        
+        self._record(model_name, path, sha256)
+        return True
+    
+    def verify_all(self) -> Dict[str, bool]:
+        """
+        Перепроверить все скачанные чекпоинты.
+        
+        Returns:
+            Словарь модель → результат проверки
+        """
+        results = {}
+        checked_paths = set()
+        for model_name in whisper._MODELS:
+            path = self._checkpoint_path(model_name)
+            if path in checked_paths or not os.path.isfile(path):
+                continue
+            checked_paths.add(path)
+            results[model_name] = self.verify(model_name)
+        return results
+    
+    def get_checkpoint(self, model_name: str) -> str:
+        """
+        Получить путь к проверенному чекпоинту, скачав его при необходимости.
+        
+        Args:
+            model_name: Название модели
+            
+        Returns:
+            Путь к файлу чекпоинта
+        """
+        path = self._checkpoint_path(model_name)
+        if self._is_trusted(model_name, path):
+            return path
+        
+        if os.path.isfile(path) and self.verify(model_name):
+            return path
+        
+        # Скачать заново: whisper._download проверяет хэш после загрузки
+        whisper._download(whisper._MODELS[model_name], self.download_root, False)
+        self._record(model_name, path, self._expected_sha256(model_name))
+        return path
+    
+    def load_model(self, model_name: str, device: Optional[str] = None):
+        """
+        Загрузить модель без повторного хэширования проверенного чекпоинта.
+        
+        Args:
+            model_name: Название модели
+            device: Устройство torch (None - по умолчанию)
+            
+        Returns:
+            Модель Whisper
+        """
+        if not self.is_known(model_name):
+            return whisper.load_model(model_name, device=device, download_root=self.download_root)
+        
+        model = whisper.load_model(self.get_checkpoint(model_name), device=device)
+        
+        # При загрузке по пути Whisper не знает alignment heads модели
+        alignment_heads = whisper._ALIGNMENT_HEADS.get(model_name)
+        if alignment_heads is not None:
+            model.set_alignment_heads(alignment_heads)
+        return model
+
+
+if __name__ == "__main__":
+    # python model_store.py --verify - перепроверить все скачанные модели
+    import sys
+    from config_manager import ConfigManager
+    
+    if "--verify" not in sys.argv:
+        print("Использование: python model_store.py --verify")
+        sys.exit(1)
+    
+    store = ModelStore(ConfigManager().config_dir)
+    results = store.verify_all()
+    for name, ok in results.items():
+        print(f"{'✓' if ok else '❌'} {name}")
+    sys.exit(0 if all(results.values()) else 1)
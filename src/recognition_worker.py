@@ -0,0 +1,507 @@
+"""
+Процесс распознавания речи.
+Whisper работает в отдельном процессе, аудио передается через общую память.
+"""
+
+import itertools
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from log_manager import LogManager, get_logger
+
+logger = get_logger(__name__)
+
+# Частота дискретизации Whisper (внешний процесс не импортирует whisper)
+SAMPLE_RATE = 16000
+
+# Методы распознавателя, которые можно вызвать из внешнего процесса
+REMOTE_METHODS = {
+    'preload_async',
+    'preload_profiles',
+    'change_language',
+    'change_model',
+    'change_model_routing',
+    'change_cascade',
+    'change_draft_model',
+    'change_idle_timeout',
+}
+
+
+def _share_audio(audio: Union[str, Path, np.ndarray]) -> Tuple[tuple, Optional[shared_memory.SharedMemory]]:
+    """
+    Подготовить аудио к передаче в процесс распознавания.
+    
+    Путь передается как есть, numpy.memmap - как файл с параметрами
+    (процесс распознавания откроет его сам), массив в памяти копируется
+    в новый сегмент общей памяти.
+    
+    Args:
+        audio: Путь к файлу или массив сэмплов
+        
+    Returns:
+        Кортеж (описание аудио, сегмент общей памяти или None)
+    """
+    if isinstance(audio, (str, Path)):
+        return ('file', str(audio)), None
+    
+    if isinstance(audio, np.memmap) and audio.filename:
+        return ('memmap', audio.filename, audio.dtype.str, audio.shape, audio.offset), None
+    
+    audio = np.ascontiguousarray(audio)
+    segment = shared_memory.SharedMemory(create=True, size=max(audio.nbytes, 1))
+    np.ndarray(audio.shape, dtype=audio.dtype, buffer=segment.buf)[...] = audio
+    return ('shm', segment.name, audio.dtype.str, audio.shape), segment
+
+
+def _attach_audio(ref: tuple) -> Tuple[Union[str, np.ndarray], Optional[shared_memory.SharedMemory]]:
+    """
+    Открыть аудио, переданное внешним процессом, без копирования.
+    
+    Args:
+        ref: Описание из _share_audio
+        
+    Returns:
+        Кортеж (путь или массив, подключенный сегмент общей памяти или None)
+    """
+    kind = ref[0]
+    if kind == 'file':
+        return ref[1], None
+    if kind == 'memmap':
+        _, path, dtype, shape, offset = ref
+        return np.memmap(path, dtype=dtype, mode='r', shape=shape, offset=offset), None
+    
+    _, name, dtype, shape = ref
+    segment = shared_memory.SharedMemory(name=name)
+    return np.ndarray(shape, dtype=dtype, buffer=segment.buf), segment
+
+
+def _lower_priority() -> None:
+    """Понизить приоритет процесса, чтобы декодирование не мешало интерфейсу и захвату."""
+    try:
+        if sys.platform == 'win32':
+            import ctypes
+            BELOW_NORMAL_PRIORITY_CLASS = 0x4000
+            kernel32 = ctypes.windll.kernel32
+            kernel32.SetPriorityClass(kernel32.GetCurrentProcess(), BELOW_NORMAL_PRIORITY_CLASS)
+        else:
+            os.nice(5)
+    except Exception as e:
+        logger.warning(f"Не удалось понизить приоритет процесса распознавания: {e}")
+
+
+def run_worker(connection, options: Dict[str, Any], config_dir: str, log_level: str,
+               server_options: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Точка входа процесса распознавания.
+    
+    Команды принимаются в основном потоке, распознавания выполняются по
+    очереди в отдельном потоке, чтобы смена настроек не ждала декодирования.
+    
+    Args:
+        connection: Конец канала управления (multiprocessing.Pipe)
+        options: Параметры SpeechRecognizer
+        config_dir: Директория конфигурации
+        log_level: Уровень логирования
+        server_options: Параметры TranscriptionServer (None - сервис выключен)
+    """
+    LogManager.setup(Path(config_dir), log_level, file_name="votobu-recognizer.log")
+    _lower_priority()
+    
+    from latency_tracer import UtteranceTrace
+    from model_store import ModelStore
+    from speech_recognizer import SpeechRecognizer
+    
+    model_store = ModelStore(Path(config_dir))
+    recognizer = SpeechRecognizer(model_store=model_store, **options)
+    send_lock = threading.Lock()
+    
+    def send(*message) -> None:
+        try:
+            with send_lock:
+                connection.send(message)
+        except OSError:
+            # Внешний процесс уже закрыл канал
+            pass
+    
+    def state() -> Dict[str, Any]:
+        return {
+            'model': recognizer.current_model_name(),
+            'cascade': recognizer.get_cascade_stats(),
+        }
+    
+    def load() -> None:
+        recognizer.load_model()
+        send('state', state())
+    
+    def recognize(request_id: int, ref: tuple, start_time: Optional[float], partials: bool, profile) -> None:
+        trace = UtteranceTrace(start_time) if start_time is not None else None
+        on_partial = (lambda text: send('partial', request_id, text)) if partials else None
+        text = None
+        try:
+            audio, segment = _attach_audio(ref)
+            text = recognizer.recognize(audio, trace, on_partial, profile)
+            del audio
+            if segment is not None:
+                segment.close()
+        except (OSError, ValueError, BufferError) as e:
+            logger.error(f"Ошибка получения аудио от внешнего процесса: {e}")
+        
+        timeline = (trace.marks, trace.durations, trace.info) if trace is not None else None
+        send('result', request_id, text, timeline, state())
+    
+    def recognize_loop() -> None:
+        # Один поток распознавания: запросы не декодируются одной моделью одновременно
+        while True:
+            request = requests.get()
+            if request is None:
+                break
+            recognize(*request)
+    
+    def verify() -> None:
+        send('verified', model_store.verify_all())
+    
+    requests = queue.SimpleQueue()
+    threading.Thread(target=load, daemon=True).start()
+    threading.Thread(target=recognize_loop, name="votobu-recognize", daemon=True).start()
+    logger.info(f"Процесс распознавания запущен (pid {os.getpid()})")
+    
+    server = None
+    if server_options is not None:
+        from transcription_server import TranscriptionServer
+        server = TranscriptionServer(recognizer, **server_options)
+        server.start()
+    
+    while True:
+        try:
+            message = connection.recv()
+        except (EOFError, OSError):
+            break
+        
+        command = message[0]
+        if command == 'stop':
+            break
+        elif command == 'recognize':
+            requests.put(message[1:])
+        elif command == 'verify':
+            threading.Thread(target=verify, daemon=True).start()
+        elif command == 'call' and message[1] in REMOTE_METHODS:
+            getattr(recognizer, message[1])(*message[2])
+            send('state', state())
+        else:
+            logger.warning(f"Неизвестная команда процесса распознавания: {command}")
+    
+    requests.put(None)
+    if server is not None:
+        server.close()
+    logger.info("Процесс распознавания остановлен")
+    LogManager.shutdown()
+
+
+class RemoteRecognizer:
+    """
+    Распознаватель в отдельном процессе с интерфейсом SpeechRecognizer.
+    
+    Внешний процесс (трей, хоткеи, запись) не загружает torch и Whisper:
+    GIL процесса распознавания не задерживает интерфейс, хук клавиатуры и
+    callback PortAudio. Аудио передается через общую память, по каналу
+    управления идут только команды и результаты. Callback распознавания
+    вызывается из потока чтения канала.
+    """
+    
+    SAMPLE_RATE = SAMPLE_RATE
+    
+    # Время ожидания завершения процесса при выходе (секунды)
+    STOP_TIMEOUT = 5.0
+    
+    def __init__(self, config_dir: Path, log_level: str = "INFO",
+                 server_options: Optional[Dict[str, Any]] = None, **options):
+        """
+        Инициализация и запуск процесса распознавания.
+        
+        Args:
+            config_dir: Директория конфигурации
+            log_level: Уровень логирования процесса распознавания
+            server_options: Параметры сервиса распознавания в процессе (None - выключен)
+            **options: Параметры SpeechRecognizer (кроме model_store)
+        """
+        self.config_dir = Path(config_dir)
+        self.log_level = log_level
+        self.server_options = server_options
+        self.options = dict(options)
+        language = self.options.get('language', 'ru')
+        self.language = language if language != "auto" else None
+        self.state: Dict[str, Any] = {
+            'model': self.options.get('model_name', 'base'),
+            'cascade': {'total': 0, 'escalated': 0, 'escalation_rate': 0.0},
+        }
+        
+        self.send_lock = threading.Lock()
+        self.request_ids = itertools.count(1)
+        # request_id → (callback, trace, on_partial, сегмент общей памяти)
+        self.requests: Dict[int, tuple] = {}
+        self.on_verified: Optional[Callable[[Dict[str, bool]], None]] = None
+        self.process = None
+        self.connection = None
+        self._start_process()
+    
+    def _start_process(self) -> None:
+        """Запустить процесс распознавания и поток чтения результатов."""
+        context = multiprocessing.get_context('spawn')
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(
+            target=run_worker,
+            args=(child_connection, self.options, str(self.config_dir), self.log_level, self.server_options),
+            name="votobu-recognizer",
+            daemon=True
+        )
+        self.process.start()
+        child_connection.close()
+        logger.info(f"Запущен процесс распознавания (pid {self.process.pid})")
+        
+        threading.Thread(target=self._reader_loop, args=(self.connection,), daemon=True).start()
+    
+    def _send(self, *message) -> bool:
+        """
+        Отправить команду процессу распознавания.
+        
+        Returns:
+            True если команда отправлена
+        """
+        try:
+            with self.send_lock:
+                self.connection.send(message)
+            return True
+        except (OSError, ValueError) as e:
+            logger.error(f"Процесс распознавания недоступен: {e}")
+            return False
+    
+    def _reader_loop(self, connection) -> None:
+        """Принимать результаты процесса распознавания (фоновый поток)."""
+        while True:
+            try:
+                message = connection.recv()
+            except (EOFError, OSError):
+                break
+            
+            kind = message[0]
+            if kind == 'result':
+                self._finish_request(*message[1:])
+            elif kind == 'partial':
+                request = self.requests.get(message[1])
+                if request is not None and request[2] is not None:
+                    request[2](message[2])
+            elif kind == 'state':
+                self.state = message[1]
+            elif kind == 'verified' and self.on_verified is not None:
+                self.on_verified(message[1])
+        
+        if connection is self.connection and self.process is not None:
+            logger.error("Процесс распознавания завершился")
+            self._fail_requests()
+    
+    def _finish_request(self, request_id: int, text: Optional[str], timeline: Optional[tuple],
+                        state: Optional[Dict[str, Any]]) -> None:
+        """Освободить общую память запроса и вызвать callback с результатом."""
+        request = self.requests.pop(request_id, None)
+        if request is None:
+            return
+        callback, trace, _, segment = request
+        if segment is not None:
+            segment.close()
+            segment.unlink()
+        if state is not None:
+            self.state = state
+        
+        if trace is not None:
+            if timeline is not None:
+                marks, durations, info = timeline
+                for stage, timestamp in marks.items():
+                    if stage != 'hook':
+                        trace.mark(stage, timestamp)
+                for stage, seconds in durations.items():
+                    trace.add_duration(stage, seconds)
+                trace.info.update(info)
+            callback(text, trace)
+        else:
+            callback(text)
+    
+    def _fail_requests(self) -> None:
+        """Завершить все ожидающие запросы без результата."""
+        for request_id in list(self.requests):
+            self._finish_request(request_id, None, None, None)
+    
+    def _ensure_process(self) -> None:
+        """Перезапустить процесс распознавания, если он завершился (с текущими настройками)."""
+        if self.process is not None and self.process.is_alive():
+            return
+        logger.warning("Перезапуск процесса распознавания")
+        self._fail_requests()
+        self._start_process()
+    
+    def recognize_async(self, audio_file: Union[str, np.ndarray], callback: Callable[[Optional[str]], None], trace=None,
+                        on_partial: Optional[Callable[[str], None]] = None, profile=None) -> None:
+        """
+        Распознать речь в процессе распознавания.
+        
+        Args:
+            audio_file: Путь к аудио файлу или массив 16 кГц
+            callback: Функция обратного вызова с результатом
+            trace: Трасса задержек диктовки (передается в callback вторым аргументом)
+            on_partial: Функция для текста очередного окна (вызывается из потока чтения канала)
+            profile: Профиль горячей клавиши (None - основные настройки)
+        """
+        self._ensure_process()
+        request_id = next(self.request_ids)
+        
+        share_start = time.perf_counter()
+        ref, segment = _share_audio(audio_file)
+        if trace is not None:
+            trace.info['ipc_us'] = round((time.perf_counter() - share_start) * 1e6, 1)
+        
+        self.requests[request_id] = (callback, trace, on_partial, segment)
+        start_time = trace.start_time if trace is not None else None
+        if not self._send('recognize', request_id, ref, start_time, on_partial is not None, profile):
+            self._finish_request(request_id, None, None, None)
+    
+    def is_recognizing(self) -> bool:
+        """
+        Проверить, идет ли распознавание.
+        
+        Returns:
+            True если есть запросы без результата
+        """
+        return bool(self.requests)
+    
+    def load_model(self) -> bool:
+        """
+        Модель загружается процессом распознавания при запуске.
+        
+        Returns:
+            True если процесс распознавания работает
+        """
+        return self.process is not None and self.process.is_alive()
+    
+    def preload_async(self, profile=None) -> None:
+        """
+        Начать загрузку выгруженной модели в процессе распознавания.
+        
+        Args:
+            profile: Профиль нажатой клавиши (None - основные настройки)
+        """
+        if self.process is not None and self.process.is_alive():
+            self._send('call', 'preload_async', (profile,))
+    
+    def current_model_name(self) -> str:
+        """
+        Получить модель, используемую для текущего языка.
+        
+        Returns:
+            Название модели Whisper (по последнему состоянию процесса)
+        """
+        return self.state['model']
+    
+    def get_cascade_stats(self) -> Dict[str, Any]:
+        """
+        Получить статистику каскада.
+        
+        Returns:
+            Статистика по последнему состоянию процесса распознавания
+        """
+        return self.state['cascade']
+    
+    def preload_profiles(self, targets: List[Tuple[str, str]]) -> None:
+        """
+        Загрузить модели профилей в процессе распознавания.
+        
+        Args:
+            targets: Пары (модель, язык) в порядке приоритета профилей
+        """
+        self._send('call', 'preload_profiles', (list(targets),))
+    
+    def change_language(self, language: str) -> None:
+        """
+        Изменить язык распознавания.
+        
+        Args:
+            language: Код языка (ru/en/auto)
+        """
+        self.options['language'] = language
+        self.language = language if language != "auto" else None
+        self._send('call', 'change_language', (language,))
+    
+    def change_model(self, model_name: str) -> bool:
+        """
+        Изменить модель Whisper (загрузка выполняется в процессе распознавания).
+        
+        Args:
+            model_name: Название новой модели
+            
+        Returns:
+            True если команда отправлена
+        """
+        self.options['model_name'] = model_name
+        return self._send('call', 'change_model', (model_name,))
+    
+    def change_model_routing(self, model_routing: Dict[str, str]) -> None:
+        """
+        Изменить таблицу маршрутизации язык → модель.
+        
+        Args:
+            model_routing: Новая таблица маршрутизации
+        """
+        self.options['model_routing'] = dict(model_routing or {})
+        self._send('call', 'change_model_routing', (model_routing,))
+    
+    def change_cascade(self, cascade_model: Optional[str], cascade_thresholds: Optional[Dict[str, float]] = None) -> None:
+        """
+        Изменить настройки каскада.
+        
+        Args:
+            cascade_model: Быстрая модель первого прохода (None - выключить каскад)
+            cascade_thresholds: Новые пороги эскалации
+        """
+        self.options['cascade_model'] = cascade_model
+        if cascade_thresholds:
+            self.options['cascade_thresholds'] = cascade_thresholds
+        self._send('call', 'change_cascade', (cascade_model, cascade_thresholds))
+    
+    def change_draft_model(self, draft_model: Optional[str]) -> None:
+        """
+        Изменить черновую модель спекулятивного декодирования.
+        
+        Args:
+            draft_model: Название модели (None - выключить)
+        """
+        self.options['draft_model'] = draft_model
+        self._send('call', 'change_draft_model', (draft_model,))
+    
+    def verify_models_async(self, callback: Callable[[Dict[str, bool]], None]) -> None:
+        """
+        Проверить контрольные суммы моделей в процессе распознавания.
+        
+        Args:
+            callback: Функция с результатом проверки (вызывается из потока чтения канала)
+        """
+        self.on_verified = callback
+        self._send('verify')
+    
+    def close(self) -> None:
+        """Остановить процесс распознавания."""
+        if self.process is None:
+            return
+        self._send('stop')
+        process, self.process = self.process, None
+        process.join(self.STOP_TIMEOUT)
+        if process.is_alive():
+            process.terminate()
+        self.connection.close()
+        self._fail_requests()
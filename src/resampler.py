@@ -0,0 +1,122 @@
+"""
+Потоковый передискретизатор.
+Полифазный фильтр на NumPy, обрабатывающий аудио блоками с сохранением состояния.
+"""
+
+from math import gcd
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from capture_buffer import to_float32, from_float32
+
+
+class StreamingResampler:
+    """
+    Полифазная передискретизация up/down с ФНЧ (оконный sinc, окно Кайзера).
+    
+    Результат не зависит от того, какими блоками подается сигнал: между
+    вызовами сохраняется хвост входа, нужный фильтру. Задержка фильтра
+    скомпенсирована - выход выровнен по времени со входом.
+    """
+    
+    def __init__(self, in_rate: int, out_rate: int = 16000, zeros: int = 10, beta: float = 5.0):
+        """
+        Инициализация передискретизатора.
+        
+        Args:
+            in_rate: Частота входа (частота устройства)
+            out_rate: Частота выхода
+            zeros: Число пересечений нуля sinc с каждой стороны (длина фильтра)
+            beta: Параметр окна Кайзера
+        """
+        divisor = gcd(in_rate, out_rate)
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+        self.up = out_rate // divisor
+        self.down = in_rate // divisor
+        
+        # Фильтр на повышенной частоте: срез на меньшей из двух частот Найквиста
+        max_factor = max(self.up, self.down)
+        self.half_len = zeros * max_factor
+        n = np.arange(-self.half_len, self.half_len + 1)
+        cutoff = 1.0 / max_factor
+        h = cutoff * np.sinc(cutoff * n) * np.kaiser(len(n), beta) * self.up
+        
+        # Полифазное разложение: фаза p использует коэффициенты h[p + j*up],
+        # строки развернуты, чтобы считать скалярным произведением с окном входа
+        self.taps = -(-len(h) // self.up)
+        h = np.pad(h, (0, self.taps * self.up - len(h)))
+        self.phases = h.reshape(self.taps, self.up).T[:, ::-1].astype(np.float32).copy()
+        
+        self.reset()
+    
+    @property
+    def passthrough(self) -> bool:
+        """Совпадают ли частоты входа и выхода."""
+        return self.up == self.down
+    
+    def reset(self) -> None:
+        """Сбросить состояние перед новой записью."""
+        self.history = np.zeros(self.taps - 1, dtype=np.float32)
+        self.consumed = 0
+        self.produced = 0
+    
+    def process(self, chunk: np.ndarray) -> np.ndarray:
+        """
+        Передискретизировать очередной блок.
+        
+        Args:
+            chunk: Одномерный блок int16 или float32
+            
+        Returns:
+            Выходные сэмплы того же типа, что вход (может быть пустым)
+        """
+        if self.passthrough:
+            return chunk
+        output = self._process(to_float32(chunk))
+        return from_float32(output, chunk.dtype)
+    
+    def flush(self, dtype=np.float32) -> np.ndarray:
+        """
+        Выдать хвост сигнала в конце записи и сбросить состояние.
+        
+        Args:
+            dtype: Тип выходных сэмплов (int16 или float32)
+            
+        Returns:
+            Оставшиеся выходные сэмплы
+        """
+        if self.passthrough:
+            return np.zeros(0, dtype=dtype)
+        
+        expected = -(-self.consumed * self.up // self.down)
+        last_input = ((expected - 1) * self.down + self.half_len) // self.up
+        padding = max(last_input - self.consumed + 1, 0)
+        remaining = expected - self.produced
+        output = self._process(np.zeros(padding, dtype=np.float32))[:max(remaining, 0)]
+        self.reset()
+        return from_float32(output, np.dtype(dtype))
+    
+    def _process(self, chunk: np.ndarray) -> np.ndarray:
+        """Вычислить все выходные сэмплы, для которых хватает входа."""
+        buffer = np.concatenate((self.history, chunk))
+        total = self.consumed + len(chunk)
+        
+        # Последний выход, центр фильтра которого укладывается в полученный вход
+        last = (total * self.up - 1 - self.half_len) // self.down
+        count = last - self.produced + 1
+        if count > 0:
+            positions = (np.arange(self.produced, last + 1, dtype=np.int64) * self.down) + self.half_len
+            phase = positions % self.up
+            starts = positions // self.up - self.consumed
+            windows = sliding_window_view(buffer, self.taps)[starts]
+            output = np.einsum('ij,ij->i', windows, self.phases[phase])
+            self.produced = last + 1
+        else:
+            output = np.zeros(0, dtype=np.float32)
+        
+        if self.taps > 1:
+            self.history = buffer[-(self.taps - 1):]
+        self.consumed = total
+        return output
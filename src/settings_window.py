@@ -5,11 +5,13 @@
 
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
-    QPushButton, QComboBox, QGroupBox, QMessageBox
+    QPushButton, QComboBox, QGroupBox, QMessageBox, QCheckBox, QDoubleSpinBox
 )
 from PyQt5.QtCore import Qt, pyqtSignal
 from typing import Dict, Any, Optional
 
+from model_calibration import MODEL_ORDER, recommend_model
+
 
 class SettingsWindow(QWidget):
     """Окно настроек приложения."""
@@ -17,15 +19,54 @@ class SettingsWindow(QWidget):
     # Сигнал для уведомления о сохранении настроек
     settings_saved = pyqtSignal(dict)
     
-    def __init__(self, config: Dict[str, Any]):
+    # Варианты модели для английского языка (название, значение в model_routing)
+    ENGLISH_MODEL_OPTIONS = [
+        ("Как основная", None),
+        ("Авто (.en версия основной)", "auto"),
+        ("tiny.en", "tiny.en"),
+        ("base.en", "base.en"),
+        ("small.en", "small.en"),
+        ("medium.en", "medium.en"),
+    ]
+    
+    # Варианты быстрой модели каскада (название, значение cascade_model)
+    CASCADE_MODEL_OPTIONS = [
+        ("Выключен", None),
+        ("tiny", "tiny"),
+        ("base", "base"),
+    ]
+    
+    # Способы доставки текста (название, значение delivery_mode)
+    DELIVERY_OPTIONS = [
+        ("Буфер обмена", "clipboard"),
+        ("Вставить в активное окно", "paste"),
+        ("Напечатать в активном окне", "type"),
+    ]
+    
+    # Этапы предобработки звука (название, имя этапа в preprocess_stages)
+    PREPROCESS_OPTIONS = [
+        ("Убирать низкочастотный гул", "highpass"),
+        ("Подавлять фоновый шум", "denoise"),
+        ("Выравнивать громкость", "agc"),
+    ]
+    
+    # Режимы диктовки (название, значение dictation_mode)
+    DICTATION_MODE_OPTIONS = [
+        ("Удерживать клавишу", "hold"),
+        ("Нажать - начать, нажать снова - закончить", "toggle"),
+    ]
+    
+    def __init__(self, config: Dict[str, Any], calibration: Optional[Dict[str, Dict[str, Any]]] = None):
         """
         Инициализация окна настроек.
         
         Args:
             config: Текущая конфигурация приложения
+            calibration: Замеры моделей на этом компьютере (load_calibration)
         """
         super().__init__()
         self.config = config.copy()
+        self.calibration = calibration or {}
         self.recording_hotkey = False
         self.init_ui()
     
@@ -96,14 +137,69 @@ class SettingsWindow(QWidget):
         
         layout.addLayout(hotkey_layout)
         
+        # Режим диктовки
+        mode_layout = QHBoxLayout()
+        mode_label = QLabel("Режим:")
+        self.dictation_mode_combo = QComboBox()
+        for title, value in self.DICTATION_MODE_OPTIONS:
+            self.dictation_mode_combo.addItem(title, value)
+        
+        mode_index = self.dictation_mode_combo.findData(self.config.get('dictation_mode', 'hold'))
+        self.dictation_mode_combo.setCurrentIndex(max(mode_index, 0))
+        
+        mode_layout.addWidget(mode_label)
+        mode_layout.addWidget(self.dictation_mode_combo)
+        mode_layout.addStretch()
+        
+        layout.addLayout(mode_layout)
+        
         # Информация
-        info = QLabel("Зажмите клавишу для начала записи, отпустите для остановки")
-        info.setStyleSheet("color: gray; font-size: 10px;")
-        layout.addWidget(info)
+        self.hotkey_info = QLabel()
+        self.hotkey_info.setStyleSheet("color: gray; font-size: 10px;")
+        self.dictation_mode_combo.currentIndexChanged.connect(self._update_hotkey_info)
+        self._update_hotkey_info()
+        layout.addWidget(self.hotkey_info)
         
         group.setLayout(layout)
         return group
     
+    def _update_model_latency(self) -> None:
+        """Показать ожидаемую задержку моделей и выбрать модель под целевую задержку."""
+        target_ms = self.latency_target_spin.value() * 1000
+        recommended = recommend_model(self.calibration, target_ms)
+        
+        for index in range(self.model_combo.count()):
+            model_name = self.model_combo.itemData(index)
+            result = self.calibration.get(model_name)
+            text = model_name
+            if result:
+                text += f" — ~{result['latency_p95_ms'] / 1000:.1f} с"
+                if model_name == recommended:
+                    text += " (рекомендуется)"
+            self.model_combo.setItemText(index, text)
+        
+        auto = self.auto_model_check.isChecked() and recommended is not None
+        if auto:
+            self.model_combo.setCurrentIndex(self.model_combo.findData(recommended))
+        self.model_combo.setEnabled(not auto)
+        
+        if not self.calibration:
+            self.calibration_info.setText("Задержка моделей не измерена: меню трея → Подобрать модель")
+        elif recommended is None:
+            self.calibration_info.setText("Ни одна измеренная модель не укладывается в целевую задержку")
+        else:
+            self.calibration_info.setText("Задержка - p95 от отпускания клавиши до текста на этом компьютере")
+    
+    def _update_hotkey_info(self) -> None:
+        """Обновить описание работы клавиши под выбранный режим."""
+        if self.dictation_mode_combo.currentData() == 'toggle':
+            self.hotkey_info.setText(
+                "Нажмите клавишу для начала диктовки, нажмите снова для окончания.\n"
+                "Текст каждой фразы появляется после паузы в речи"
+            )
+        else:
+            self.hotkey_info.setText("Зажмите клавишу для начала записи, отпустите для остановки")
+    
     def _create_recognition_group(self) -> QGroupBox:
         """Создать группу настроек распознавания."""
         group = QGroupBox("Распознавание речи")
@@ -126,9 +222,56 @@ class SettingsWindow(QWidget):
         
         layout.addLayout(lang_layout)
         
+        # Способ доставки текста
+        delivery_layout = QHBoxLayout()
+        delivery_label = QLabel("Результат:")
+        self.delivery_combo = QComboBox()
+        for title, value in self.DELIVERY_OPTIONS:
+            self.delivery_combo.addItem(title, value)
+        
+        delivery_index = self.delivery_combo.findData(self.config.get('delivery_mode', 'clipboard'))
+        self.delivery_combo.setCurrentIndex(max(delivery_index, 0))
+        
+        delivery_layout.addWidget(delivery_label)
+        delivery_layout.addWidget(self.delivery_combo)
+        delivery_layout.addStretch()
+        
+        layout.addLayout(delivery_layout)
+        
+        # Печать по мере распознавания (только для режима печати)
+        self.stream_partials_check = QCheckBox("Печатать текст по мере распознавания")
+        self.stream_partials_check.setChecked(bool(self.config.get('stream_partials', False)))
+        self.stream_partials_check.setToolTip(
+            "Длинные записи распознаются окнами по 30 секунд,\n"
+            "текст каждого окна печатается сразу"
+        )
+        self.delivery_combo.currentIndexChanged.connect(self._update_stream_partials_state)
+        self._update_stream_partials_state()
+        layout.addWidget(self.stream_partials_check)
+        
+        # Предобработка звука перед распознаванием
+        preprocess_label = QLabel("Обработка звука:")
+        preprocess_label.setToolTip(
+            "Шум оценивается по паузе в начале записи:\n"
+            "начинайте говорить через долю секунды после нажатия"
+        )
+        layout.addWidget(preprocess_label)
+        
+        stages = self.config.get('preprocess_stages', [])
+        self.preprocess_checks = {}
+        for title, name in self.PREPROCESS_OPTIONS:
+            check = QCheckBox(title)
+            check.setChecked(name in stages)
+            self.preprocess_checks[name] = check
+            layout.addWidget(check)
+        
         group.setLayout(layout)
         return group
     
+    def _update_stream_partials_state(self) -> None:
+        """Разрешить потоковую печать только в режиме печати."""
+        self.stream_partials_check.setEnabled(self.delivery_combo.currentData() == 'type')
+    
     def _create_model_group(self) -> QGroupBox:
         """Создать группу настроек модели Whisper."""
         group = QGroupBox("Модель Whisper")
@@ -138,12 +281,12 @@ class SettingsWindow(QWidget):
         model_layout = QHBoxLayout()
         model_label = QLabel("Модель:")
         self.model_combo = QComboBox()
-        self.model_combo.addItems(["tiny", "base", "small", "medium", "large"])
+        for model_name in MODEL_ORDER:
+            self.model_combo.addItem(model_name, model_name)
         
         # Установить текущую модель
-        current_model = self.config.get('whisper_model', 'base')
-        model_index = ["tiny", "base", "small", "medium", "large"].index(current_model)
-        self.model_combo.setCurrentIndex(model_index)
+        model_index = self.model_combo.findData(self.config.get('whisper_model', 'base'))
+        self.model_combo.setCurrentIndex(max(model_index, 0))
         
         model_layout.addWidget(model_label)
         model_layout.addWidget(self.model_combo)
@@ -151,13 +294,99 @@ class SettingsWindow(QWidget):
         
         layout.addLayout(model_layout)
         
+        # Целевая задержка от отпускания клавиши до текста
+        target_layout = QHBoxLayout()
+        target_label = QLabel("Целевая задержка:")
+        self.latency_target_spin = QDoubleSpinBox()
+        self.latency_target_spin.setRange(0.5, 60.0)
+        self.latency_target_spin.setSingleStep(0.5)
+        self.latency_target_spin.setDecimals(1)
+        self.latency_target_spin.setSuffix(" с")
+        self.latency_target_spin.setValue(self.config.get('latency_target_ms', 3000) / 1000)
+        
+        target_layout.addWidget(target_label)
+        target_layout.addWidget(self.latency_target_spin)
+        target_layout.addStretch()
+        
+        layout.addLayout(target_layout)
+        
+        self.auto_model_check = QCheckBox("Выбирать самую точную модель, укладывающуюся в задержку")
+        self.auto_model_check.setChecked(bool(self.config.get('auto_select_model', False)))
+        layout.addWidget(self.auto_model_check)
+        
+        self.calibration_info = QLabel()
+        self.calibration_info.setStyleSheet("color: gray; font-size: 10px;")
+        layout.addWidget(self.calibration_info)
+        
+        self.latency_target_spin.valueChanged.connect(self._update_model_latency)
+        self.auto_model_check.toggled.connect(self._update_model_latency)
+        self._update_model_latency()
+        
+        # Модель для английского языка
+        en_model_layout = QHBoxLayout()
+        en_model_label = QLabel("Для английского:")
+        self.en_model_combo = QComboBox()
+        for title, value in self.ENGLISH_MODEL_OPTIONS:
+            self.en_model_combo.addItem(title, value)
+        
+        current_en_model = self.config.get('model_routing', {}).get('en')
+        en_index = self.en_model_combo.findData(current_en_model)
+        self.en_model_combo.setCurrentIndex(max(en_index, 0))
+        
+        en_model_layout.addWidget(en_model_label)
+        en_model_layout.addWidget(self.en_model_combo)
+        en_model_layout.addStretch()
+        
+        layout.addLayout(en_model_layout)
+        
+        # Каскад: быстрая модель первого прохода
+        cascade_layout = QHBoxLayout()
+        cascade_label = QLabel("Быстрый проход:")
+        self.cascade_combo = QComboBox()
+        for title, value in self.CASCADE_MODEL_OPTIONS:
+            self.cascade_combo.addItem(title, value)
+        
+        cascade_index = self.cascade_combo.findData(self.config.get('cascade_model'))
+        self.cascade_combo.setCurrentIndex(max(cascade_index, 0))
+        self.cascade_combo.setToolTip(
+            "Сначала распознать быстрой моделью и повторить основной\n"
+            "только при низкой уверенности результата"
+        )
+        
+        cascade_layout.addWidget(cascade_label)
+        cascade_layout.addWidget(self.cascade_combo)
+        cascade_layout.addStretch()
+        
+        layout.addLayout(cascade_layout)
+        
+        # Спекулятивное декодирование: черновая модель
+        draft_layout = QHBoxLayout()
+        draft_label = QLabel("Черновая модель:")
+        self.draft_combo = QComboBox()
+        for title, value in self.CASCADE_MODEL_OPTIONS:
+            self.draft_combo.addItem(title, value)
+        
+        draft_index = self.draft_combo.findData(self.config.get('draft_model'))
+        self.draft_combo.setCurrentIndex(max(draft_index, 0))
+        self.draft_combo.setToolTip(
+            "Спекулятивное декодирование: маленькая модель предлагает токены,\n"
+            "основная проверяет их. Текст тот же, что у основной модели"
+        )
+        
+        draft_layout.addWidget(draft_label)
+        draft_layout.addWidget(self.draft_combo)
+        draft_layout.addStretch()
+        
+        layout.addLayout(draft_layout)
+        
         # Описание моделей
         info = QLabel(
             "tiny - самая быстрая, низкое качество\n"
             "base - хороший баланс скорости и качества\n"
             "small - лучше качество, медленнее\n"
             "medium - высокое качество, требует больше ресурсов\n"
-            "large - максимальное качество, очень медленная"
+            "large - максимальное качество, очень медленная\n"
+            ".en - английские модели, точнее и быстрее для английской речи"
         )
         info.setStyleSheet("color: gray; font-size: 9px;")
         layout.addWidget(info)
@@ -317,7 +546,36 @@ class SettingsWindow(QWidget):
         self.config['language'] = lang_map[self.language_combo.currentIndex()]
         
         # Получить выбранную модель
-        self.config['whisper_model'] = self.model_combo.currentText()
+        self.config['whisper_model'] = self.model_combo.currentData()
+        self.config['latency_target_ms'] = int(self.latency_target_spin.value() * 1000)
+        self.config['auto_select_model'] = self.auto_model_check.isChecked()
+        
+        # Маршрутизация моделей по языкам (новый словарь, чтобы изменение было заметно)
+        model_routing = dict(self.config.get('model_routing', {}))
+        en_model = self.en_model_combo.currentData()
+        if en_model:
+            model_routing['en'] = en_model
+        else:
+            model_routing.pop('en', None)
+        self.config['model_routing'] = model_routing
+        
+        # Быстрая модель каскада
+        self.config['cascade_model'] = self.cascade_combo.currentData()
+        
+        # Черновая модель спекулятивного декодирования
+        self.config['draft_model'] = self.draft_combo.currentData()
+        
+        # Режим диктовки
+        self.config['dictation_mode'] = self.dictation_mode_combo.currentData()
+        
+        # Способ доставки текста
+        self.config['delivery_mode'] = self.delivery_combo.currentData()
+        self.config['stream_partials'] = self.stream_partials_check.isChecked()
+        
+        # Предобработка звука
+        self.config['preprocess_stages'] = [
+            name for name, check in self.preprocess_checks.items() if check.isChecked()
+        ]
         
         # Отправить сигнал с новой конфигурацией
         self.settings_saved.emit(self.config)
@@ -0,0 +1,248 @@
+"""
+Спекулятивное декодирование Whisper.
+Маленькая модель предлагает токены, основная проверяет их одним проходом декодера.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import torch
+import whisper
+from whisper.audio import N_SAMPLES, log_mel_spectrogram, pad_or_trim
+from whisper.tokenizer import get_tokenizer
+
+
+class SpeculativeDecoder:
+    """
+    Жадное декодирование основной модели с черновой моделью.
+    
+    Результат совпадает с whisper.decode(model, mel, temperature=0,
+    without_timestamps=True) для каждого 30-секундного окна: каждый токен
+    выбирает основная модель, черновая только сокращает число ее проходов.
+    """
+    
+    def __init__(self, model, draft_model, draft_tokens: int = 4):
+        """
+        Инициализация декодера.
+        
+        Args:
+            model: Основная модель Whisper
+            draft_model: Черновая модель (tiny/base) с тем же словарем
+            draft_tokens: Сколько токенов черновая модель предлагает за шаг
+        """
+        if model.dims.n_vocab != draft_model.dims.n_vocab or model.is_multilingual != draft_model.is_multilingual:
+            raise ValueError("Черновая модель должна иметь тот же словарь, что и основная")
+        
+        self.model = model
+        self.draft_model = draft_model
+        self.draft_tokens = max(1, draft_tokens)
+        self.sample_len = model.dims.n_text_ctx // 2
+        self.stats = {'steps': 0, 'proposed': 0, 'accepted': 0}
+    
+    def _get_tokenizer(self, language: Optional[str]):
+        """
+        Получить токенизатор основной модели.
+        
+        Args:
+            language: Код языка
+            
+        Returns:
+            Токенизатор Whisper
+        """
+        kwargs = {}
+        if hasattr(self.model, 'num_languages'):
+            kwargs['num_languages'] = self.model.num_languages
+        return get_tokenizer(self.model.is_multilingual, language=language, task="transcribe", **kwargs)
+    
+    def _mel(self, model, audio: np.ndarray) -> torch.Tensor:
+        """
+        Вычислить мел-спектрограмму окна для модели.
+        
+        Args:
+            model: Модель Whisper
+            audio: Аудио 16 кГц длиной не более 30 секунд
+            
+        Returns:
+            Мел-спектрограмма с batch измерением
+        """
+        mel = log_mel_spectrogram(pad_or_trim(audio), n_mels=model.dims.n_mels)
+        return mel.unsqueeze(0).to(model.device)
+    
+    @staticmethod
+    def _suppress_tokens(tokenizer) -> List[int]:
+        """
+        Токены, которые Whisper подавляет при suppress_tokens="-1".
+        
+        Args:
+            tokenizer: Токенизатор Whisper
+            
+        Returns:
+            Отсортированный список токенов
+        """
+        suppress = list(tokenizer.non_speech_tokens)
+        suppress.extend([
+            tokenizer.transcribe,
+            tokenizer.translate,
+            tokenizer.sot,
+            tokenizer.sot_prev,
+            tokenizer.sot_lm,
+        ])
+        if tokenizer.no_speech is not None:
+            suppress.append(tokenizer.no_speech)
+        return sorted(set(suppress))
+    
+    @staticmethod
+    def _truncate_cache(cache: Dict, model, length: int) -> None:
+        """
+        Отбросить self-attention кэш после позиции length.
+        
+        Кэш cross-attention зависит только от аудио и не обрезается.
+        
+        Args:
+            cache: kv-кэш, заполняемый хуками Whisper
+            model: Модель, которой принадлежит кэш
+            length: Количество сохраняемых позиций
+        """
+        for block in model.decoder.blocks:
+            for module in (block.attn.key, block.attn.value):
+                if module in cache and cache[module].shape[1] > length:
+                    cache[module] = cache[module][:, :length].detach()
+    
+    def _select(self, logits: torch.Tensor, prefix_len: int, sample_begin: int) -> int:
+        """
+        Выбрать токен так же, как жадный декодер Whisper.
+        
+        Args:
+            logits: Логиты одной позиции
+            prefix_len: Длина последовательности перед выбираемым токеном
+            sample_begin: Позиция первого генерируемого токена
+            
+        Returns:
+            Выбранный токен
+        """
+        logits[self.suppress] = -np.inf
+        if prefix_len == sample_begin:
+            logits[self.blank_tokens] = -np.inf
+        return int(logits.argmax())
+    
+    @torch.no_grad()
+    def decode_window(self, audio: np.ndarray, language: Optional[str]) -> Tuple[str, str]:
+        """
+        Декодировать одно окно аудио длиной до 30 секунд.
+        
+        Args:
+            audio: Аудио 16 кГц
+            language: Код языка (None - автоопределение основной моделью)
+            
+        Returns:
+            Кортеж (текст, язык)
+        """
+        mel = self._mel(self.model, audio)
+        audio_features = self.model.embed_audio(mel)
+        draft_features = self.draft_model.embed_audio(self._mel(self.draft_model, audio))
+        
+        if language is None and self.model.is_multilingual:
+            _, probs = self.model.detect_language(audio_features)
+            language = max(probs[0], key=probs[0].get)
+        
+        tokenizer = self._get_tokenizer(language)
+        self.suppress = self._suppress_tokens(tokenizer)
+        self.blank_tokens = tokenizer.encode(" ") + [tokenizer.eot]
+        eot = tokenizer.eot
+        
+        tokens = list(tokenizer.sot_sequence_including_notimestamps)
+        sample_begin = len(tokens)
+        max_len = sample_begin + self.sample_len
+        
+        cache, hooks = self.model.install_kv_cache_hooks()
+        draft_cache, draft_hooks = self.draft_model.install_kv_cache_hooks()
+        cached = 0
+        draft_cached = 0
+        device = self.model.device
+        
+        try:
+            while len(tokens) < max_len and tokens[-1] != eot:
+                # Черновая модель предлагает несколько токенов по одному
+                proposal: List[int] = []
+                draft_sequence = list(tokens)
+                while len(proposal) < min(self.draft_tokens, max_len - len(tokens)):
+                    inputs = torch.tensor([draft_sequence[draft_cached:]], device=self.draft_model.device)
+                    logits = self.draft_model.decoder(inputs, draft_features, kv_cache=draft_cache)[0, -1]
+                    draft_cached = len(draft_sequence)
+                    token = self._select(logits, len(draft_sequence), sample_begin)
+                    proposal.append(token)
+                    draft_sequence.append(token)
+                    if token == eot:
+                        break
+                
+                # Основная модель проверяет все предложения одним проходом
+                inputs = torch.tensor([tokens[cached:] + proposal], device=device)
+                logits = self.model.decoder(inputs, audio_features, kv_cache=cache)[0]
+                base = len(tokens) - cached - 1
+                
+                committed: List[int] = []
+                for i in range(len(proposal) + 1):
+                    token = self._select(logits[base + i], len(tokens) + i, sample_begin)
+                    committed.append(token)
+                    if token == eot or len(tokens) + len(committed) >= max_len:
+                        break
+                    if i >= len(proposal) or token != proposal[i]:
+                        break
+                
+                self.stats['steps'] += 1
+                self.stats['proposed'] += len(proposal)
+                self.stats['accepted'] += sum(1 for a, b in zip(committed, proposal) if a == b)
+                
+                # Кэш валиден только для подтвержденных токенов
+                cached = len(tokens) + len(committed) - 1
+                self._truncate_cache(cache, self.model, cached)
+                draft_cached = min(draft_cached, cached)
+                self._truncate_cache(draft_cache, self.draft_model, draft_cached)
+                
+                tokens.extend(committed)
+        finally:
+            for hook in hooks + draft_hooks:
+                hook.remove()
+        
+        generated = tokens[sample_begin:]
+        if eot in generated:
+            generated = generated[:generated.index(eot)]
+        return tokenizer.decode(generated).strip(), language
+    
+    def transcribe(self, audio, language: Optional[str] = None) -> Dict:
+        """
+        Распознать аудио окнами по 30 секунд.
+        
+        Черновая модель считает для каждого окна собственные признаки
+        энкодера (второй проход энкодера на окно). Декодирование только
+        жадное (temperature=0) и без временных меток: beam search, fallback
+        по температуре, initial_prompt, перевод и контекст предыдущего окна
+        не поддерживаются, сегменты не возвращаются.
+        
+        Args:
+            audio: Путь к файлу или массив аудио 16 кГц
+            language: Код языка (None - автоопределение)
+            
+        Returns:
+            Результат в формате whisper.transcribe (text, segments, language)
+        """
+        if isinstance(audio, str):
+            audio = whisper.load_audio(audio)
+        
+        texts = []
+        for start in range(0, max(len(audio), 1), N_SAMPLES):
+            text, language = self.decode_window(audio[start:start + N_SAMPLES], language)
+            if text:
+                texts.append(text)
+        
+        return {"text": " ".join(texts), "segments": [], "language": language}
+    
+    def acceptance_rate(self) -> float:
+        """
+        Доля принятых черновых токенов.
+        
+        Returns:
+            Отношение принятых токенов к предложенным
+        """
+        proposed = self.stats['proposed']
+        return self.stats['accepted'] / proposed if proposed else 0.0
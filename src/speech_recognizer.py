@@ -2,37 +2,447 @@
 Модуль для распознавания речи через OpenAI Whisper.
 """
 
-import whisper
 import threading
-from typing import Optional, Callable
+import time
+import weakref
+from collections import deque
+from contextlib import ExitStack, contextmanager
+from typing import Optional, Callable, Dict, Any, Iterable, Iterator, List, Tuple, Union
 from pathlib import Path
 
+import numpy as np
+import torch
+import whisper
+from whisper.audio import log_mel_spectrogram, pad_or_trim
+
+from audio_stream import iter_file_segments
+from capture_buffer import to_float32
+from model_pool import ModelPool, IdleUnloadPolicy
+from speculative_decoder import SpeculativeDecoder
+from log_manager import get_logger
+
+logger = get_logger(__name__)
+
+# Опции transcribe, которые поддерживает спекулятивное декодирование (жадное, без контекста)
+SPECULATIVE_OPTIONS = {'fp16', 'language', 'task'}
+
+
+class CascadeStats:
+    """Статистика каскадного распознавания: доля эскалаций и задержки по уровням."""
+    
+    def __init__(self, history_size: int = 200):
+        """
+        Инициализация статистики.
+        
+        Args:
+            history_size: Количество последних замеров задержки на уровень
+        """
+        self.lock = threading.Lock()
+        self.total = 0
+        self.escalated = 0
+        self.latencies = {
+            'fast': deque(maxlen=history_size),
+            'escalated': deque(maxlen=history_size),
+        }
+    
+    def record(self, escalated: bool, latency: float) -> None:
+        """
+        Записать результат одного распознавания.
+        
+        Args:
+            escalated: True если потребовалась большая модель
+            latency: Полное время распознавания в секундах
+        """
+        with self.lock:
+            self.total += 1
+            if escalated:
+                self.escalated += 1
+            self.latencies['escalated' if escalated else 'fast'].append(latency)
+    
+    def summary(self) -> Dict[str, Any]:
+        """
+        Получить сводку статистики.
+        
+        Returns:
+            Словарь с долей эскалаций и медианной задержкой по уровням
+        """
+        with self.lock:
+            result = {
+                'total': self.total,
+                'escalated': self.escalated,
+                'escalation_rate': self.escalated / self.total if self.total else 0.0,
+            }
+            for tier, values in self.latencies.items():
+                ordered = sorted(values)
+                result[f'{tier}_latency_p50'] = ordered[len(ordered) // 2] if ordered else None
+            return result
+
+
+class EncoderTimer:
+    """Замер времени энкодера Whisper через forward-хуки модели."""
+    
+    def __init__(self):
+        """Инициализация таймера."""
+        self.local = threading.local()
+        self.installed = set()
+    
+    def install(self, model) -> None:
+        """
+        Установить хуки на энкодер модели (один раз на модель).
+        
+        Args:
+            model: Модель Whisper
+        """
+        if id(model) in self.installed:
+            return
+        self.installed.add(id(model))
+        
+        def pre_hook(module, inputs):
+            self.local.started = time.perf_counter()
+        
+        def post_hook(module, inputs, output):
+            started = getattr(self.local, 'started', None)
+            if started is not None:
+                self.local.total = self.elapsed() + time.perf_counter() - started
+                self.local.started = None
+        
+        model.encoder.register_forward_pre_hook(pre_hook)
+        model.encoder.register_forward_hook(post_hook)
+    
+    def reset(self) -> None:
+        """Обнулить счетчик текущего потока."""
+        self.local.total = 0.0
+    
+    def elapsed(self) -> float:
+        """
+        Получить время энкодера в текущем потоке с последнего reset().
+        
+        Returns:
+            Время в секундах
+        """
+        return getattr(self.local, 'total', 0.0)
+
+
+class RecognitionRequest:
+    """Модели и опции одного распознавания, зафиксированные при его запуске."""
+    
+    __slots__ = ('language', 'model_name', 'fast_model_name', 'draft_model_name', 'options')
+    
+    def __init__(self, language: Optional[str], model_name: str, fast_model_name: Optional[str],
+                 draft_model_name: Optional[str], options: Dict[str, Any]):
+        """
+        Инициализация запроса.
+        
+        Args:
+            language: Код языка (None - автоопределение)
+            model_name: Основная модель после маршрутизации
+            fast_model_name: Быстрая модель каскада или None
+            draft_model_name: Черновая модель спекулятивного декодирования или None
+            options: Опции транскрибации Whisper
+        """
+        self.language = language
+        self.model_name = model_name
+        self.fast_model_name = fast_model_name
+        self.draft_model_name = draft_model_name
+        self.options = options
+
 
 class SpeechRecognizer:
     """Класс для распознавания речи с использованием Whisper."""
     
-    def __init__(self, model_name: str = "base", language: str = "ru"):
+    # Англоязычные варианты моделей (у large нет .en версии)
+    ENGLISH_VARIANTS = {
+        'tiny': 'tiny.en',
+        'base': 'base.en',
+        'small': 'small.en',
+        'medium': 'medium.en',
+    }
+    
+    # Пороги эскалации каскада (совпадают с порогами fallback в Whisper)
+    DEFAULT_CASCADE_THRESHOLDS = {
+        'avg_logprob': -1.0,
+        'compression_ratio': 2.4,
+        'no_speech_prob': 0.6,
+    }
+    
+    # Период проверки простоя моделей (секунды)
+    IDLE_CHECK_INTERVAL = 15
+    
+    # Частота дискретизации, которую ожидает Whisper
+    SAMPLE_RATE = whisper.audio.SAMPLE_RATE
+    
+    # Потоковая выдача частей: окно Whisper и зона поиска паузы в его конце
+    PARTIAL_WINDOW_SAMPLES = whisper.audio.N_SAMPLES
+    PARTIAL_SEARCH_SAMPLES = 3 * whisper.audio.SAMPLE_RATE
+    PARTIAL_FRAME_SAMPLES = whisper.audio.SAMPLE_RATE // 50
+    
+    def __init__(
+        self,
+        model_name: str = "base",
+        language: str = "ru",
+        model_routing: Optional[Dict[str, str]] = None,
+        memory_budget_mb: int = 0,
+        cascade_model: Optional[str] = None,
+        cascade_thresholds: Optional[Dict[str, float]] = None,
+        draft_model: Optional[str] = None,
+        draft_tokens: int = 4,
+        idle_timeout: float = 0,
+        adaptive_idle_timeout: bool = True,
+        model_store=None
+    ):
         """
         Инициализация распознавателя речи.
         
         Args:
             model_name: Название модели Whisper (tiny/base/small/medium/large)
             language: Код языка (ru/en/auto)
+            model_routing: Таблица язык → модель ("auto" - .en вариант основной модели)
+            memory_budget_mb: Бюджет памяти для резидентных моделей (0 - без ограничений)
+            cascade_model: Быстрая модель первого прохода (None - каскад выключен)
+            cascade_thresholds: Пороги эскалации (avg_logprob/compression_ratio/no_speech_prob)
+            draft_model: Черновая модель спекулятивного декодирования (None - выключено)
+            draft_tokens: Количество токенов, предлагаемых черновой моделью за шаг
+            idle_timeout: Выгружать модели после простоя, секунд (0 - никогда)
+            adaptive_idle_timeout: Подстраивать таймаут под паузы пользователя
+            model_store: Хранилище проверенных чекпоинтов (ModelStore)
         """
         self.model_name = model_name
         self.language = language if language != "auto" else None
+        self.model_routing = dict(model_routing or {})
+        self.pool = ModelPool(memory_budget_mb, model_store)
         self.model = None
         self.loading = False
         self.recognizing = False
+        # Батчи сервиса распознавания в работе (идут параллельно с recognize)
+        self.batches = 0
+        self.batches_lock = threading.Lock()
+        self.cascade_model = cascade_model
+        self.cascade_thresholds = dict(self.DEFAULT_CASCADE_THRESHOLDS)
+        self.cascade_thresholds.update(cascade_thresholds or {})
+        self.cascade_stats = CascadeStats()
+        self.draft_model = draft_model
+        self.draft_tokens = draft_tokens
+        self.speculative_decoder: Optional[SpeculativeDecoder] = None
+        self.encoder_timer = EncoderTimer()
+        self.decode_locks: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        self.decode_locks_guard = threading.Lock()
+        self.idle_policy = IdleUnloadPolicy(idle_timeout, adaptive_idle_timeout)
+        self.idle_thread: Optional[threading.Thread] = None
+        self._start_idle_watchdog()
+    
+    def get_model_for_language(self, language: Optional[str]) -> str:
+        """
+        Определить модель для языка по таблице маршрутизации.
+        
+        Args:
+            language: Код языка (None - автоопределение)
+            
+        Returns:
+            Название модели Whisper
+        """
+        return self._resolve_model(self.model_name, language)
+    
+    def _resolve_model(self, model_name: str, language: Optional[str]) -> str:
+        """
+        Применить таблицу маршрутизации к основной модели.
+        
+        Args:
+            model_name: Основная модель
+            language: Код языка (None - автоопределение)
+            
+        Returns:
+            Название модели Whisper
+        """
+        if language is None:
+            return model_name
+        
+        routed = self.model_routing.get(language)
+        if not routed:
+            return model_name
+        
+        if routed == "auto":
+            if language == "en":
+                return self.ENGLISH_VARIANTS.get(model_name, model_name)
+            return model_name
+        
+        # .en модели понимают только английский
+        if routed.endswith(".en") and language != "en":
+            return model_name
+        
+        return routed
+    
+    def current_model_name(self) -> str:
+        """
+        Получить модель, используемую для текущего языка.
+        
+        Returns:
+            Название модели Whisper
+        """
+        return self.get_model_for_language(self.language)
+    
+    def _request(self, profile=None) -> RecognitionRequest:
+        """
+        Зафиксировать модели и опции распознавания.
+        
+        Профиль горячей клавиши применяется только к этому запросу:
+        настройки распознавателя не меняются, поэтому параллельные
+        распознавания (сервис, диктовка, восстановленные записи) его не видят.
+        
+        Args:
+            profile: Профиль горячей клавиши (HotkeyProfile) или None - основные настройки
+            
+        Returns:
+            Запрос распознавания
+        """
+        model_name = self.model_name
+        language = self.language
+        decoding = {}
+        if profile is not None:
+            model_name = profile.model
+            language = profile.language if profile.language != "auto" else None
+            decoding = profile.decoding
+        model_name = self._resolve_model(model_name, language)
+        
+        options = {
+            "fp16": False,  # Использовать float32 для совместимости
+            "task": "transcribe"
+        }
+        # Без language - автоопределение
+        if language is not None:
+            options["language"] = language
+        # Параметры декодирования профиля горячей клавиши
+        options.update(decoding)
+        
+        return RecognitionRequest(
+            language,
+            model_name,
+            self._cascade_model_for(language, model_name),
+            self._draft_model_for(model_name),
+            options
+        )
+    
+    def _acquire(self, model_name: str, pinned: list):
+        """
+        Получить модель из пула и подключить к ней замер энкодера.
+        
+        Args:
+            model_name: Название модели
+            pinned: Модели, которые нельзя выгружать при загрузке
+            
+        Returns:
+            Модель Whisper
+        """
+        model = self.pool.get(model_name, pinned=pinned)
+        self.encoder_timer.install(model)
+        return model
+    
+    @contextmanager
+    def _decoding(self, *models):
+        """
+        Захватить модели на время декодирования.
+        
+        Whisper ставит хуки kv-кэша на общие модули декодера модели, поэтому
+        два одновременных декодирования одной модели (диктовка, сервис,
+        восстановленные записи) портят кэш друг друга. Каждое обращение к
+        декодеру проходит через этот контекст. Блокировки нескольких
+        моделей берутся в одном порядке, чтобы потоки не ждали друг друга
+        по кругу.
+        
+        Args:
+            models: Модели Whisper, участвующие в декодировании
+        """
+        with self.decode_locks_guard:
+            locks = []
+            for model in sorted(set(models), key=id):
+                lock = self.decode_locks.get(model)
+                if lock is None:
+                    lock = self.decode_locks[model] = threading.Lock()
+                locks.append(lock)
+        
+        with ExitStack() as stack:
+            for lock in locks:
+                stack.enter_context(lock)
+            yield
+    
+    def _busy(self) -> bool:
+        """
+        Проверить, заняты ли модели загрузкой или распознаванием.
+        
+        Returns:
+            True если модели нельзя выгружать или менять
+        """
+        return self.recognizing or self.loading or self.batches > 0
+    
+    def _start_idle_watchdog(self) -> None:
+        """Запустить фоновую проверку простоя моделей."""
+        if not self.idle_policy.timeout or self.idle_thread is not None:
+            return
+        
+        def watchdog():
+            while self.idle_policy.timeout:
+                time.sleep(self.IDLE_CHECK_INTERVAL)
+                if self._busy():
+                    continue
+                if self.pool.loaded_models() and self.idle_policy.should_unload():
+                    self.unload_models()
+            self.idle_thread = None
+        
+        self.idle_thread = threading.Thread(target=watchdog, daemon=True)
+        self.idle_thread.start()
+    
+    def unload_models(self) -> None:
+        """Выгрузить все модели и освободить память."""
+        if self._busy():
+            return
+        
+        logger.info(f"Выгрузка моделей после простоя: {', '.join(self.pool.loaded_models())}")
+        self.model = None
+        self.speculative_decoder = None
+        self.pool.clear()
+        ModelPool.release_memory()
+    
+    def preload_async(self, profile=None) -> None:
+        """
+        Начать загрузку модели в фоне, если она выгружена.
+        
+        Вызывается при нажатии горячей клавиши, чтобы загрузка шла
+        параллельно с записью.
+        
+        Args:
+            profile: Профиль нажатой клавиши (None - основные настройки)
+        """
+        self.idle_policy.touch()
+        if self.loading or self.pool.is_loaded(self._request(profile).model_name):
+            return
         
-    def load_model(self) -> bool:
+        thread = threading.Thread(target=self.load_model, args=(profile,), daemon=True)
+        thread.start()
+    
+    def change_idle_timeout(self, idle_timeout: float, adaptive: bool = True) -> None:
+        """
+        Изменить таймаут выгрузки моделей.
+        
+        Args:
+            idle_timeout: Таймаут простоя в секундах (0 - никогда)
+            adaptive: Подстраивать таймаут под паузы пользователя
+        """
+        self.idle_policy.timeout = idle_timeout
+        self.idle_policy.adaptive = adaptive
+        self._start_idle_watchdog()
+    
+    def load_model(self, profile=None) -> bool:
         """
         Загрузить модель Whisper.
         
+        Args:
+            profile: Профиль горячей клавиши (None - основные настройки)
+            
         Returns:
             True если модель загружена успешно
         """
-        if self.model is not None:
+        request = self._request(profile)
+        if self.pool.is_loaded(request.model_name):
+            self.model = self.pool.get(request.model_name)
             return True
         
         if self.loading:
@@ -40,84 +450,455 @@ class SpeechRecognizer:
         
         try:
             self.loading = True
-            print(f"Загрузка модели Whisper: {self.model_name}...")
-            self.model = whisper.load_model(self.model_name)
-            print("Модель загружена успешно")
+            self.model = self._acquire(request.model_name, [request.model_name])
+            
+            # В каскадном режиме обе модели должны быть резидентными
+            fast_model_name = request.fast_model_name
+            if fast_model_name:
+                self._acquire(fast_model_name, [fast_model_name, request.model_name])
+            
+            draft_model_name = request.draft_model_name
+            if draft_model_name:
+                self._acquire(draft_model_name, [draft_model_name, request.model_name])
+            
+            logger.info("Модель загружена успешно")
             return True
         except Exception as e:
-            print(f"Ошибка загрузки модели: {e}")
+            logger.error(f"Ошибка загрузки модели: {e}")
             return False
         finally:
             self.loading = False
     
-    def recognize(self, audio_file: str) -> Optional[str]:
+    def recognize(self, audio_file: Union[str, np.ndarray], trace=None,
+                  on_partial: Optional[Callable[[str], None]] = None, profile=None) -> Optional[str]:
         """
-        Распознать речь из аудио файла.
+        Распознать речь из аудио файла или массива.
         
         Args:
-            audio_file: Путь к аудио файлу
+            audio_file: Путь к аудио файлу (читается потоком, любой длины) или
+                        массив int16/float32 16 кГц (в т.ч. numpy.memmap -
+                        запись длиннее окна приводится к float32 по окнам)
+            trace: Трасса задержек диктовки (UtteranceTrace) или None
+            on_partial: Вызывается с текстом каждого распознанного окна
+                        (для файлов и записей длиннее одного окна Whisper)
+            profile: Профиль горячей клавиши (модель, язык, параметры декодирования)
+                     или None - основные настройки
             
         Returns:
             Распознанный текст или None в случае ошибки
         """
-        if not Path(audio_file).exists():
-            print(f"Файл не найден: {audio_file}")
+        is_file = isinstance(audio_file, (str, Path))
+        if is_file and not Path(audio_file).exists():
+            logger.warning(f"Файл не найден: {audio_file}")
             return None
         
-        # Загрузить модель если еще не загружена
-        if self.model is None:
-            if not self.load_model():
-                return None
-        
         try:
             self.recognizing = True
-            print(f"Распознавание аудио: {audio_file}")
-            
-            # Опции для транскрибации
-            options = {
-                "fp16": False,  # Использовать float32 для совместимости
-                "language": self.language,
-                "task": "transcribe"
-            }
+            request = self._request(profile)
+            model = None
+            if not request.fast_model_name:
+                model = self.model = self._acquire(request.model_name, [request.model_name])
+            if is_file:
+                logger.info(f"Распознавание аудио: {audio_file}")
+            else:
+                logger.info(f"Распознавание аудио: {len(audio_file) / self.SAMPLE_RATE:.1f} с")
             
-            # Удалить language если None (автоопределение)
-            if self.language is None:
-                del options["language"]
+            # Короткий массив приводится к float32 один раз для всех проходов.
+            # Файл и длинный массив (например, выгруженная на диск запись)
+            # обрабатываются по окнам - память не зависит от длины записи
+            audio = None
+            if not is_file and len(audio_file) <= self.PARTIAL_WINDOW_SAMPLES:
+                audio = self._as_mono(audio_file)
+            if trace is not None:
+                trace.mark('preprocess')
             
             # Выполнить транскрибацию
-            result = self.model.transcribe(audio_file, **options)
+            self.encoder_timer.reset()
+            transcribe_start = time.perf_counter()
+            if is_file:
+                windows = (segment for _, segment in iter_file_segments(audio_file))
+                result = self._transcribe_partials(windows, model, request, on_partial)
+            elif audio is None:
+                result = self._transcribe_partials(self._split_windows(audio_file), model, request, on_partial)
+            elif request.fast_model_name:
+                result = self._transcribe_cascade(audio, request, request.options)
+            else:
+                result = self._transcribe_final(model, audio, request, request.options)
+            
+            if trace is not None:
+                encoder_time = self.encoder_timer.elapsed()
+                trace.add_duration('encoder', encoder_time)
+                trace.add_duration('decoder', time.perf_counter() - transcribe_start - encoder_time)
+                trace.mark('decoder')
+                trace.info['model'] = request.model_name
+                trace.info['language'] = request.language
             
             # Извлечь текст
             text = result.get("text", "").strip()
             
             if text:
-                print(f"Распознанный текст: {text}")
+                logger.info(f"Распознанный текст: {text}")
                 return text
             else:
-                print("Текст не распознан")
+                logger.info("Текст не распознан")
                 return None
                 
         except Exception as e:
-            print(f"Ошибка распознавания: {e}")
+            logger.error(f"Ошибка распознавания: {e}")
             return None
         finally:
             self.recognizing = False
+            self.idle_policy.touch(record_gap=False)
+    
+    @staticmethod
+    def _as_mono(audio: np.ndarray) -> np.ndarray:
+        """
+        Привести массив записи к одномерному float32 (один проход для int16).
+        
+        Args:
+            audio: Аудио (фреймы) или (фреймы × каналы)
+            
+        Returns:
+            Одномерный массив (для моно float32 - представление без копирования)
+        """
+        if audio.ndim == 2 and audio.shape[1] == 1:
+            audio = audio[:, 0]
+        audio = to_float32(audio)
+        if audio.ndim == 2:
+            audio = audio.mean(axis=1)
+        return audio
+    
+    def _split_windows(self, audio: np.ndarray) -> Iterator[np.ndarray]:
+        """
+        Разбить аудио на окна Whisper, разрезая по самой тихой точке.
+        
+        Каждое окно приводится к моно float32 отдельно, поэтому запись
+        int16 (в т.ч. numpy.memmap) не копируется в память целиком.
+        
+        Args:
+            audio: Массив аудио 16 кГц (фреймы или фреймы × каналы)
+            
+        Returns:
+            Генератор окон float32 не длиннее PARTIAL_WINDOW_SAMPLES
+        """
+        frame = self.PARTIAL_FRAME_SAMPLES
+        start = 0
+        while len(audio) - start > self.PARTIAL_WINDOW_SAMPLES:
+            # Энергия кадров по 20 мс в последних секундах окна
+            search_start = start + self.PARTIAL_WINDOW_SAMPLES - self.PARTIAL_SEARCH_SAMPLES
+            search = self._as_mono(audio[search_start:start + self.PARTIAL_WINDOW_SAMPLES])
+            energy = np.square(search[:len(search) // frame * frame].reshape(-1, frame)).sum(axis=1)
+            cut = search_start + int(np.argmin(energy)) * frame + frame // 2
+            yield self._as_mono(audio[start:cut])
+            start = cut
+        yield self._as_mono(audio[start:])
+    
+    def _transcribe_partials(self, windows: Iterable[np.ndarray], model, request: RecognitionRequest,
+                             on_partial: Optional[Callable[[str], None]]) -> Dict[str, Any]:
+        """
+        Распознать длинную запись по окнам, выдавая текст каждого окна сразу.
+        
+        Args:
+            windows: Окна аудио 16 кГц не длиннее PARTIAL_WINDOW_SAMPLES
+                     (список или генератор - окна читаются по одному)
+            model: Основная модель (None при каскаде)
+            request: Запрос распознавания
+            on_partial: Функция, получающая текст очередного окна (или None)
+            
+        Returns:
+            Результат с объединенным текстом всех окон
+        """
+        texts = []
+        for window in windows:
+            window_options = dict(request.options)
+            if texts:
+                # Продолжение предыдущего окна, как condition_on_previous_text в Whisper
+                window_options["initial_prompt"] = texts[-1]
+            
+            if request.fast_model_name:
+                result = self._transcribe_cascade(window, request, window_options)
+            else:
+                result = self._transcribe_final(model, window, request, window_options)
+            
+            text = result.get("text", "").strip()
+            if text:
+                texts.append(text)
+                if on_partial is not None:
+                    on_partial(text)
+        
+        return {"text": " ".join(texts), "segments": [], "language": request.language}
+    
+    def get_cascade_model_name(self) -> Optional[str]:
+        """
+        Получить быструю модель каскада для текущего языка.
+        
+        Returns:
+            Название модели или None, если каскад не используется
+        """
+        return self._cascade_model_for(self.language, self.current_model_name())
+    
+    def _cascade_model_for(self, language: Optional[str], final_model_name: str) -> Optional[str]:
+        """
+        Получить быструю модель каскада для языка и основной модели.
+        
+        Args:
+            language: Код языка (None - автоопределение)
+            final_model_name: Основная модель после маршрутизации
+            
+        Returns:
+            Название модели или None, если каскад не используется
+        """
+        if not self.cascade_model:
+            return None
+        
+        fast_model = self.cascade_model
+        if language == "en" and self.model_routing.get("en"):
+            fast_model = self.ENGLISH_VARIANTS.get(fast_model, fast_model)
+        
+        if fast_model == final_model_name:
+            return None
+        return fast_model
+    
+    def _transcribe_cascade(self, audio, request: RecognitionRequest, options: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Распознать быстрой моделью и при низкой уверенности повторить большой.
+        
+        Args:
+            audio: Массив аудио 16 кГц
+            request: Запрос распознавания (с быстрой моделью каскада)
+            options: Опции транскрибации
+            
+        Returns:
+            Результат транскрибации Whisper
+        """
+        fast_model_name = request.fast_model_name
+        final_model_name = request.model_name
+        pinned = [fast_model_name, final_model_name]
+        start = time.perf_counter()
+        
+        # Первый проход без температурного fallback - его заменяет эскалация
+        fast_model = self._acquire(fast_model_name, pinned)
+        with self._decoding(fast_model):
+            result = fast_model.transcribe(audio, **{**options, 'temperature': 0.0})
+        
+        escalated = self._needs_escalation(result)
+        if escalated:
+            logger.info(f"Низкая уверенность {fast_model_name}, повтор моделью {final_model_name}")
+            self.model = self._acquire(final_model_name, pinned)
+            result = self._transcribe_final(self.model, audio, request, options)
+        
+        self.cascade_stats.record(escalated, time.perf_counter() - start)
+        return result
+    
+    def get_draft_model_name(self) -> Optional[str]:
+        """
+        Получить черновую модель спекулятивного декодирования.
+        
+        Returns:
+            Название модели или None, если режим не используется
+        """
+        return self._draft_model_for(self.current_model_name())
+    
+    def _draft_model_for(self, final_model: str) -> Optional[str]:
+        """
+        Получить черновую модель для основной модели.
+        
+        Args:
+            final_model: Основная модель после маршрутизации
+            
+        Returns:
+            Название модели или None, если режим не используется
+        """
+        if not self.draft_model:
+            return None
+        
+        draft_model = self.draft_model
+        if final_model.endswith(".en"):
+            draft_model = self.ENGLISH_VARIANTS.get(draft_model, draft_model)
+        
+        if draft_model == final_model:
+            return None
+        return draft_model
+    
+    def _transcribe_final(self, model, audio, request: RecognitionRequest, options: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Распознать основной моделью, спекулятивно если задана черновая модель.
+        
+        Спекулятивный декодер только жадно распознает окна без подсказки
+        и fallback по температуре, поэтому с другими опциями (профиль
+        горячей клавиши, контекст частичного распознавания) распознавание
+        идет обычным model.transcribe.
+        
+        Args:
+            model: Основная модель Whisper
+            audio: Путь к файлу или массив аудио
+            request: Запрос распознавания
+            options: Опции транскрибации
+            
+        Returns:
+            Результат транскрибации Whisper
+        """
+        draft_model_name = request.draft_model_name
+        if not draft_model_name:
+            with self._decoding(model):
+                return model.transcribe(audio, **options)
+        
+        unsupported = sorted(key for key in options
+                             if key not in SPECULATIVE_OPTIONS or (key == 'task' and options[key] != 'transcribe'))
+        if unsupported:
+            logger.info(f"Спекулятивное декодирование пропущено, опции: {', '.join(unsupported)}")
+            with self._decoding(model):
+                return model.transcribe(audio, **options)
+        
+        draft = self._acquire(draft_model_name, [draft_model_name, request.model_name])
+        decoder = self.speculative_decoder
+        if decoder is None or decoder.model is not model or decoder.draft_model is not draft:
+            try:
+                decoder = SpeculativeDecoder(model, draft, self.draft_tokens)
+            except ValueError as e:
+                logger.warning(f"Спекулятивное декодирование недоступно: {e}")
+                with self._decoding(model):
+                    return model.transcribe(audio, **options)
+            self.speculative_decoder = decoder
+        
+        with self._decoding(model, draft):
+            return decoder.transcribe(audio, options.get("language"))
+    
+    def change_draft_model(self, draft_model: Optional[str]) -> None:
+        """
+        Изменить черновую модель спекулятивного декодирования.
+        
+        Args:
+            draft_model: Название модели (None - выключить режим)
+        """
+        old_draft_model = self.get_draft_model_name()
+        self.draft_model = draft_model
+        self.speculative_decoder = None
+        if old_draft_model and old_draft_model != self.get_draft_model_name():
+            self.pool.unload(old_draft_model)
+    
+    def _needs_escalation(self, result: Dict[str, Any]) -> bool:
+        """
+        Проверить, нужно ли повторить распознавание большой моделью.
+        
+        Args:
+            result: Результат транскрибации быстрой модели
+            
+        Returns:
+            True если хотя бы один сегмент пересек пороги
+        """
+        thresholds = self.cascade_thresholds
+        segments = result.get("segments", [])
+        
+        for segment in segments:
+            if segment.get("avg_logprob", 0.0) < thresholds['avg_logprob']:
+                return True
+            if segment.get("compression_ratio", 0.0) > thresholds['compression_ratio']:
+                return True
+            # Текст при высокой вероятности тишины - модель не уверена
+            if segment.get("text", "").strip() and segment.get("no_speech_prob", 0.0) > thresholds['no_speech_prob']:
+                return True
+        
+        return False
+    
+    def change_cascade(self, cascade_model: Optional[str], cascade_thresholds: Optional[Dict[str, float]] = None) -> None:
+        """
+        Изменить настройки каскада.
+        
+        Args:
+            cascade_model: Быстрая модель первого прохода (None - выключить каскад)
+            cascade_thresholds: Новые пороги эскалации
+        """
+        old_fast_model = self.get_cascade_model_name()
+        self.cascade_model = cascade_model
+        if cascade_thresholds:
+            self.cascade_thresholds.update(cascade_thresholds)
+        if old_fast_model and old_fast_model != self.get_cascade_model_name():
+            self.pool.unload(old_fast_model)
     
-    def recognize_async(self, audio_file: str, callback: Callable[[Optional[str]], None]) -> None:
+    def get_cascade_stats(self) -> Dict[str, Any]:
+        """
+        Получить статистику каскада.
+        
+        Returns:
+            Доля эскалаций и задержки по уровням
+        """
+        return self.cascade_stats.summary()
+    
+    def recognize_async(self, audio_file: Union[str, np.ndarray], callback: Callable[[Optional[str]], None], trace=None,
+                        on_partial: Optional[Callable[[str], None]] = None, profile=None) -> None:
         """
         Распознать речь асинхронно.
         
         Args:
-            audio_file: Путь к аудио файлу
+            audio_file: Путь к аудио файлу или массив 16 кГц
             callback: Функция обратного вызова с результатом
+            trace: Трасса задержек диктовки (передается в callback вторым аргументом)
+            on_partial: Функция для текста очередного окна (вызывается из потока распознавания)
+            profile: Профиль горячей клавиши (None - основные настройки)
         """
         def worker():
-            result = self.recognize(audio_file)
-            callback(result)
+            result = self.recognize(audio_file, trace, on_partial, profile)
+            if trace is not None:
+                callback(result, trace)
+            else:
+                callback(result)
         
         thread = threading.Thread(target=worker, daemon=True)
         thread.start()
     
+    def transcribe_batch(self, audios: List[np.ndarray], language: Optional[str] = None,
+                         max_batch: int = 8) -> List[str]:
+        """
+        Распознать несколько записей, объединяя их окна в батчи энкодера.
+        
+        Окна всех записей проходят энкодер и декодер вместе (по max_batch
+        за проход). Декодирование жадное, без fallback по температуре,
+        каскада и контекста предыдущего окна - путь для сервиса
+        распознавания, где важнее пропускная способность.
+        
+        Args:
+            audios: Одномерные массивы float32 16 кГц
+            language: Код языка (None - автоопределение для каждого окна)
+            max_batch: Максимальное количество окон за один проход
+            
+        Returns:
+            Тексты записей в том же порядке
+        """
+        self.idle_policy.touch(record_gap=False)
+        
+        # Пока идет батч, сторожок простоя и смена модели не выгружают модели
+        with self.batches_lock:
+            self.batches += 1
+        try:
+            model_name = self.get_model_for_language(language)
+            model = self._acquire(model_name, [model_name])
+            
+            windows = []
+            owners = []
+            for index, audio in enumerate(audios):
+                for window in self._split_windows(audio):
+                    windows.append(window)
+                    owners.append(index)
+            
+            options = whisper.DecodingOptions(language=language, fp16=False, without_timestamps=True)
+            texts = [[] for _ in audios]
+            for start in range(0, len(windows), max_batch):
+                chunk = windows[start:start + max_batch]
+                mel = torch.stack([log_mel_spectrogram(pad_or_trim(window), n_mels=model.dims.n_mels)
+                                   for window in chunk]).to(model.device)
+                with self._decoding(model):
+                    results = whisper.decode(model, mel, options)
+                for owner, result in zip(owners[start:start + max_batch], results):
+                    if result.text.strip():
+                        texts[owner].append(result.text.strip())
+        finally:
+            with self.batches_lock:
+                self.batches -= 1
+        
+        self.idle_policy.touch(record_gap=False)
+        return [" ".join(parts) for parts in texts]
+    
     def is_recognizing(self) -> bool:
         """
         Проверить, идет ли распознавание.
@@ -137,13 +918,34 @@ class SpeechRecognizer:
         Returns:
             True если модель изменена успешно
         """
-        if self.recognizing or self.loading:
+        if self._busy():
             return False
         
+        old_model = self.current_model_name()
         self.model_name = model_name
         self.model = None
+        if old_model != self.current_model_name():
+            self.pool.unload(old_model)
         return self.load_model()
     
+    def preload_profiles(self, targets: List[Tuple[str, str]]) -> None:
+        """
+        Загрузить модели профилей в фоне в пределах бюджета памяти.
+        
+        Args:
+            targets: Пары (модель, язык) в порядке приоритета профилей
+        """
+        model_names = [self.current_model_name()]
+        for model_name, language in targets:
+            model_names.append(self._resolve_model(model_name, language if language != "auto" else None))
+        
+        def worker():
+            resident = self.pool.preload(model_names)
+            logger.info(f"Модели профилей в памяти: {', '.join(resident)} "
+                        f"({self.pool.used_memory()} МБ из {self.pool.memory_budget_mb or '∞'})")
+        
+        threading.Thread(target=worker, daemon=True).start()
+    
     def change_language(self, language: str) -> None:
         """
         Изменить язык распознавания.
@@ -152,4 +954,15 @@ class SpeechRecognizer:
             language: Код языка (ru/en/auto)
         """
         self.language = language if language != "auto" else None
+    
+    def change_model_routing(self, model_routing: Dict[str, str]) -> None:
+        """
+        Изменить таблицу маршрутизации язык → модель.
+        
+        Модели загружаются лениво при первом распознавании.
+        
+        Args:
+            model_routing: Новая таблица маршрутизации
+        """
+        self.model_routing = dict(model_routing or {})
 
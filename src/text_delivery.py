@@ -0,0 +1,323 @@
+"""
+Доставка распознанного текста пользователю.
+Буфер обмена Qt (без запуска xclip/xsel), вставка и печать в активное окно.
+"""
+
+import queue
+import struct
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Type
+
+from PyQt5.QtGui import QClipboard
+from PyQt5.QtWidgets import QApplication
+
+from log_manager import get_logger
+
+logger = get_logger(__name__)
+
+# Сколько еще считать нажатия синтетическими после печати (секунды):
+# хук получает события асинхронно, уже после возврата SendInput/pynput
+INJECTION_GRACE = 0.2
+
+# Активные печати в окно и время окончания последней (perf_counter)
+_injection_lock = threading.Lock()
+_injections = 0
+_injection_end = 0.0
+
+
+@contextmanager
+def injecting() -> Iterator[None]:
+    """Отметить, что доставка печатает в активное окно синтетическими нажатиями."""
+    global _injections, _injection_end
+    with _injection_lock:
+        _injections += 1
+    try:
+        yield
+    finally:
+        with _injection_lock:
+            _injections -= 1
+            _injection_end = time.perf_counter() + INJECTION_GRACE
+
+
+def is_injecting() -> bool:
+    """
+    Проверить, печатает ли приложение в активное окно.
+    
+    Нажатия в это время видит и перехват горячих клавиш приложения, поэтому
+    он их игнорирует.
+    
+    Returns:
+        True во время печати и INJECTION_GRACE после нее
+    """
+    return _injections > 0 or time.perf_counter() < _injection_end
+
+
+class TextDelivery:
+    """Базовый способ доставки текста. Методы вызываются в потоке Qt."""
+    
+    # Текст для уведомления о результате
+    DESCRIPTION = ""
+    # Можно ли доставлять текст частями по мере распознавания
+    STREAMS_PARTIALS = False
+    
+    def deliver(self, text: str) -> bool:
+        """
+        Доставить текст.
+        
+        Args:
+            text: Распознанный текст
+            
+        Returns:
+            True если текст доставлен
+        """
+        raise NotImplementedError
+
+
+class ClipboardDelivery(TextDelivery):
+    """Копирование в буфер обмена через QClipboard процесса приложения."""
+    
+    DESCRIPTION = "Скопировано в буфер обмена"
+    
+    def deliver(self, text: str) -> bool:
+        """
+        Скопировать текст в буфер обмена.
+        
+        Приложение само владеет буфером обмена, поэтому запись не требует
+        запуска внешних процессов.
+        
+        Args:
+            text: Распознанный текст
+            
+        Returns:
+            True если текст скопирован
+        """
+        clipboard = QApplication.clipboard()
+        if clipboard is None:
+            logger.error("Буфер обмена недоступен")
+            return False
+        
+        clipboard.setText(text, QClipboard.Clipboard)
+        # На X11 продублировать в primary selection (вставка средней кнопкой)
+        if clipboard.supportsSelection():
+            clipboard.setText(text, QClipboard.Selection)
+        return True
+
+
+class PasteDelivery(ClipboardDelivery):
+    """Копирование в буфер обмена и вставка в активное окно сочетанием Ctrl+V."""
+    
+    DESCRIPTION = "Вставлено в активное окно"
+    
+    def __init__(self):
+        """Инициализация контроллера клавиатуры."""
+        from pynput.keyboard import Controller, Key
+        self.keyboard = Controller()
+        self.modifier = Key.cmd if sys.platform == 'darwin' else Key.ctrl
+    
+    def deliver(self, text: str) -> bool:
+        """
+        Вставить текст в активное окно.
+        
+        Args:
+            text: Распознанный текст
+            
+        Returns:
+            True если текст вставлен
+        """
+        if not super().deliver(text):
+            return False
+        
+        # Дать приложению-получателю увидеть новое содержимое буфера
+        QApplication.processEvents()
+        with injecting(), self.keyboard.pressed(self.modifier):
+            self.keyboard.press('v')
+            self.keyboard.release('v')
+        return True
+
+
+class _WindowsUnicodeInput:
+    """Пакетная отправка Unicode символов одним вызовом SendInput (Windows)."""
+    
+    INPUT_KEYBOARD = 1
+    KEYEVENTF_KEYUP = 0x0002
+    KEYEVENTF_UNICODE = 0x0004
+    VK_RETURN = 0x0D
+    
+    def __init__(self):
+        """Описать структуры INPUT для ctypes."""
+        import ctypes
+        from ctypes import wintypes
+        
+        class KEYBDINPUT(ctypes.Structure):
+            _fields_ = [
+                ("wVk", wintypes.WORD),
+                ("wScan", wintypes.WORD),
+                ("dwFlags", wintypes.DWORD),
+                ("time", wintypes.DWORD),
+                ("dwExtraInfo", ctypes.c_size_t),
+            ]
+        
+        # MOUSEINPUT нужна только для правильного размера объединения
+        class MOUSEINPUT(ctypes.Structure):
+            _fields_ = [
+                ("dx", wintypes.LONG),
+                ("dy", wintypes.LONG),
+                ("mouseData", wintypes.DWORD),
+                ("dwFlags", wintypes.DWORD),
+                ("time", wintypes.DWORD),
+                ("dwExtraInfo", ctypes.c_size_t),
+            ]
+        
+        class INPUTUNION(ctypes.Union):
+            _fields_ = [("ki", KEYBDINPUT), ("mi", MOUSEINPUT)]
+        
+        class INPUT(ctypes.Structure):
+            _fields_ = [("type", wintypes.DWORD), ("union", INPUTUNION)]
+        
+        self.ctypes = ctypes
+        self.INPUT = INPUT
+        self.user32 = ctypes.WinDLL('user32', use_last_error=True)
+    
+    def type(self, text: str) -> None:
+        """
+        Напечатать текст.
+        
+        Args:
+            text: Текст (символы вне BMP отправляются суррогатными парами)
+        """
+        events = []
+        data = text.replace('\r\n', '\n').encode('utf-16-le')
+        for unit in struct.unpack(f'<{len(data) // 2}H', data):
+            if unit == 0x0A:
+                events.append((self.VK_RETURN, 0, 0))
+                events.append((self.VK_RETURN, 0, self.KEYEVENTF_KEYUP))
+            else:
+                events.append((0, unit, self.KEYEVENTF_UNICODE))
+                events.append((0, unit, self.KEYEVENTF_UNICODE | self.KEYEVENTF_KEYUP))
+        
+        inputs = (self.INPUT * len(events))()
+        for item, (vk, scan, flags) in zip(inputs, events):
+            item.type = self.INPUT_KEYBOARD
+            item.union.ki.wVk = vk
+            item.union.ki.wScan = scan
+            item.union.ki.dwFlags = flags
+        
+        sent = self.user32.SendInput(len(events), inputs, self.ctypes.sizeof(self.INPUT))
+        if sent != len(events):
+            raise OSError(self.ctypes.get_last_error(), "SendInput отправил не все события")
+
+
+class TypeDelivery(TextDelivery):
+    """
+    Печать текста в активное окно без использования буфера обмена.
+    
+    Текст печатается в отдельном потоке пачками: на Windows одним вызовом
+    SendInput с KEYEVENTF_UNICODE на пачку, на других системах через
+    контроллер клавиатуры pynput.
+    """
+    
+    DESCRIPTION = "Напечатано в активном окне"
+    STREAMS_PARTIALS = True
+    
+    # Символов в одной пачке событий
+    CHUNK_SIZE = 64
+    
+    def __init__(self):
+        """Инициализация контроллера клавиатуры и потока печати."""
+        from pynput.keyboard import Controller
+        self.keyboard = Controller()
+        self.unicode_input = _WindowsUnicodeInput() if sys.platform == 'win32' else None
+        self.texts: "queue.SimpleQueue" = queue.SimpleQueue()
+        
+        self.thread = threading.Thread(target=self._type_loop, daemon=True)
+        self.thread.start()
+    
+    def deliver(self, text: str) -> bool:
+        """
+        Поставить текст в очередь печати.
+        
+        Args:
+            text: Распознанный текст
+            
+        Returns:
+            True (печать выполняется в фоне)
+        """
+        self.texts.put_nowait(text)
+        return True
+    
+    def _type_loop(self) -> None:
+        """Печатать тексты из очереди по порядку."""
+        while True:
+            text = self.texts.get()
+            start = time.perf_counter()
+            try:
+                with injecting():
+                    self._type(text)
+            except Exception as e:
+                logger.error(f"Ошибка печати текста: {e}")
+                continue
+            elapsed = time.perf_counter() - start
+            logger.debug(f"Напечатано {len(text)} символов за {elapsed * 1000:.1f} мс")
+    
+    def _type(self, text: str) -> None:
+        """
+        Напечатать текст пачками.
+        
+        Args:
+            text: Текст для печати
+        """
+        for start in range(0, len(text), self.CHUNK_SIZE):
+            chunk = text[start:start + self.CHUNK_SIZE]
+            if self.unicode_input is not None:
+                self.unicode_input.type(chunk)
+            else:
+                self.keyboard.type(chunk)
+
+
+DELIVERY_MODES: Dict[str, Type[TextDelivery]] = {
+    'clipboard': ClipboardDelivery,
+    'paste': PasteDelivery,
+    'type': TypeDelivery,
+}
+
+
+def create_delivery(mode: str) -> TextDelivery:
+    """
+    Создать способ доставки текста.
+    
+    Args:
+        mode: Режим доставки (clipboard/paste/type)
+        
+    Returns:
+        Объект доставки (по умолчанию - буфер обмена)
+    """
+    delivery_class = DELIVERY_MODES.get(mode, ClipboardDelivery)
+    try:
+        return delivery_class()
+    except Exception as e:
+        logger.error(f"Режим доставки {mode} недоступен: {e}")
+        return ClipboardDelivery()
+
+
+def timed_deliver(delivery: TextDelivery, text: str) -> float:
+    """
+    Доставить текст и замерить время доставки.
+    
+    Args:
+        delivery: Способ доставки
+        text: Распознанный текст
+        
+    Returns:
+        Время доставки в секундах (отрицательное при ошибке)
+    """
+    start = time.perf_counter()
+    try:
+        ok = delivery.deliver(text)
+    except Exception as e:
+        logger.error(f"Ошибка доставки текста: {e}")
+        ok = False
+    elapsed = time.perf_counter() - start
+    return elapsed if ok else -elapsed
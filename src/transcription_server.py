@@ -0,0 +1,784 @@
+"""
+Локальный сервис распознавания.
+HTTP и WebSocket на localhost; одновременные запросы объединяются в батчи энкодера Whisper.
+"""
+
+import base64
+import hashlib
+import io
+import json
+import queue
+import socket
+import struct
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import soundfile as sf
+
+from audio_stream import PauseSegmenter
+from capture_buffer import to_float32
+from log_manager import get_logger
+from resampler import StreamingResampler
+
+logger = get_logger(__name__)
+
+# Частота дискретизации Whisper
+SAMPLE_RATE = 16000
+
+# Максимальный размер загружаемого файла и сообщения WebSocket (байт)
+MAX_UPLOAD_BYTES = 256 * 1024 * 1024
+MAX_MESSAGE_BYTES = 16 * 1024 * 1024
+
+# Наибольшая частота сырого PCM (больше - фильтр передискретизации не помещается в память)
+MAX_SAMPLE_RATE = 384000
+
+# Коды WebSocket (RFC 6455)
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+
+def resample(audio: np.ndarray, sample_rate: int) -> np.ndarray:
+    """
+    Передискретизировать запись целиком в 16 кГц.
+    
+    Args:
+        audio: Одномерный массив float32
+        sample_rate: Частота записи
+        
+    Returns:
+        Массив float32 16 кГц
+    """
+    resampler = StreamingResampler(sample_rate, SAMPLE_RATE)
+    if resampler.passthrough:
+        return audio
+    return np.concatenate((resampler.process(audio), resampler.flush(np.float32)))
+
+
+def pcm_format(params: Dict[str, str]) -> Tuple[int, int]:
+    """
+    Прочитать частоту и число каналов сырого PCM из параметров запроса.
+    
+    Args:
+        params: Параметры строки запроса
+        
+    Returns:
+        Кортеж (частота, каналы)
+        
+    Raises:
+        ValueError: Если параметры не числа или вне допустимого диапазона
+    """
+    try:
+        sample_rate = int(params.get('rate', SAMPLE_RATE))
+        channels = int(params.get('channels', 1))
+    except ValueError:
+        raise ValueError("Параметры rate и channels должны быть целыми числами") from None
+    
+    if not 0 < sample_rate <= MAX_SAMPLE_RATE:
+        raise ValueError(f"Частота rate должна быть от 1 до {MAX_SAMPLE_RATE}")
+    if channels < 1:
+        raise ValueError("Число каналов channels должно быть не меньше 1")
+    return sample_rate, channels
+
+
+def decode_upload(body: bytes, content_type: str, params: Dict[str, str]) -> np.ndarray:
+    """
+    Декодировать загруженное аудио в моно float32 16 кГц.
+    
+    Файлы (WAV, FLAC, OGG, MP3) читаются через soundfile. Сырой PCM
+    передается с Content-Type audio/pcm или параметром format=pcm16:
+    int16 little-endian, частота в параметре rate, каналы в channels.
+    
+    Args:
+        body: Тело запроса
+        content_type: Заголовок Content-Type
+        params: Параметры строки запроса
+        
+    Returns:
+        Одномерный массив float32 16 кГц
+        
+    Raises:
+        ValueError: Если аудио не удалось декодировать
+    """
+    if content_type.startswith('audio/pcm') or params.get('format') == 'pcm16':
+        sample_rate, channels = pcm_format(params)
+        samples = np.frombuffer(body[:len(body) // (2 * channels) * 2 * channels], dtype='<i2')
+        audio = to_float32(samples.reshape(-1, channels))
+    else:
+        try:
+            audio, sample_rate = sf.read(io.BytesIO(body), dtype='float32', always_2d=True)
+        except RuntimeError as e:
+            raise ValueError(f"Неподдерживаемый формат аудио: {e}") from e
+    
+    audio = audio[:, 0] if audio.shape[1] == 1 else audio.mean(axis=1)
+    return resample(np.ascontiguousarray(audio, dtype=np.float32), sample_rate)
+
+
+class TranscriptionJob:
+    """Запрос распознавания в очереди батчинга."""
+    
+    __slots__ = ('audio', 'language', 'received', 'started', 'finished', 'batch_size', 'text', 'error', 'done')
+    
+    def __init__(self, audio: np.ndarray, language: Optional[str]):
+        """
+        Инициализация запроса.
+        
+        Args:
+            audio: Аудио float32 16 кГц
+            language: Код языка (None - автоопределение)
+        """
+        self.audio = audio
+        self.language = language
+        self.received = time.perf_counter()
+        self.started = None
+        self.finished = None
+        self.batch_size = 0
+        self.text: Optional[str] = None
+        self.error: Optional[str] = None
+        self.done = threading.Event()
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Получить ответ клиенту.
+        
+        Returns:
+            Текст или ошибка, длительность записи и задержки в миллисекундах
+        """
+        result: Dict[str, Any] = {'text': self.text} if self.error is None else {'error': self.error}
+        result.update({
+            'duration': round(len(self.audio) / SAMPLE_RATE, 3),
+            'queue_ms': round((self.started - self.received) * 1000, 1),
+            'latency_ms': round((self.finished - self.received) * 1000, 1),
+            'batch_size': self.batch_size,
+        })
+        return result
+
+
+class ServiceMetrics:
+    """Метрики сервиса: запросы, батчи и задержки."""
+    
+    def __init__(self, history_size: int = 500):
+        """
+        Инициализация метрик.
+        
+        Args:
+            history_size: Количество последних замеров задержки
+        """
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.batches = 0
+        self.batched_requests = 0
+        self.latencies = deque(maxlen=history_size)
+        self.queue_waits = deque(maxlen=history_size)
+        self.batch_sizes = deque(maxlen=history_size)
+    
+    def record_batch(self, jobs: List[TranscriptionJob]) -> None:
+        """
+        Записать выполненный батч.
+        
+        Args:
+            jobs: Запросы батча (с заполненными временами)
+        """
+        with self.lock:
+            self.batches += 1
+            self.batched_requests += len(jobs)
+            self.batch_sizes.append(len(jobs))
+            for job in jobs:
+                self.requests += 1
+                if job.error is not None:
+                    self.errors += 1
+                self.latencies.append(job.finished - job.received)
+                self.queue_waits.append(job.started - job.received)
+    
+    def summary(self, queue_depth: int) -> Dict[str, Any]:
+        """
+        Получить сводку метрик.
+        
+        Args:
+            queue_depth: Количество запросов, ожидающих батча
+            
+        Returns:
+            Словарь счетчиков и p50/p95 задержек в миллисекундах
+        """
+        def percentile(values, fraction: float) -> Optional[float]:
+            ordered = sorted(values)
+            return round(ordered[int(fraction * (len(ordered) - 1))] * 1000, 1) if ordered else None
+        
+        with self.lock:
+            return {
+                'queue_depth': queue_depth,
+                'requests': self.requests,
+                'errors': self.errors,
+                'batches': self.batches,
+                'mean_batch_size': round(self.batched_requests / self.batches, 2) if self.batches else 0.0,
+                'max_batch_size': max(self.batch_sizes, default=0),
+                'latency_p50_ms': percentile(self.latencies, 0.5),
+                'latency_p95_ms': percentile(self.latencies, 0.95),
+                'queue_p50_ms': percentile(self.queue_waits, 0.5),
+                'queue_p95_ms': percentile(self.queue_waits, 0.95),
+            }
+
+
+class BatchScheduler:
+    """
+    Динамический батчинг запросов распознавания.
+    
+    Первый запрос в очереди ждет не дольше batch_window_ms, пока подойдут
+    другие; собранные запросы с одним языком распознаются одним вызовом
+    transcribe_batch, поэтому их окна проходят энкодер вместе. Одиночный
+    запрос задерживается не больше чем на окно ожидания.
+    """
+    
+    def __init__(self, recognizer, batch_window_ms: float = 20, max_batch: int = 8):
+        """
+        Инициализация планировщика.
+        
+        Args:
+            recognizer: SpeechRecognizer (нужен transcribe_batch)
+            batch_window_ms: Сколько ждать другие запросы после первого (мс)
+            max_batch: Максимальное количество окон Whisper за один проход
+        """
+        self.recognizer = recognizer
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch = max(1, max_batch)
+        self.metrics = ServiceMetrics()
+        self.jobs: queue.SimpleQueue = queue.SimpleQueue()
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, name="votobu-batcher", daemon=True)
+        self.thread.start()
+    
+    @property
+    def queue_depth(self) -> int:
+        """Количество запросов, ожидающих батча."""
+        return self.jobs.qsize()
+    
+    def submit(self, audio: np.ndarray, language: Optional[str]) -> TranscriptionJob:
+        """
+        Поставить запись в очередь.
+        
+        Args:
+            audio: Аудио float32 16 кГц
+            language: Код языка (None - автоопределение)
+            
+        Returns:
+            Запрос; результат готов, когда установлено job.done
+        """
+        job = TranscriptionJob(audio, language)
+        self.jobs.put(job)
+        return job
+    
+    def transcribe(self, audio: np.ndarray, language: Optional[str]) -> TranscriptionJob:
+        """
+        Распознать запись и дождаться результата.
+        
+        Args:
+            audio: Аудио float32 16 кГц
+            language: Код языка (None - автоопределение)
+            
+        Returns:
+            Выполненный запрос
+        """
+        job = self.submit(audio, language)
+        job.done.wait()
+        return job
+    
+    def close(self) -> None:
+        """Остановить планировщик после текущего батча."""
+        self.running = False
+        self.jobs.put(None)
+        self.thread.join(timeout=5)
+    
+    def _collect(self, first: TranscriptionJob) -> List[TranscriptionJob]:
+        """Собрать запросы, пришедшие за окно ожидания после первого."""
+        jobs = [first]
+        deadline = time.perf_counter() + self.batch_window
+        while len(jobs) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                job = self.jobs.get(timeout=remaining) if remaining > 0 else self.jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                self.running = False
+                break
+            jobs.append(job)
+        return jobs
+    
+    def _loop(self) -> None:
+        """Выполнять батчи запросов (фоновый поток)."""
+        while self.running:
+            first = self.jobs.get()
+            if first is None:
+                break
+            
+            groups: Dict[Optional[str], List[TranscriptionJob]] = {}
+            for job in self._collect(first):
+                groups.setdefault(job.language, []).append(job)
+            for language, jobs in groups.items():
+                self._run_batch(language, jobs)
+        
+        # Запросы, не попавшие в батч до остановки
+        while True:
+            try:
+                job = self.jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None:
+                job.error = "Сервис остановлен"
+                job.done.set()
+    
+    def _run_batch(self, language: Optional[str], jobs: List[TranscriptionJob]) -> None:
+        """Распознать запросы одного языка одним вызовом transcribe_batch."""
+        started = time.perf_counter()
+        for job in jobs:
+            job.started = started
+            job.batch_size = len(jobs)
+        
+        try:
+            texts = self.recognizer.transcribe_batch([job.audio for job in jobs], language, self.max_batch)
+            for job, text in zip(jobs, texts):
+                job.text = text
+        except Exception as e:
+            logger.error(f"Ошибка пакетного распознавания: {e}")
+            for job in jobs:
+                job.error = str(e)
+        
+        finished = time.perf_counter()
+        for job in jobs:
+            job.finished = finished
+        self.metrics.record_batch(jobs)
+        logger.debug(f"Батч из {len(jobs)} запросов: {(finished - started) * 1000:.0f} мс")
+        for job in jobs:
+            job.done.set()
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    """
+    Обработчик запросов сервиса.
+    
+    POST /transcribe        - распознать загруженный файл или PCM
+    GET  /stream (WebSocket) - потоковое распознавание PCM int16
+    GET  /metrics           - очередь, батчи и задержки
+    GET  /health            - проверка доступности
+    """
+    
+    server_version = "Votobu"
+    protocol_version = "HTTP/1.1"
+    
+    @property
+    def scheduler(self) -> BatchScheduler:
+        """Планировщик батчей сервиса."""
+        return self.server.scheduler
+    
+    def log_message(self, format: str, *args) -> None:
+        """Писать журнал запросов в лог приложения."""
+        logger.debug(f"{self.address_string()} {format % args}")
+    
+    def _params(self) -> Tuple[str, Dict[str, str]]:
+        """Получить путь и параметры строки запроса."""
+        url = urlparse(self.path)
+        return url.path, {key: values[-1] for key, values in parse_qs(url.query).items()}
+    
+    def _language(self, params: Dict[str, str]) -> Optional[str]:
+        """Определить язык запроса (по умолчанию - язык распознавателя)."""
+        if 'language' not in params:
+            return self.server.recognizer.language
+        return None if params['language'] in ('', 'auto') else params['language']
+    
+    def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+        """Отправить ответ JSON."""
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def do_GET(self) -> None:
+        """Обработать GET запрос."""
+        path, params = self._params()
+        if path == '/health':
+            self._send_json(200, {'ok': True})
+        elif path == '/metrics':
+            self._send_json(200, self.scheduler.metrics.summary(self.scheduler.queue_depth))
+        elif path == '/stream':
+            self._handle_websocket(params)
+        else:
+            self._send_json(404, {'error': "Неизвестный путь"})
+    
+    def do_POST(self) -> None:
+        """Распознать загруженное аудио."""
+        path, params = self._params()
+        if path != '/transcribe':
+            self._send_json(404, {'error': "Неизвестный путь"})
+            return
+        
+        length = int(self.headers.get('Content-Length') or 0)
+        if length <= 0:
+            self._send_json(411, {'error': "Нужен заголовок Content-Length"})
+            return
+        if length > MAX_UPLOAD_BYTES:
+            self.close_connection = True
+            self._send_json(413, {'error': "Слишком большой файл"})
+            return
+        
+        body = self.rfile.read(length)
+        try:
+            audio = decode_upload(body, self.headers.get('Content-Type', ''), params)
+        except ValueError as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        if not len(audio):
+            self._send_json(400, {'error': "Пустая запись"})
+            return
+        
+        job = self.scheduler.transcribe(audio, self._language(params))
+        self._send_json(200 if job.error is None else 500, job.to_dict())
+    
+    def _handle_websocket(self, params: Dict[str, str]) -> None:
+        """
+        Потоковый сеанс WebSocket.
+        
+        Клиент передает бинарные сообщения с PCM int16 (моно, частота в
+        параметре rate). Каждое накопленное окно Whisper распознается сразу
+        и возвращается как {"type": "segment"}; текстовое сообщение
+        {"event": "end"} распознает остаток и возвращает {"type": "final"}.
+        """
+        key = self.headers.get('Sec-WebSocket-Key')
+        if self.headers.get('Upgrade', '').lower() != 'websocket' or not key:
+            self._send_json(400, {'error': "Ожидается WebSocket"})
+            return
+        try:
+            sample_rate, _ = pcm_format(params)
+        except ValueError as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        
+        accept = base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode('ascii')).digest()).decode('ascii')
+        self.send_response(101)
+        self.send_header('Upgrade', 'websocket')
+        self.send_header('Connection', 'Upgrade')
+        self.send_header('Sec-WebSocket-Accept', accept)
+        self.end_headers()
+        self.close_connection = True
+        
+        language = self._language(params)
+        resampler = StreamingResampler(sample_rate, SAMPLE_RATE)
+        segmenter = PauseSegmenter()
+        
+        def transcribe(audio: np.ndarray, kind: str) -> None:
+            job = self.scheduler.transcribe(audio, language)
+            self._send_frame(OP_TEXT, json.dumps(dict(job.to_dict(), type=kind), ensure_ascii=False).encode('utf-8'))
+        
+        try:
+            while True:
+                opcode, payload = self._read_message()
+                if opcode == OP_CLOSE:
+                    self._send_frame(OP_CLOSE, payload[:2])
+                    break
+                
+                if opcode == OP_BINARY:
+                    samples = np.frombuffer(payload[:len(payload) // 2 * 2], dtype='<i2')
+                    for _, segment in segmenter.push(resampler.process(to_float32(samples))):
+                        transcribe(segment, 'segment')
+                elif opcode == OP_TEXT:
+                    try:
+                        event = json.loads(payload.decode('utf-8')).get('event')
+                    except (ValueError, AttributeError):
+                        event = None
+                    if event != 'end':
+                        self._send_frame(OP_TEXT, json.dumps({'error': "Неизвестное сообщение"}).encode('utf-8'))
+                        continue
+                    segments = segmenter.push(resampler.flush(np.float32))
+                    tail = segmenter.flush()
+                    for _, segment in segments:
+                        transcribe(segment, 'segment')
+                    if tail is not None:
+                        transcribe(tail[1], 'final')
+                    else:
+                        self._send_frame(OP_TEXT, json.dumps({'type': 'final', 'text': ""}).encode('utf-8'))
+        except (OSError, ValueError) as e:
+            logger.debug(f"Потоковый сеанс прерван: {e}")
+    
+    def _read_exact(self, size: int) -> bytes:
+        """Прочитать ровно size байт из соединения."""
+        data = self.rfile.read(size)
+        if len(data) < size:
+            raise ConnectionError("Соединение закрыто")
+        return data
+    
+    def _read_message(self) -> Tuple[int, bytes]:
+        """
+        Прочитать сообщение WebSocket, склеив фрагменты.
+        
+        Ping отвечается сразу, pong пропускается.
+        
+        Returns:
+            Кортеж (код сообщения, данные)
+        """
+        opcode = None
+        parts = []
+        size = 0
+        while True:
+            first, second = self._read_exact(2)
+            length = second & 0x7F
+            if length == 126:
+                length = struct.unpack('>H', self._read_exact(2))[0]
+            elif length == 127:
+                length = struct.unpack('>Q', self._read_exact(8))[0]
+            size += length
+            if size > MAX_MESSAGE_BYTES:
+                raise ValueError("Слишком большое сообщение")
+            
+            mask = self._read_exact(4) if second & 0x80 else None
+            data = self._read_exact(length)
+            if mask is not None and length:
+                data = (np.frombuffer(data, dtype=np.uint8)
+                        ^ np.resize(np.frombuffer(mask, dtype=np.uint8), length)).tobytes()
+            
+            frame_opcode = first & 0x0F
+            if frame_opcode == OP_PING:
+                self._send_frame(OP_PONG, data)
+            elif frame_opcode == OP_PONG:
+                continue
+            elif frame_opcode == OP_CLOSE:
+                return OP_CLOSE, data
+            else:
+                if frame_opcode != OP_CONTINUATION:
+                    opcode = frame_opcode
+                parts.append(data)
+                if first & 0x80:
+                    return opcode, b"".join(parts)
+    
+    def _send_frame(self, opcode: int, payload: bytes) -> None:
+        """Отправить кадр WebSocket (от сервера - без маски)."""
+        length = len(payload)
+        if length < 126:
+            header = struct.pack('>BB', 0x80 | opcode, length)
+        elif length < 65536:
+            header = struct.pack('>BBH', 0x80 | opcode, 126, length)
+        else:
+            header = struct.pack('>BBQ', 0x80 | opcode, 127, length)
+        self.wfile.write(header + payload)
+        self.wfile.flush()
+
+
+class TranscriptionServer:
+    """
+    Локальный сервис распознавания на уже загруженной модели.
+    
+    Слушает только указанный адрес (по умолчанию localhost), каждое
+    соединение обслуживается своим потоком, распознавание выполняет
+    один поток планировщика батчей.
+    """
+    
+    def __init__(self, recognizer, port: int = 8765, host: str = "127.0.0.1",
+                 batch_window_ms: float = 20, max_batch: int = 8):
+        """
+        Инициализация сервиса.
+        
+        Args:
+            recognizer: SpeechRecognizer с загружаемой моделью
+            port: Порт HTTP
+            host: Адрес прослушивания
+            batch_window_ms: Окно ожидания запросов для батча (мс)
+            max_batch: Максимальное количество окон Whisper за один проход
+        """
+        self.recognizer = recognizer
+        self.host = host
+        self.port = port
+        self.batch_window_ms = batch_window_ms
+        self.max_batch = max_batch
+        self.scheduler: Optional[BatchScheduler] = None
+        self.httpd: Optional[ThreadingHTTPServer] = None
+    
+    def start(self) -> bool:
+        """
+        Запустить сервис в фоновом потоке.
+        
+        Returns:
+            True если порт открыт
+        """
+        try:
+            self.httpd = ThreadingHTTPServer((self.host, self.port), _RequestHandler)
+        except OSError as e:
+            logger.error(f"Не удалось запустить сервис распознавания на {self.host}:{self.port}: {e}")
+            return False
+        
+        self.scheduler = BatchScheduler(self.recognizer, self.batch_window_ms, self.max_batch)
+        self.httpd.scheduler = self.scheduler
+        self.httpd.recognizer = self.recognizer
+        self.port = self.httpd.server_address[1]
+        threading.Thread(target=self.httpd.serve_forever, name="votobu-server", daemon=True).start()
+        logger.info(f"Сервис распознавания: http://{self.host}:{self.port}")
+        return True
+    
+    def close(self) -> None:
+        """Остановить сервис."""
+        if self.httpd is None:
+            return
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.scheduler.close()
+        self.httpd = None
+
+
+def transcribe_file(path: str, port: int = 8765, language: Optional[str] = None,
+                    host: str = "127.0.0.1") -> Dict[str, Any]:
+    """
+    Отправить файл сервису (клиент для проверки и скриптов).
+    
+    Args:
+        path: Аудио файл
+        port: Порт сервиса
+        language: Код языка (None - язык сервиса)
+        host: Адрес сервиса
+        
+    Returns:
+        Ответ сервиса
+    """
+    from urllib.error import HTTPError
+    from urllib.request import Request, urlopen
+    
+    with open(path, 'rb') as file:
+        body = file.read()
+    query = f"?language={language}" if language else ""
+    request = Request(f"http://{host}:{port}/transcribe{query}", data=body,
+                      headers={'Content-Type': 'application/octet-stream'})
+    try:
+        with urlopen(request) as response:
+            return json.loads(response.read().decode('utf-8'))
+    except HTTPError as e:
+        return json.loads(e.read().decode('utf-8'))
+
+
+def stream_file(path: str, port: int = 8765, language: Optional[str] = None,
+                chunk_ms: int = 100, host: str = "127.0.0.1") -> List[Dict[str, Any]]:
+    """
+    Передать файл сервису по WebSocket блоками PCM (клиент для проверки).
+    
+    Args:
+        path: Аудио файл
+        port: Порт сервиса
+        language: Код языка (None - язык сервиса)
+        chunk_ms: Длительность блока в миллисекундах
+        host: Адрес сервиса
+        
+    Returns:
+        Сообщения сервиса (сегменты и итог)
+    """
+    audio, sample_rate = sf.read(path, dtype='int16', always_2d=True)
+    pcm = audio[:, 0].astype('<i2').tobytes()
+    query = f"rate={sample_rate}" + (f"&language={language}" if language else "")
+    
+    connection = socket.create_connection((host, port))
+    reader = connection.makefile('rb')
+    key = base64.b64encode(np.random.bytes(16)).decode('ascii')
+    connection.sendall((
+        f"GET /stream?{query} HTTP/1.1\r\nHost: {host}:{port}\r\n"
+        f"Upgrade: websocket\r\nConnection: Upgrade\r\n"
+        f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n"
+    ).encode('ascii'))
+    while reader.readline() not in (b"\r\n", b""):
+        pass
+    
+    def send(opcode: int, payload: bytes) -> None:
+        # Кадры клиента всегда маскируются
+        mask = np.random.bytes(4)
+        length = len(payload)
+        if length < 126:
+            header = struct.pack('>BB', 0x80 | opcode, 0x80 | length)
+        elif length < 65536:
+            header = struct.pack('>BBH', 0x80 | opcode, 0x80 | 126, length)
+        else:
+            header = struct.pack('>BBQ', 0x80 | opcode, 0x80 | 127, length)
+        masked = np.frombuffer(payload, dtype=np.uint8) ^ np.resize(np.frombuffer(mask, dtype=np.uint8), length)
+        connection.sendall(header + mask + masked.tobytes())
+    
+    step = sample_rate * chunk_ms // 1000 * 2
+    for start in range(0, len(pcm), step):
+        send(OP_BINARY, pcm[start:start + step])
+    send(OP_TEXT, json.dumps({'event': 'end'}).encode('utf-8'))
+    
+    messages = []
+    while not messages or messages[-1].get('type') != 'final':
+        first, second = reader.read(2)
+        length = second & 0x7F
+        if length == 126:
+            length = struct.unpack('>H', reader.read(2))[0]
+        elif length == 127:
+            length = struct.unpack('>Q', reader.read(8))[0]
+        payload = reader.read(length)
+        if first & 0x0F == OP_TEXT:
+            messages.append(json.loads(payload.decode('utf-8')))
+    
+    send(OP_CLOSE, struct.pack('>H', 1000))
+    connection.close()
+    return messages
+
+
+if __name__ == "__main__":
+    # python transcription_server.py [--port N] - сервис без интерфейса (модель из config.json)
+    # python transcription_server.py send <файл> [--stream] [--port N] - отправить файл сервису
+    import sys
+    from pathlib import Path
+    from config_manager import ConfigManager
+    
+    config_manager = ConfigManager()
+    config = config_manager.config
+    arguments = sys.argv[1:]
+    port = config.get('server_port', 8765)
+    if "--port" in arguments:
+        index = arguments.index("--port")
+        port = int(arguments[index + 1])
+        del arguments[index:index + 2]
+    
+    if arguments and arguments[0] == "send":
+        files = [argument for argument in arguments[1:] if argument != "--stream"]
+        for path in files:
+            if "--stream" in arguments:
+                for message in stream_file(path, port):
+                    print(json.dumps(message, ensure_ascii=False))
+            else:
+                print(json.dumps(transcribe_file(path, port), ensure_ascii=False))
+        sys.exit(0)
+    
+    from log_manager import LogManager
+    from model_store import ModelStore
+    from speech_recognizer import SpeechRecognizer
+    
+    LogManager.setup(Path(config_manager.config_dir), config.get('log_level', 'INFO'),
+                     file_name="votobu-server.log")
+    recognizer = SpeechRecognizer(
+        model_name=config.get('whisper_model', 'base'),
+        language=config.get('language', 'ru'),
+        model_routing=config.get('model_routing', {}),
+        memory_budget_mb=config.get('model_memory_budget_mb', 4096),
+        model_store=ModelStore(config_manager.config_dir)
+    )
+    if not recognizer.load_model():
+        sys.exit(1)
+    
+    server = TranscriptionServer(
+        recognizer,
+        port=port,
+        batch_window_ms=config.get('server_batch_window_ms', 20),
+        max_batch=config.get('server_max_batch', 8)
+    )
+    if not server.start():
+        sys.exit(1)
+    print(f"Сервис распознавания: http://127.0.0.1:{server.port} (Ctrl+C - остановить)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.close()
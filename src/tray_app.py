@@ -4,10 +4,10 @@
 """
 
 from PyQt5.QtWidgets import QSystemTrayIcon, QMenu, QAction, QMessageBox
-from PyQt5.QtGui import QIcon
-from PyQt5.QtCore import QObject, pyqtSignal
+from PyQt5.QtGui import QIcon, QPixmap, QPainter, QColor
+from PyQt5.QtCore import QObject, QTimer, Qt, pyqtSignal
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Dict, List, Optional
 
 
 class TrayApp(QObject):
@@ -15,8 +15,18 @@ class TrayApp(QObject):
     
     # Сигналы
     settings_requested = pyqtSignal()
+    verify_models_requested = pyqtSignal()
+    calibration_requested = pyqtSignal()
+    latency_stats_requested = pyqtSignal()
+    history_requested = pyqtSignal()
+    diagnostics_requested = pyqtSignal()
     quit_requested = pyqtSignal()
     
+    # Индикатор уровня входа: число кадров иконки и частота обновления
+    LEVEL_FRAME_COUNT = 8
+    LEVEL_REFRESH_HZ = 15
+    LEVEL_ICON_SIZE = 64
+    
     def __init__(self, icon_path: str = None, recording_icon_path: str = None):
         """
         Инициализация приложения трея.
@@ -31,6 +41,17 @@ class TrayApp(QObject):
         self.icon_path = icon_path
         self.recording_icon_path = recording_icon_path
         
+        # Декодированные иконки (путь → QIcon) и кадры индикатора уровня
+        self.icon_cache: Dict[str, QIcon] = {}
+        self.level_frames: List[QIcon] = []
+        self.level_frame = -1
+        self.level_source: Optional[Callable[[], float]] = None
+        
+        # Таймер индикатора уровня (работает только во время записи)
+        self.level_timer = QTimer(self)
+        self.level_timer.setInterval(1000 // self.LEVEL_REFRESH_HZ)
+        self.level_timer.timeout.connect(self._update_level)
+        
         # Создать иконку трея
         self.tray_icon = None
         self.menu = None
@@ -43,6 +64,7 @@ class TrayApp(QObject):
         # Создать иконку
         icon = self._load_icon(self.icon_path)
         self.tray_icon = QSystemTrayIcon(icon)
+        self.level_frames = self._build_level_frames(self._load_icon(self.recording_icon_path))
         
         # Создать меню
         self.menu = QMenu()
@@ -59,6 +81,31 @@ class TrayApp(QObject):
         settings_action.triggered.connect(self._on_settings)
         self.menu.addAction(settings_action)
         
+        # История распознанных текстов
+        history_action = QAction("История", self.menu)
+        history_action.triggered.connect(self.history_requested.emit)
+        self.menu.addAction(history_action)
+        
+        # Статистика задержек
+        latency_action = QAction("Статистика задержек", self.menu)
+        latency_action.triggered.connect(self.latency_stats_requested.emit)
+        self.menu.addAction(latency_action)
+        
+        # Диагностика захвата аудио и горячих клавиш
+        diagnostics_action = QAction("Диагностика", self.menu)
+        diagnostics_action.triggered.connect(self.diagnostics_requested.emit)
+        self.menu.addAction(diagnostics_action)
+        
+        # Проверка моделей
+        verify_action = QAction("Проверить модели", self.menu)
+        verify_action.triggered.connect(self._on_verify_models)
+        self.menu.addAction(verify_action)
+        
+        # Замер скорости моделей на этом компьютере
+        calibration_action = QAction("Подобрать модель", self.menu)
+        calibration_action.triggered.connect(self.calibration_requested.emit)
+        self.menu.addAction(calibration_action)
+        
         # О программе
         about_action = QAction("О программе", self.menu)
         about_action.triggered.connect(self._on_about)
@@ -86,7 +133,7 @@ class TrayApp(QObject):
     
     def _load_icon(self, icon_path: Optional[str]) -> QIcon:
         """
-        Загрузить иконку из файла.
+        Загрузить иконку из файла (файл читается и декодируется один раз).
         
         Args:
             icon_path: Путь к файлу иконки
@@ -94,16 +141,75 @@ class TrayApp(QObject):
         Returns:
             QIcon объект
         """
+        icon = self.icon_cache.get(icon_path)
+        if icon is not None:
+            return icon
+        
         if icon_path and Path(icon_path).exists():
-            return QIcon(icon_path)
+            icon = QIcon(QPixmap(icon_path))
         else:
             # Вернуть пустую иконку если файл не найден
-            return QIcon()
+            icon = QIcon()
+        self.icon_cache[icon_path] = icon
+        return icon
+    
+    def _build_level_frames(self, base_icon: QIcon) -> List[QIcon]:
+        """
+        Заранее нарисовать кадры иконки записи со шкалой уровня.
+        
+        Args:
+            base_icon: Иконка записи
+            
+        Returns:
+            Кадры от тишины (0) до максимального уровня
+        """
+        size = self.LEVEL_ICON_SIZE
+        frames = []
+        for index in range(self.LEVEL_FRAME_COUNT):
+            pixmap = base_icon.pixmap(size, size) if not base_icon.isNull() else QPixmap()
+            if pixmap.isNull():
+                pixmap = QPixmap(size, size)
+                pixmap.fill(Qt.transparent)
+            
+            width, full_height = pixmap.width(), pixmap.height()
+            bar_width = max(width // 5, 2)
+            painter = QPainter(pixmap)
+            painter.fillRect(width - bar_width, 0, bar_width, full_height, QColor(0, 0, 0, 120))
+            height = round(full_height * index / (self.LEVEL_FRAME_COUNT - 1))
+            if height:
+                painter.fillRect(width - bar_width, full_height - height, bar_width, height, QColor(60, 220, 90))
+            painter.end()
+            frames.append(QIcon(pixmap))
+        return frames
+    
+    def set_level_source(self, source: Optional[Callable[[], float]]) -> None:
+        """
+        Задать источник уровня входного сигнала для индикатора.
+        
+        Args:
+            source: Функция, возвращающая уровень от 0 до 1 (None - без индикатора)
+        """
+        self.level_source = source
+    
+    def _update_level(self) -> None:
+        """Показать кадр, соответствующий текущему уровню (только при его смене)."""
+        if self.level_source is None or not self.level_frames:
+            return
+        
+        last = len(self.level_frames) - 1
+        frame = min(int(self.level_source() * last + 0.5), last)
+        if frame != self.level_frame:
+            self.level_frame = frame
+            self.tray_icon.setIcon(self.level_frames[frame])
     
     def _on_settings(self) -> None:
         """Обработчик нажатия пункта Настройки."""
         self.settings_requested.emit()
     
+    def _on_verify_models(self) -> None:
+        """Обработчик нажатия пункта Проверить модели."""
+        self.verify_models_requested.emit()
+    
     def _on_about(self) -> None:
         """Обработчик нажатия пункта О программе."""
         QMessageBox.about(
@@ -143,9 +249,16 @@ class TrayApp(QObject):
                 icon = self._load_icon(self.recording_icon_path)
                 self.tray_icon.setIcon(icon)
             
+            # Запустить индикатор уровня
+            if self.level_source is not None:
+                self.level_frame = -1
+                self.level_timer.start()
+            
             # Обновить статус
             self.status_action.setText("🔴 Запись...")
         else:
+            self.level_timer.stop()
+            
             # Вернуть обычную иконку
             if self.icon_path:
                 icon = self._load_icon(self.icon_path)
@@ -175,6 +288,16 @@ class TrayApp(QObject):
         if self.tray_icon:
             self.tray_icon.showMessage(title, message, icon_type, 3000)
     
+    def show_info(self, title: str, text: str) -> None:
+        """
+        Показать информационное окно.
+        
+        Args:
+            title: Заголовок окна
+            text: Текст сообщения
+        """
+        QMessageBox.information(None, title, text)
+    
     def update_hotkey_display(self, hotkey: str) -> None:
         """
         Обновить отображение горячей клавиши в статусе.